@@ -0,0 +1,5 @@
+# قياس أداء المسارات الساخنة على بيانات اصطناعية بحجم قابل للضبط:
+#   python -m benchmarks --members 300 --periods 12 --output results.json
+#   python -m benchmarks --db benchmark_1.db --baseline results.json
+# dataset.generate يملأ قاعدة متوافقة مع expenses.db عبر دوال core، و suite.run يقيس
+# التقارير والتصدير والحفظ والتقفيل على نسخة مؤقتة منها.
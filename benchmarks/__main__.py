@@ -0,0 +1,81 @@
+import argparse
+import json
+import logging
+import platform
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from benchmarks.dataset import DEFAULT_SCALE, generate
+from benchmarks.suite import DEFAULT_REPEAT, run
+
+# النسبة التي يُعد بعدها الوسيط أبطأ من خط الأساس تراجعًا في الأداء
+REGRESSION_RATIO = 1.2
+
+
+def compare(results, baseline):
+    """طباعة القياسات التي زاد وسيطها عن خط الأساس بأكثر من REGRESSION_RATIO وإعادة عددها"""
+    regressions = 0
+    for name, result in sorted(results.items()):
+        before = baseline.get("results", {}).get(name, {}).get("median_ms")
+        after = result.get("median_ms")
+        if not before or after is None:
+            continue
+        ratio = after / before
+        marker = "تراجع" if ratio > REGRESSION_RATIO else ""
+        regressions += ratio > REGRESSION_RATIO
+        print(f"{name:<45} {before:10.2f} -> {after:10.2f} ms  x{ratio:5.2f} {marker}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="توليد بيانات اصطناعية وقياس زمن المسارات الساخنة وإخراج النتائج JSON",
+    )
+    parser.add_argument("--db", help="قاعدة بيانات جاهزة أو مسار القاعدة المولدة (الافتراضي benchmark_<seed>.db)")
+    parser.add_argument("--generate", action="store_true", help="توليد القاعدة حتى لو كانت موجودة في --db")
+    parser.add_argument("--seed", type=int, default=1)
+    for name, value in DEFAULT_SCALE.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--label", default="", help="اسم النسخة المقاسة (يُكتب في النتائج)")
+    parser.add_argument("--output", help="ملف JSON للنتائج (الافتراضي الطباعة)")
+    parser.add_argument("--baseline", help="نتائج سابقة JSON للمقارنة بها")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    scale = {name: getattr(args, name) for name in DEFAULT_SCALE}
+    path = Path(args.db or f"benchmark_{args.seed}.db")
+    generated_seconds = None
+    if args.generate or not path.exists():
+        started = time.perf_counter()
+        generate(path, seed=args.seed, **scale)
+        generated_seconds = round(time.perf_counter() - started, 3)
+
+    report = {
+        "label": args.label,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "database": str(path),
+        "seed": args.seed,
+        "scale": scale if generated_seconds is not None else None,
+        "generate_seconds": generated_seconds,
+        "results": run(path, args.repeat),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        return 1 if compare(report["results"], baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import random
+from datetime import date, timedelta
+from core import Meal, DrinkSale, Purchase, record_meal, record_drinks, add_purchase, close_period
+from utils.database import DatabaseManager
+from utils.distribution import MEAL_TYPES
+
+# الحجم الافتراضي: 300 مشترك وسنة من الوجبات (12 فترة مقفلة + الشهر الحالي)
+DEFAULT_SCALE = {
+    "members": 300,
+    "items": 40,
+    "drink_items": 8,
+    "periods": 12,
+    "days_per_period": 30,
+    "drinks_per_day": 40,
+    "attendance": 0.75,
+}
+
+RANKS = ("ملازم", "ملازم أول", "نقيب", "رائد", "مقدم", "عقيد")
+START_DATE = date(2024, 1, 1)
+
+
+def _purchase_for(db, needs, names, date_text):
+    """شراء ما تحتاجه الفترة من كل صنف مع هامش، بسعر وحدة ثابت لكل صنف"""
+    purchases = []
+    for expense_id, quantity in needs.items():
+        quantity = int(quantity * 1.1) + 10
+        unit_price = names[expense_id][1]
+        purchases.append(Purchase(names[expense_id][0], quantity, unit_price * quantity,
+                                  is_drink=names[expense_id][2], date=date_text))
+    if purchases:
+        add_purchase(db, purchases)
+
+
+def _period(db, rng, scale, member_ids, foods, drinks, names, first_day):
+    """وجبات ومشروبات فترة واحدة عبر نفس دوال core التي تستخدمها الصفحات"""
+    meals = []
+    sales = []
+    needs = {}
+    for offset in range(scale["days_per_period"]):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        for meal_type in MEAL_TYPES:
+            attending = [m for m in member_ids if rng.random() < scale["attendance"]] or member_ids[:1]
+            items = {expense_id: rng.randint(1, 5) for expense_id in rng.sample(foods, rng.randint(1, 3))}
+            for expense_id, quantity in items.items():
+                needs[expense_id] = needs.get(expense_id, 0) + quantity
+            meals.append(Meal(day, meal_type, attending, items))
+        for _ in range(scale["drinks_per_day"]):
+            sale = DrinkSale(day, rng.choice(drinks), rng.choice(member_ids), rng.randint(1, 3))
+            needs[sale.expense_id] = needs.get(sale.expense_id, 0) + sale.quantity
+            sales.append(sale)
+
+    _purchase_for(db, needs, names, first_day.isoformat())
+    # نثريات الفترة تُوزع عند التقفيل
+    add_purchase(db, [Purchase("نثريات", 1, rng.randint(50, 200) * 100, is_miscellaneous=True,
+                               date=first_day.isoformat())])
+    record_meal(db, meals)
+    record_drinks(db, sales)
+
+
+def generate(path, seed=1, **scale):
+    """إنشاء قاعدة بيانات متوافقة مع expenses.db في path بالحجم المطلوب وإعادة الحجم المستخدم
+
+    نفس البذرة والحجم تعطي نفس البيانات دائمًا (عدا تواريخ الأرشفة التي يكتبها التقفيل).
+    """
+    scale = dict(DEFAULT_SCALE, **scale)
+    rng = random.Random(seed)
+    db = DatabaseManager(str(path))
+    try:
+        db.bulk_insert(
+            "members", ["rank", "name", "contribution", "total_due", "date"],
+            [(rng.choice(RANKS), f"مشترك {number}", rng.randint(300, 800) * 100, 0, START_DATE.isoformat())
+             for number in range(1, scale["members"] + 1)]
+        )
+        member_ids = [row[0] for row in db.fetch_all("SELECT member_id FROM members ORDER BY member_id")]
+
+        # الأصناف تُنشأ بأول شراء؛ الاسم وسعر الوحدة ثابتان لكل صنف
+        catalog = [(f"صنف {number}", rng.randint(2, 60) * 50, False) for number in range(1, scale["items"] + 1)]
+        catalog += [(f"مشروب {number}", rng.randint(2, 20) * 50, True) for number in range(1, scale["drink_items"] + 1)]
+        created = add_purchase(db, [Purchase(name, 1, price, is_drink=is_drink, date=START_DATE.isoformat())
+                                    for name, price, is_drink in catalog])
+        names = {result.expense_id: item for result, item in zip(created, catalog)}
+        foods = [expense_id for expense_id, item in names.items() if not item[2]]
+        drinks = [expense_id for expense_id, item in names.items() if item[2]]
+
+        first_day = START_DATE
+        for _ in range(scale["periods"]):
+            _period(db, rng, scale, member_ids, foods, drinks, names, first_day)
+            first_day += timedelta(days=scale["days_per_period"])
+            close_period(db, closure_date=(first_day - timedelta(days=1)).isoformat())
+        # الشهر الحالي (غير مقفل)
+        _period(db, rng, scale, member_ids, foods, drinks, names, first_day)
+    finally:
+        db.close_connection()
+    return scale
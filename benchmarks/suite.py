@@ -0,0 +1,137 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from core import Meal, DrinkSale, Purchase, record_meal, record_drinks, add_purchase, close_period
+from utils.database import DatabaseManager
+from utils.export import write_csv, write_xlsx
+from utils.report_queries import REPORT_QUERIES, is_archived
+from utils.search import suggest
+
+# عدد مرات تكرار كل قياس (الوسيط هو الرقم المعتمد للمقارنة)
+DEFAULT_REPEAT = 5
+
+
+def _timed(fn, repeat):
+    """تشغيل fn عدد repeat من المرات وإعادة إحصاءات الزمن بالمللي ثانية وعدد الصفوف"""
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    result = {
+        "repeat": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+    if rows is not None:
+        result["rows"] = rows
+    return result
+
+
+def copy_database(source, target):
+    """نسخ قاعدة البيانات مع مجلد ملفات الأرشيف المرافق لها (لا تُعدّل النسخة الأصلية)"""
+    source, target = Path(source), Path(target)
+    shutil.copyfile(source, target)
+    source_archive = source.with_name(f"{source.stem}_archive")
+    if source_archive.exists():
+        shutil.copytree(source_archive, target.with_name(f"{target.stem}_archive"), dirs_exist_ok=True)
+
+
+def bench_reports(db, repeat):
+    """كل استعلامات التقارير الحالية والمؤرشفة (آخر فترة مختومة) دون المرور بمخزن النتائج"""
+    member_id = db.fetch_one("SELECT MIN(member_id) FROM members")[0]
+    archive_key_id = db.fetch_one("SELECT MAX(archive_key_id) FROM archive_keys")[0]
+    results = {}
+    for name, (query, _, _) in REPORT_QUERIES.items():
+        params = {"member_id": member_id, "archive_key_id": archive_key_id}
+        if is_archived(name):
+            if archive_key_id is None:
+                continue
+            source = db.archives.period(archive_key_id)
+        else:
+            source = db
+        results[f"report.{name}"] = _timed(lambda: len(source.fetch_all(query, params)), repeat)
+    return results
+
+
+def bench_search(db, repeat):
+    """اقتراحات الأسماء أثناء الكتابة (نص قصير يمسح الفهرس، وأطول يستخدم trigram)"""
+    return {
+        "search.items_short": _timed(lambda: len(suggest(db, "items", "صن")), repeat),
+        "search.items": _timed(lambda: len(suggest(db, "items", "صنف 1")), repeat),
+        "search.members": _timed(lambda: len(suggest(db, "members", "مشترك 12")), repeat),
+    }
+
+
+def bench_exports(db, repeat, directory):
+    """تصدير أكبر تقرير حالي (الوجبات) من المؤشر مباشرة إلى CSV و xlsx"""
+    query, headers, _ = REPORT_QUERIES["meals"]
+    results = {
+        "export.meals_csv": _timed(
+            lambda: write_csv(os.path.join(directory, "meals.csv"), headers, db.iter_query(query, ())), repeat
+        ),
+    }
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        results["export.meals_xlsx"] = {"skipped": "openpyxl غير مثبت"}
+    else:
+        results["export.meals_xlsx"] = _timed(
+            lambda: write_xlsx(os.path.join(directory, "meals.xlsx"), [("meals", headers, db.iter_query(query, ()))]),
+            repeat
+        )
+    return results
+
+
+def bench_writes(db, repeat):
+    """حفظ وجبة وصرف مشروب (فردي ودفعة) عبر core كما تفعل الصفحات"""
+    member_ids = [row[0] for row in db.fetch_all("SELECT member_id FROM members ORDER BY member_id")]
+    foods = db.fetch_all("SELECT expense_id, item_name FROM expenses WHERE is_drink = 0 AND is_miscellaneous = 0 LIMIT 2")
+    drink = db.fetch_one("SELECT expense_id, item_name FROM expenses WHERE is_drink = 1 LIMIT 1")
+    day = db.fetch_one("SELECT MAX(date) FROM meal_records")[0]
+
+    # رصيد كافٍ لكل التكرارات يُشترى خارج القياس
+    add_purchase(db, [Purchase(name, 10000, 10000, date=day) for _, name in foods]
+                 + [Purchase(drink[1], 10000, 10000, is_drink=True, date=day)])
+
+    attending = member_ids[:max(len(member_ids) * 3 // 4, 1)]
+    meal = Meal(day, "غداء", attending, {expense_id: 3 for expense_id, _ in foods})
+    sale = DrinkSale(day, drink[0], member_ids[0], 1)
+    batch = [DrinkSale(day, drink[0], member_ids[i % len(member_ids)], 1) for i in range(100)]
+    return {
+        "save.meal": _timed(lambda: len(record_meal(db, [meal])[0].meal_record_ids), repeat),
+        "save.drink": _timed(lambda: len(record_drinks(db, [sale])), repeat),
+        "save.drink_batch_100": _timed(lambda: len(record_drinks(db, batch)), repeat),
+    }
+
+
+def bench_close(db):
+    """تقفيل الشهر الحالي مرة واحدة (يُشغّل أخيرًا لأنه يفرّغ بيانات الشهر)"""
+    closed = []
+    result = _timed(lambda: closed.append(close_period(db)), 1)
+    result["phases_ms"] = {name: round(elapsed * 1000, 3) for name, elapsed in closed[0].phase_timings}
+    return {"close.period": result}
+
+
+def run(path, repeat=DEFAULT_REPEAT):
+    """تشغيل كل القياسات على نسخة مؤقتة من قاعدة البيانات path وإعادة النتائج"""
+    with tempfile.TemporaryDirectory() as directory:
+        work = os.path.join(directory, "bench.db")
+        copy_database(path, work)
+        db = DatabaseManager(work)
+        try:
+            results = {}
+            results.update(bench_reports(db, repeat))
+            results.update(bench_search(db, repeat))
+            results.update(bench_exports(db, repeat, directory))
+            results.update(bench_writes(db, repeat))
+            results.update(bench_close(db))
+        finally:
+            db.close_connection()
+    return results
@@ -0,0 +1,8 @@
+# واجهة العمليات دون واجهة المستخدم: كل دالة تستقبل db (DatabaseManager) ودفعة من
+# الإدخالات وتنفذها في معاملة واحدة، وتعيد نتائج منظمة أو ترفع ValueError برسالة للمستخدم.
+# صفحات Flet تستدعيها، ويمكن استدعاؤها مباشرة للإدخال المجمع أو لقياس الأداء.
+
+from core.meals import Meal, RecordedMeal, record_meal
+from core.drinks import DrinkSale, RecordedDrink, record_drinks
+from core.purchases import Purchase, RecordedPurchase, add_purchase
+from core.closing import MiscDistribution, ClosedPeriod, distribute_misc, close_period
@@ -0,0 +1,364 @@
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from utils.distribution import DEFAULT_WEIGHTING, compute_shares, apply_shares
+from utils.money import format_money
+
+
+@dataclass
+class MiscDistribution:
+    archive_key_id: int
+    total_amount: int
+    shares: list
+
+
+@dataclass
+class ClosedPeriod:
+    archive_key_id: int
+    closure_id: int
+    # (المرحلة، الزمن بالثواني) بالترتيب، وآخرها حفظ المعاملة
+    phase_timings: list = field(default_factory=list)
+
+
+def first_transaction_date(cursor):
+    """أقل تاريخ سجل موجود في الجداول الثلاث"""
+    dates = []
+    for query in (
+        "SELECT MIN(date) FROM meal_records",
+        "SELECT MIN(date) FROM drink_records",
+        "SELECT MIN(date) FROM expenses",
+    ):
+        cursor.execute(query)
+        date = cursor.fetchone()[0]
+        if date:
+            dates.append(date)
+    return min(dates) if dates else None
+
+
+def _seal(db, archive_key_id):
+    """نقل الفترة إلى ملفها؛ إن فشل تبقى في القاعدة الرئيسية وتُنقل عند الاتصال التالي"""
+    try:
+        db.archives.seal(archive_key_id)
+    except Exception as e:
+        logging.error(f"تعذر نقل فترة الأرشيف {archive_key_id} إلى ملفها: {e}", exc_info=True)
+    db.reports.invalidate_archive(archive_key_id)
+
+
+def _get_or_create_archive_key(cursor, first_date):
+    """إنشاء أو جلب مفتاح الأرشفة لفترة معينة"""
+    cursor.execute(
+        "SELECT archive_key_id FROM archive_keys WHERE start_date <= ? AND (end_date IS NULL OR end_date >= ?)",
+        (first_date, first_date)
+    )
+    existing = cursor.fetchone()
+    now_date = datetime.now().strftime("%Y-%m-%d")
+    now_dt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if existing:
+        key_id = existing[0]
+        cursor.execute(
+            "UPDATE archive_keys SET end_date = ?, archived_at = ? WHERE archive_key_id = ? AND end_date IS NULL",
+            (now_date, now_dt, key_id)
+        )
+    else:
+        archive_name = f"Dist_{first_date}_to_{now_date}"
+        cursor.execute(
+            "INSERT INTO archive_keys (archive_name, start_date, end_date, archived_at) VALUES (?, ?, ?, ?)",
+            (archive_name, first_date, now_date, now_dt)
+        )
+        key_id = cursor.lastrowid
+    return key_id
+
+
+def distribute_misc(db, weighting=DEFAULT_WEIGHTING, distribution_date=None):
+    """توزيع النثريات على المشتركين وأرشفتها دون تقفيل الشهر
+
+    الحصص بالقروش ومجموعها يساوي قيمة النثريات تمامًا. ترفع ValueError إن لم توجد
+    نثريات أو سجلات وجبات، وتعيد MiscDistribution.
+    """
+    distribution_date = distribution_date or datetime.now().strftime("%Y-%m-%d")
+    with db.transaction() as cursor:
+        cursor.execute("SELECT expense_id, total_price FROM expenses WHERE is_miscellaneous = 1")
+        misc_expenses = cursor.fetchall()
+        if not misc_expenses:
+            raise ValueError("لا توجد أصناف نثريات للتوزيع!")
+        total_misc_value = sum(item[1] for item in misc_expenses)
+
+        shares = compute_shares(cursor, total_misc_value, weighting)
+        if not shares:
+            raise ValueError("لا توجد سجلات وجبات لتوزيع النثريات!")
+        apply_shares(cursor, shares, distribution_date)
+
+        first_date = first_transaction_date(cursor) or distribution_date
+        archive_key_id = _get_or_create_archive_key(cursor, first_date)
+
+        # أرشفة توزيعات هذه الدفعة (تحل محل أي أرشيف سابق لنفس المعرفات)
+        cursor.execute("""
+            INSERT OR REPLACE INTO miscellaneous_contributions_archive
+            (misc_contribution_id, member_id, misc_amount, meal_count, distribution_date, archive_key_id)
+            SELECT misc_contribution_id, member_id, misc_amount, meal_count, distribution_date, ?
+            FROM miscellaneous_contributions WHERE distribution_date = ?
+        """, (archive_key_id, distribution_date))
+
+        # أرشفة وحذف النثريات الأصلية من expenses
+        misc_ids = [item[0] for item in misc_expenses]
+        placeholders = ",".join("?" * len(misc_ids))
+        cursor.execute(
+            f"INSERT OR REPLACE INTO expenses_archive "
+            "(expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink, date, archive_key_id) "
+            f"SELECT expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink, date, ? "
+            f"FROM expenses WHERE expense_id IN ({placeholders})",
+            (archive_key_id, *misc_ids)
+        )
+        cursor.execute(f"DELETE FROM expenses WHERE expense_id IN ({placeholders})", misc_ids)
+        for expense_id in misc_ids:
+            db.catalog.drop_item(expense_id)
+
+    logging.info(f"Distributed and archived {len(misc_ids)} items. Total value: {format_money(total_misc_value)}")
+    # الصفوف الجديدة تُدمج في ملف الفترة إن كانت مختومة سابقًا
+    _seal(db, archive_key_id)
+    return MiscDistribution(archive_key_id, total_misc_value, shares)
+
+
+def _distribute_miscellaneous(cursor, distribution_date, weighting):
+    """توزيع قيمة النثريات على المشتركين حسب طريقة التوزيع (بعدد الوجبات افتراضيًا)"""
+    cursor.execute(
+        "SELECT COUNT(*), COALESCE(SUM(total_price), 0) FROM expenses WHERE is_miscellaneous = 1"
+    )
+    misc_count, total_misc_value = cursor.fetchone()
+    # إذا لم توجد نثريات، نكمل التقفيل بدون توزيع
+    if not misc_count:
+        logging.info("لا توجد أصناف نثريات للتوزيع")
+        return
+
+    shares = compute_shares(cursor, total_misc_value, weighting)
+    if not shares:
+        raise ValueError("لا توجد سجلات وجبات لتوزيع النثريات!")
+    apply_shares(cursor, shares, distribution_date)
+    logging.info(f"Distributed {misc_count} miscellaneous items. Total value: {format_money(total_misc_value)}")
+
+
+def _create_archive_key(cursor, first_date):
+    """إنشاء مفتاح أرشفة جديد بدون تحديث المفاتيح الموجودة"""
+    now_date = datetime.now().strftime("%Y-%m-%d")
+    now_dt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    archive_name = f"Dist_{first_date}_to_{now_date}"
+    cursor.execute(
+        "INSERT INTO archive_keys (archive_name, start_date, end_date, archived_at) VALUES (?, ?, ?, ?)",
+        (archive_name, first_date, now_date, now_dt)
+    )
+    return cursor.lastrowid
+
+
+def _archive_miscellaneous_expenses(cursor, archive_key_id):
+    """أرشفة أصناف النثريات بعد توزيعها وحذفها من المشتروات"""
+    cursor.execute("""
+        INSERT OR REPLACE INTO expenses_archive
+        (expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink, date, archive_key_id)
+        SELECT expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink, date, ?
+        FROM expenses WHERE is_miscellaneous = 1
+    """, (archive_key_id,))
+    cursor.execute("DELETE FROM expenses WHERE is_miscellaneous = 1")
+
+
+def _archive_members_data(cursor, archive_key_id):
+    """أرشفة بيانات الأعضاء قبل إنشاء الملخص"""
+    cursor.execute("""
+        INSERT INTO members_archive
+        SELECT member_id, name, rank, contribution, total_due, date, ?
+        FROM members
+    """, (archive_key_id,))
+
+
+def _save_monthly_closure(cursor, archive_key_id, closure_date):
+    """حفظ تقفيل الشهر في قاعدة البيانات"""
+    cursor.execute(
+        "INSERT INTO monthly_closures (closure_date, archive_key_id) VALUES (?, ?)",
+        (closure_date, archive_key_id)
+    )
+    return cursor.lastrowid
+
+
+def _save_closure_summaries(cursor, closure_id, archive_key_id):
+    """حفظ ملخص كل المشتركين المؤرشفين دفعة واحدة من العرض member_totals"""
+    # المتبقي = المساهمة - الاستهلاك (النثريات داخلة في الاستهلاك فلا تُطرح مرة ثانية)
+    cursor.execute("""
+        INSERT INTO closure_summary
+        (closure_id, member_id, total_meals, total_drinks, total_miscellaneous,
+         total_consumption, total_contribution, remaining_cash)
+        SELECT ?, t.member_id, t.meal_cost, t.drink_cost, t.misc_amount,
+               t.meal_cost + t.drink_cost + t.misc_amount,
+               t.contribution,
+               t.contribution - (t.meal_cost + t.drink_cost + t.misc_amount)
+        FROM member_totals t
+        JOIN members_archive ma ON ma.member_id = t.member_id AND ma.archive_key_id = ?
+        ORDER BY t.member_id
+    """, (closure_id, archive_key_id))
+
+
+def _get_remaining_items_total(cursor):
+    """حساب إجمالي قيمة الأصناف المتبقية في المشتروات"""
+    cursor.execute("""
+        SELECT SUM(remaining * price)
+        FROM expenses
+        WHERE remaining > 0
+    """)
+    total = cursor.fetchone()[0]
+    return total if total else 0
+
+
+def _save_monthly_totals(cursor, closure_id, archive_key_id):
+    """حفظ إجماليات الشهر في monthly_totals_archive من ملخص التقفيل"""
+    remaining_items = _get_remaining_items_total(cursor)
+    cursor.execute("""
+        INSERT INTO monthly_totals_archive (
+            archive_key_id, total_meals, total_drinks, total_misc,
+            total_consumption, total_contributions, remaining_items, remaining_cash
+        )
+        SELECT ?,
+               COALESCE(SUM(total_meals), 0),
+               COALESCE(SUM(total_drinks), 0),
+               COALESCE(SUM(total_miscellaneous), 0),
+               COALESCE(SUM(total_consumption), 0),
+               COALESCE(SUM(total_contribution), 0),
+               ?,
+               COALESCE(SUM(total_contribution), 0) - (COALESCE(SUM(total_consumption), 0) + ?)
+        FROM closure_summary
+        WHERE closure_id = ?
+    """, (archive_key_id, remaining_items, remaining_items, closure_id))
+
+
+def _archive_records(cursor, archive_key_id, closure_date, start_date, end_date):
+    """نسخ سجلات الفترة إلى جداول الأرشيف"""
+    # 1. أرشفة الوجبات
+    cursor.execute("""
+        INSERT INTO meal_records_archive
+        SELECT *, ? FROM meal_records
+        WHERE date BETWEEN ? AND ?
+    """, (archive_key_id, start_date, end_date))
+
+    # 2. أرشفة المشروبات (بأسماء الأعمدة لأن expense_id أُضيف بعد archive_key_id في الأرشيف)
+    cursor.execute("""
+        INSERT INTO drink_records_archive
+            (drink_record_id, date, drink_name, expense_id, member_id, quantity, total_cost, archive_key_id)
+        SELECT drink_record_id, date, drink_name, expense_id, member_id, quantity, total_cost, ?
+        FROM drink_records
+        WHERE date BETWEEN ? AND ?
+    """, (archive_key_id, start_date, end_date))
+
+    # 3. أرشفة توزيعات النثريات
+    cursor.execute("""
+        INSERT INTO miscellaneous_contributions_archive
+        SELECT *, ? FROM miscellaneous_contributions
+        WHERE distribution_date BETWEEN ? AND ?
+    """, (archive_key_id, start_date, end_date))
+
+    # 4. أرشفة المشتروات المستهلكة فقط
+    cursor.execute("""
+        INSERT INTO expenses_archive
+        SELECT expense_id, item_name, consumption, price,
+               (consumption * price) as total_price,
+               0 as consumption, remaining, is_miscellaneous, is_drink, ?, ?
+        FROM expenses
+        WHERE consumption > 0 AND date BETWEEN ? AND ?
+    """, (closure_date, archive_key_id, start_date, end_date))
+
+
+def _rollover_expenses(cursor, closure_date, start_date, end_date):
+    """تحديث جدول المشتروات لبداية شهر جديد"""
+    # حركة ترحيل تطرح المستهلك من الكمية والاستهلاك فتصبح الكمية = المتبقي
+    cursor.execute("""
+        INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date)
+        SELECT expense_id, 'rollover', -consumption, -consumption, ?
+        FROM expenses
+        WHERE consumption <> 0 AND date BETWEEN ? AND ?
+    """, (closure_date, start_date, end_date))
+    cursor.execute("""
+        UPDATE expenses
+        SET
+            total_price = remaining * price,
+            date = ?
+        WHERE date BETWEEN ? AND ?
+    """, (closure_date, start_date, end_date))
+
+
+def _clear_archived_data(cursor, closure_id, archive_key_id, start_date, end_date):
+    """تصفير الديون وحذف ما تمت أرشفته من الجداول الرئيسية"""
+    cursor.execute("UPDATE members SET total_due = 0")
+
+    cursor.execute("DELETE FROM miscellaneous_expenses WHERE date BETWEEN ? AND ?", (start_date, end_date))
+    cursor.execute("DELETE FROM meal_records WHERE date BETWEEN ? AND ?", (start_date, end_date))
+    cursor.execute("DELETE FROM drink_records WHERE date BETWEEN ? AND ?", (start_date, end_date))
+    cursor.execute("DELETE FROM miscellaneous_contributions WHERE distribution_date BETWEEN ? AND ?", (start_date, end_date))
+
+    # أرشفة ملخص الإغلاق وحذفه من الجدول الرئيسي
+    cursor.execute("""
+        INSERT INTO closure_summary_archive
+        SELECT s.*, ? FROM closure_summary s WHERE s.closure_id = ?
+    """, (archive_key_id, closure_id))
+    cursor.execute("DELETE FROM closure_summary WHERE closure_id = ?", (closure_id,))
+
+
+def close_period(db, weighting=DEFAULT_WEIGHTING, closure_date=None):
+    """تقفيل الشهر كاملًا في معاملة واحدة: إما أن يُحفظ كله أو يُلغى كله
+
+    كل مرحلة عملية واحدة على مستوى المجموعة (INSERT ... SELECT / UPDATE / DELETE)
+    بدل المرور على المشتركين أو السجلات واحدًا واحدًا. بعد الحفظ تُنقل الفترة إلى ملف
+    أرشيفها. تعيد ClosedPeriod مع زمن كل مرحلة.
+    """
+    timings = []
+
+    @contextmanager
+    def phase(name):
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        timings.append((name, elapsed))
+        logging.info(f"تقفيل الشهر - {name}: {elapsed * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    closure_date = closure_date or datetime.now().strftime("%Y-%m-%d")
+    with db.transaction() as cursor:
+        with phase("توزيع النثريات"):
+            _distribute_miscellaneous(cursor, closure_date, weighting)
+
+        with phase("مفتاح الأرشيف"):
+            first_date = first_transaction_date(cursor) or closure_date
+            archive_key_id = _create_archive_key(cursor, first_date)
+            cursor.execute(
+                "SELECT start_date, end_date FROM archive_keys WHERE archive_key_id = ?",
+                (archive_key_id,)
+            )
+            start_date, end_date = cursor.fetchone()
+
+        with phase("أرشفة النثريات"):
+            _archive_miscellaneous_expenses(cursor, archive_key_id)
+            # أصناف النثريات حُذفت، فتُعاد قراءة قوائم الاختيار بعد الحفظ
+            db.catalog.invalidate()
+
+        with phase("أرشفة المشتركين"):
+            _archive_members_data(cursor, archive_key_id)
+
+        with phase("ملخص التقفيل"):
+            closure_id = _save_monthly_closure(cursor, archive_key_id, closure_date)
+            _save_closure_summaries(cursor, closure_id, archive_key_id)
+            _save_monthly_totals(cursor, closure_id, archive_key_id)
+
+        with phase("أرشفة السجلات"):
+            _archive_records(cursor, archive_key_id, closure_date, start_date, end_date)
+
+        with phase("ترحيل المشتروات"):
+            _rollover_expenses(cursor, closure_date, start_date, end_date)
+
+        with phase("حذف السجلات المؤرشفة"):
+            _clear_archived_data(cursor, closure_id, archive_key_id, start_date, end_date)
+
+    total = time.perf_counter() - started
+    # ما تبقى من الزمن الكلي هو حفظ المعاملة
+    timings.append(("حفظ المعاملة", total - sum(elapsed for _, elapsed in timings)))
+    logging.info(f"تم تقفيل الشهر في {total * 1000:.1f} ms")
+
+    with phase("نقل الأرشيف إلى ملفه"):
+        _seal(db, archive_key_id)
+    return ClosedPeriod(archive_key_id, closure_id, timings)
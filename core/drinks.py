@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class DrinkSale:
+    """صرف مشروب لمشترك واحد"""
+    date: str
+    expense_id: int
+    member_id: int
+    quantity: int
+
+
+@dataclass
+class RecordedDrink:
+    drink_record_id: int
+    drink_name: str
+    total_cost: int
+
+
+def record_drinks(db, sales):
+    """تسجيل دفعة من صرف المشروبات (قائمة DrinkSale) في معاملة واحدة
+
+    الأصناف تُقرأ مرة واحدة والمتبقي يُتابع أثناء الدفعة، ثم تُدرج السجلات وحركات المخزون
+    وتُحدّث ديون المشتركين بعمليات مجمعة. تعيد RecordedDrink لكل صرف بنفس الترتيب.
+    """
+    sales = list(sales)
+    if not sales:
+        return []
+    with db.transaction() as cursor:
+        expense_ids = sorted({sale.expense_id for sale in sales})
+        placeholders = ", ".join("?" for _ in expense_ids)
+        cursor.execute(
+            f"SELECT expense_id, item_name, price, remaining FROM expenses "
+            f"WHERE expense_id IN ({placeholders}) AND is_drink = 1",
+            expense_ids
+        )
+        drinks = {row[0]: [row[1], row[2], row[3] or 0] for row in cursor.fetchall()}
+
+        rows = []
+        due = {}
+        for number, sale in enumerate(sales, start=1):
+            if sale.expense_id not in drinks:
+                raise ValueError(f"الصرف {number}: المشروب غير موجود")
+            drink = drinks[sale.expense_id]
+            if sale.quantity <= 0:
+                raise ValueError(f"الصرف {number}: الكمية يجب أن تكون أكبر من صفر")
+            if sale.quantity > drink[2]:
+                raise ValueError(f"الصرف {number}: الكمية المطلوبة من {drink[0]} تتجاوز الكمية المتاحة")
+            drink[2] -= sale.quantity
+            total_cost = sale.quantity * drink[1]
+            due[sale.member_id] = due.get(sale.member_id, 0) + total_cost
+            # drink_name يحفظ اسم الصنف وقت التسجيل للعرض فقط
+            rows.append((sale.date, drink[0], sale.expense_id, sale.member_id, sale.quantity, total_cost))
+
+        cursor.execute("SELECT COALESCE(MAX(drink_record_id), 0) FROM drink_records")
+        last_record_id = cursor.fetchone()[0]
+        cursor.executemany("""
+            INSERT INTO drink_records (date, drink_name, expense_id, member_id, quantity, total_cost)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        # حركة استهلاك لكل سجل في دفتر المخزون (المشغل يحدّث الاستهلاك والمتبقي)
+        cursor.execute("""
+            INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date, ref_id)
+            SELECT expense_id, 'drink', 0, quantity, date, drink_record_id
+            FROM drink_records
+            WHERE drink_record_id > ?
+            ORDER BY drink_record_id
+        """, (last_record_id,))
+        cursor.executemany("UPDATE members SET total_due = total_due + ? WHERE member_id = ?",
+                           [(amount, member_id) for member_id, amount in due.items()])
+        cursor.execute("SELECT drink_record_id FROM drink_records WHERE drink_record_id > ? ORDER BY drink_record_id",
+                       (last_record_id,))
+        record_ids = [row[0] for row in cursor.fetchall()]
+
+    return [RecordedDrink(record_id, row[1], row[5]) for record_id, row in zip(record_ids, rows)]
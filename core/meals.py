@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from utils.distribution import allocate
+
+
+@dataclass
+class Meal:
+    """وجبة واحدة لمجموعة مشتركين
+
+    items: {expense_id: الكمية} من الأصناف المستهلكة، و misc_amount مبلغ نثريات الوجبة
+    بالقروش (يُقسم بالتساوي مثل التكلفة).
+    """
+    date: str
+    meal_type: str
+    member_ids: list
+    items: dict = field(default_factory=dict)
+    misc_amount: int = 0
+
+
+@dataclass
+class RecordedMeal:
+    meal_record_ids: list
+    total_cost: int
+    misc_amount: int
+
+
+def _record_one(cursor, meal):
+    # الصنف المتروك بكمية صفر في النموذج لا يُستهلك منه شيء فيُتجاهل
+    items = {expense_id: quantity for expense_id, quantity in meal.items.items() if quantity != 0}
+
+    # أسعار الأصناف والمتبقي منها باستعلام واحد؛ المتبقي يُقرأ داخل المعاملة فيشمل ما استهلكته وجبات الدفعة السابقة
+    prices = {}
+    if items:
+        placeholders = ", ".join("?" for _ in items)
+        cursor.execute(
+            f"SELECT expense_id, item_name, price, remaining FROM expenses WHERE expense_id IN ({placeholders})",
+            list(items)
+        )
+        stock = {row[0]: row[1:] for row in cursor.fetchall()}
+        for expense_id, quantity in items.items():
+            if expense_id not in stock:
+                raise ValueError(f"الصنف {expense_id} غير موجود")
+            item_name, price, remaining = stock[expense_id]
+            if quantity < 0:
+                raise ValueError(f"كمية {item_name} لا يمكن أن تكون سالبة")
+            if quantity > (remaining or 0):
+                raise ValueError(f"الكمية المطلوبة لـ {item_name} غير متوفرة")
+            prices[expense_id] = price
+    total_cost = sum(quantity * prices[expense_id] for expense_id, quantity in items.items())
+
+    # حصة كل عضو من التكلفة والنثريات بالقروش؛ مجموع الحصص يساوي الإجمالي تمامًا
+    equal_weights = [1] * len(meal.member_ids)
+    meal_shares = allocate(total_cost, equal_weights)
+    misc_shares = allocate(meal.misc_amount, equal_weights) if meal.misc_amount else [0] * len(meal.member_ids)
+
+    cursor.executemany("UPDATE members SET total_due = total_due + ? WHERE member_id = ?",
+                       [(meal_share + misc_share, member_id)
+                        for member_id, meal_share, misc_share in zip(meal.member_ids, meal_shares, misc_shares)])
+
+    # إدراج سجلات الوجبات دفعة واحدة؛ المعاملة تحجز الكتابة فالمعرفات الجديدة كلها بعد last_record_id
+    cursor.execute("SELECT COALESCE(MAX(meal_record_id), 0) FROM meal_records")
+    last_record_id = cursor.fetchone()[0]
+    cursor.executemany("INSERT INTO meal_records (meal_type, date, member_id, final_cost) VALUES (?, ?, ?, ?)",
+                       [(meal.meal_type, meal.date, member_id, meal_share)
+                        for member_id, meal_share in zip(meal.member_ids, meal_shares)])
+    cursor.execute("SELECT meal_record_id FROM meal_records WHERE meal_record_id > ? ORDER BY meal_record_id",
+                   (last_record_id,))
+    record_ids = [row[0] for row in cursor.fetchall()]
+
+    # تسجيل الاستهلاك في دفتر المخزون (المشغل يحدّث المتبقي في expenses)؛
+    # ref_id هو أول سجل وجبة في الدفعة فتُعرف الوجبة التي استُهلك فيها الصنف
+    cursor.executemany("""
+        INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date, ref_id)
+        VALUES (?, 'meal', 0, ?, ?, ?)
+    """, [(expense_id, quantity, meal.date, record_ids[0]) for expense_id, quantity in items.items()])
+
+    # المصروف النثري المرتبط بكل سجل وجبة أُدرج الآن (بنفس ترتيب الأعضاء والحصص)
+    if meal.misc_amount:
+        cursor.executemany("""
+            INSERT INTO miscellaneous_expenses (date, amount, meal_type, meal_record_id, member_id)
+            SELECT date, ?, meal_type, meal_record_id, member_id
+            FROM meal_records
+            WHERE meal_record_id = ?
+        """, list(zip(misc_shares, record_ids)))
+
+    return RecordedMeal(record_ids, total_cost, meal.misc_amount)
+
+
+def record_meal(db, meals):
+    """تسجيل دفعة من الوجبات (قائمة Meal) في معاملة واحدة: تُحفظ كلها أو لا يُحفظ شيء
+
+    تعيد RecordedMeal لكل وجبة بنفس الترتيب، وترفع ValueError (مع رقم الوجبة) عند
+    بيانات غير صالحة أو كمية غير متوفرة.
+    """
+    results = []
+    with db.transaction() as cursor:
+        for number, meal in enumerate(meals, start=1):
+            if not meal.member_ids:
+                raise ValueError(f"الوجبة {number}: لم يتم اختيار أي أعضاء")
+            try:
+                results.append(_record_one(cursor, meal))
+            except ValueError as e:
+                raise ValueError(f"الوجبة {number}: {e}") from e
+    return results
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from datetime import datetime
+from utils.money import divide
+
+
+@dataclass
+class Purchase:
+    """شراء صنف: total_price بالقروش، والتاريخ الحالي إن لم يُحدد"""
+    item_name: str
+    quantity: int
+    total_price: int
+    is_miscellaneous: bool = False
+    is_drink: bool = False
+    date: str = None
+
+
+@dataclass
+class RecordedPurchase:
+    expense_id: int
+    created: bool
+    unit_price: int
+
+
+def add_purchase(db, purchases):
+    """تسجيل دفعة من المشتروات (قائمة Purchase) في معاملة واحدة
+
+    الصنف الموجود بنفس الاسم يُضاف إلى كميته ويُعاد حساب متوسط سعر الوحدة، والجديد يُنشأ
+    برصيد فارغ؛ الكمية نفسها تدخل عبر حركة شراء في دفتر المخزون.
+    """
+    results = []
+    with db.transaction() as cursor:
+        for number, purchase in enumerate(purchases, start=1):
+            if not purchase.item_name or purchase.quantity <= 0 or purchase.total_price <= 0:
+                raise ValueError(f"الشراء {number}: يرجى ملء جميع الحقول بشكل صحيح")
+            date = purchase.date or datetime.now().strftime("%Y-%m-%d")
+            cursor.execute("SELECT expense_id, quantity, price FROM expenses WHERE item_name = ?", (purchase.item_name,))
+            existing = cursor.fetchone()
+
+            # النثريات تُستهلك بالكامل عند الشراء فلا يبقى لها رصيد
+            consumed = purchase.quantity if purchase.is_miscellaneous else 0
+
+            if existing:
+                expense_id, old_qty, old_price = existing
+                new_total = (old_price * old_qty) + purchase.total_price
+                unit_price = divide(new_total, old_qty + purchase.quantity)
+                cursor.execute(
+                    "UPDATE expenses SET price=?, total_price=?, is_miscellaneous=?, is_drink=?, date=? WHERE expense_id=?",
+                    (unit_price, new_total, purchase.is_miscellaneous, purchase.is_drink, date, expense_id)
+                )
+            else:
+                unit_price = divide(purchase.total_price, purchase.quantity)
+                cursor.execute(
+                    "INSERT INTO expenses (item_name, quantity, price, total_price, remaining, consumption, is_miscellaneous, is_drink, date) VALUES (?, 0, ?, ?, 0, 0, ?, ?, ?)",
+                    (purchase.item_name, unit_price, purchase.total_price, purchase.is_miscellaneous, purchase.is_drink, date)
+                )
+                expense_id = cursor.lastrowid
+            # قوائم الاختيار تُحدّث بعد حفظ المعاملة (الصنف الجديد أو نوعه المعدل)
+            db.catalog.put_item(expense_id, purchase.item_name, purchase.is_drink, purchase.is_miscellaneous)
+
+            # حركة شراء في دفتر المخزون
+            cursor.execute(
+                "INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date) VALUES (?, 'purchase', ?, ?, ?)",
+                (expense_id, purchase.quantity, consumed, date)
+            )
+            results.append(RecordedPurchase(expense_id, existing is None, unit_price))
+    return results
@@ -1,37 +1,24 @@
+import sys
+from utils import startup_profiler
+
+# --profile-startup يطبع تفصيل زمن الإقلاع والاستيرادات بعد ظهور أول إطار
+if "--profile-startup" in sys.argv:
+    startup_profiler.enable()
+
+import threading
 import flet as ft
-from screeninfo import get_monitors
-from pages.main_page import MainPage
-from pages.input_page import InputPage
-from pages.view_page import ViewPage
-from pages.input_subscribers import InputSubscribersPage
-from pages.input_purchases import InputPurchasesPage
-from pages.show_subscribers import ShowSubscribersPage
-from pages.show_purchases import ShowPurchasesPage
-from pages.show_over import ShowOverPage
-from pages.distribute_expenses import DistributeExpensesPage
-from pages.drink_page import DrinkPage
-from pages.meal_page import MealPage
-from pages.reports_page.reports_page import ReportsPage
-from pages.end_month_page.end_month_page import EndMonthPage
 from utils.database import DatabaseManager
+from utils.page_registry import PageRegistry, CACHE_STATIC, CACHE_DATA, CACHE_NONE
 import logging
 
 # إعداد الـ Logging
 logging.basicConfig(level=logging.INFO)
+startup_profiler.mark("الاستيرادات")
 
-def main(page: ft.Page):
-    # إعدادات الصفحة
-    page.title = "برنامج توزيع المصاريات"
-    page.theme_mode = ft.ThemeMode.LIGHT
-    page.padding = 0
-
-    # تحديد حجم النافذة وإمكانية تغيير الحجم
-    page.window.width = 800
-    page.window.height = 600
-    page.window.resizable = True
-
-    # حساب موقع النافذة لفتحها في منتصف الشاشة
+def center_window(page):
+    """توسيط النافذة على الشاشة الأساسية؛ تعمل بعد ظهور أول إطار حتى لا تؤخر الإقلاع"""
     try:
+        from screeninfo import get_monitors
         monitors = get_monitors()
         if monitors:
             primary_monitor = monitors[0]
@@ -43,9 +30,22 @@ def main(page: ft.Page):
 
             page.window.left = window_left
             page.window.top = window_top
+            page.update()
     except Exception as e:
         print(f"حدث خطأ أثناء تعيين موقع النافذة: {e}")
 
+
+def main(page: ft.Page):
+    # إعدادات الصفحة
+    page.title = "برنامج توزيع المصاريات"
+    page.theme_mode = ft.ThemeMode.LIGHT
+    page.padding = 0
+
+    # تحديد حجم النافذة وإمكانية تغيير الحجم
+    page.window.width = 800
+    page.window.height = 600
+    page.window.resizable = True
+
     # تعيين الخط اليدوي
     page.fonts = {
         "DancingScript": "utils/1.ttf"
@@ -56,7 +56,9 @@ def main(page: ft.Page):
     background_image = ft.Image(src="utils/3.jpg", fit=ft.ImageFit.COVER, expand=True)
     
     # إنشاء اتصال مركزي بقاعدة البيانات
-    db = DatabaseManager()
+    # --profile-queries يقيس زمن الاستعلامات ويسجل البطيء منها (صفحة تشخيص الأداء)
+    db = DatabaseManager(profile_queries="--profile-queries" in sys.argv)
+    startup_profiler.mark("فتح قاعدة البيانات")
     
     # --- إغلاق الاتصال عند إغلاق النافذة ---
     def on_window_close(e):
@@ -65,35 +67,29 @@ def main(page: ft.Page):
             page.window.destroy()
     page.window.on_close = on_window_close
 
-    # إنشاء الصفحات مع تمرير الاتصال المركزي
-    pages = {
-        "main_page": MainPage(page, background_image, db),
-        "input_page": InputPage(page, background_image, db),
-        "view_page": ViewPage(page, background_image, db),
-        "input_subscribers": InputSubscribersPage(page, background_image, db),
-        "input_purchases": InputPurchasesPage(page, background_image, db),
-        "show_subscribers": ShowSubscribersPage(page, background_image, db),
-        "show_purchases": ShowPurchasesPage(page, background_image, db),
-        "show_over": ShowOverPage(page, background_image, db),
-        "distribute_expenses": DistributeExpensesPage(page, background_image, db),
-        "drink_page": DrinkPage(page, background_image, db),
-        "reports_page": ReportsPage(page, background_image, db),
-        "end_month_page": EndMonthPage(page, background_image, db),
-        "meal_page": MealPage(page, background_image, db)
-    }
+    # تسجيل الصفحات مع تمرير الاتصال المركزي؛ كل صفحة تُنشأ عند أول زيارة لها
+    pages = PageRegistry(page, background_image, db)
+    # الوحدات تُستورد عند أول زيارة للصفحة فلا تُحمل صفحات التقارير والتصدير مع الإقلاع
+    pages.register("main_page", "pages.main_page:MainPage", cache=CACHE_STATIC)
+    pages.register("input_page", "pages.input_page:InputPage", cache=CACHE_STATIC)
+    pages.register("view_page", "pages.view_page:ViewPage", cache=CACHE_STATIC)
+    pages.register("reports_page", "pages.reports_page.reports_page:ReportsPage", cache=CACHE_STATIC)
+    pages.register("end_month_page", "pages.end_month_page.end_month_page:EndMonthPage", cache=CACHE_STATIC)
+    pages.register("show_subscribers", "pages.show_subscribers:ShowSubscribersPage", cache=CACHE_DATA)
+    pages.register("show_purchases", "pages.show_purchases:ShowPurchasesPage", cache=CACHE_DATA)
+    pages.register("show_over", "pages.show_over:ShowOverPage", cache=CACHE_DATA)
+    pages.register("input_subscribers", "pages.input_subscribers:InputSubscribersPage", cache=CACHE_NONE)
+    pages.register("input_purchases", "pages.input_purchases:InputPurchasesPage", cache=CACHE_NONE)
+    pages.register("distribute_expenses", "pages.distribute_expenses:DistributeExpensesPage", cache=CACHE_NONE)
+    pages.register("drink_page", "pages.drink_page:DrinkPage", cache=CACHE_NONE)
+    pages.register("meal_page", "pages.meal_page:MealPage", cache=CACHE_NONE)
+    pages.register("diagnostics_page", "pages.diagnostics_page:DiagnosticsPage", cache=CACHE_NONE)
 
     # تعيين الصفحة الرئيسية
-    page.add(pages["main_page"].get_content())
-
-    # وظيفة للتنقل بين الصفحات
-    def navigate(page_name):
-        page.clean()
-        if page_name in pages:
-            page.add(pages[page_name].get_content())
-        page.update()
+    page.add(pages.content("main_page"))
+    startup_profiler.mark("أول إطار")
+    startup_profiler.report()
 
-    # تمرير دالة التنقل إلى الصفحات
-    for page_instance in pages.values():
-        page_instance.set_navigate(navigate)
+    threading.Thread(target=center_window, args=(page,), daemon=True).start()
 
 ft.app(target=main)
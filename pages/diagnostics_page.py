@@ -0,0 +1,152 @@
+import flet as ft
+from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+
+# طول نص الاستعلام المعروض في الجدول (النص الكامل يظهر عند اختيار الصف)
+QUERY_PREVIEW = 70
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+
+def _preview(query):
+    return query if len(query) <= QUERY_PREVIEW else query[:QUERY_PREVIEW] + "…"
+
+
+class DiagnosticsPage:
+    """تشخيص الأداء: إحصاءات الاستعلامات والبطيء منها مع خطة التنفيذ (مع --profile-queries)"""
+
+    def __init__(self, page, background_image, db):
+        self.page = page
+        self.navigate = None
+        self.background_image = background_image
+        self.db = db
+
+    def set_navigate(self, navigate):
+        self.navigate = navigate
+
+    def get_statement_rows(self):
+        return [
+            {
+                "caller": stats.caller,
+                "query": _preview(stats.query),
+                "full_query": stats.query,
+                "count": stats.count,
+                "total": _ms(stats.total),
+                "mean": _ms(stats.mean),
+                "max": _ms(stats.max),
+                "rows": stats.rows,
+                "plan": "",
+            }
+            for stats in self.db.profiler.statements()
+        ]
+
+    def get_slow_rows(self):
+        return [
+            {
+                "at": slow.at.strftime("%H:%M:%S"),
+                "caller": slow.caller,
+                "query": _preview(slow.query),
+                "full_query": slow.query,
+                "elapsed": _ms(slow.elapsed),
+                "rows": slow.rows,
+                "plan": slow.plan,
+            }
+            for slow in self.db.profiler.slow_queries()
+        ]
+
+    def get_content(self):
+        profiler = self.db.profiler
+        title = ft.Text(
+            "تشخيص الأداء",
+            size=40,
+            weight=ft.FontWeight.BOLD,
+            color=ft.colors.WHITE,
+            text_align=ft.TextAlign.CENTER,
+            font_family="DancingScript",
+        )
+
+        status = ft.Text(
+            f"القياس مفعل، الحد {profiler.slow_ms} ms، السجل: {profiler.log_path or 'غير متاح'}"
+            if profiler.enabled else "القياس غير مفعل؛ شغّل البرنامج مع --profile-queries",
+            color=ft.colors.WHITE,
+            text_align=ft.TextAlign.CENTER,
+        )
+
+        self.statements_table = VirtualTable(
+            [("الصفوف", "rows", 70), ("الأقصى ms", "max", 80), ("المتوسط ms", "mean", 80),
+             ("الإجمالي ms", "total", 90), ("المرات", "count", 60), ("الاستعلام", "query", 250),
+             ("المصدر", "caller", 150)],
+            self.get_statement_rows(),
+            height=200,
+            width=780,
+            on_select=self.show_details,
+            header_color=ft.colors.GREEN,
+            bgcolor=ft.colors.LIGHT_GREEN,
+            border_color=None,
+        )
+
+        self.slow_table = VirtualTable(
+            [("الصفوف", "rows", 70), ("الزمن ms", "elapsed", 80), ("الاستعلام", "query", 330),
+             ("المصدر", "caller", 150), ("الوقت", "at", 80)],
+            self.get_slow_rows(),
+            height=160,
+            width=710,
+            on_select=self.show_details,
+            header_color=ft.colors.RED,
+            bgcolor=ft.colors.WHITE,
+            border_color=None,
+        )
+
+        self.details = ft.TextField(
+            label="الاستعلام وخطة التنفيذ",
+            multiline=True,
+            read_only=True,
+            min_lines=3,
+            max_lines=6,
+            text_size=12,
+            width=780,
+            bgcolor=ft.colors.WHITE,
+        )
+
+        btn_refresh = create_button("تحديث", lambda e: self.update_tables(), bgcolor=ft.colors.GREEN)
+        btn_reset = create_button("مسح القياسات", lambda e: self.reset(), bgcolor=ft.colors.AMBER)
+        btn_back = create_button("رجوع", lambda e: self.navigate("view_page"), bgcolor=ft.colors.RED)
+
+        content = ft.Container(
+            content=ft.Column(
+                [
+                    title,
+                    status,
+                    self.statements_table.control,
+                    ft.Text("الاستعلامات البطيئة الأخيرة", color=ft.colors.WHITE, weight=ft.FontWeight.BOLD),
+                    self.slow_table.control,
+                    self.details,
+                    ft.Row([btn_back, btn_reset, btn_refresh], alignment=ft.MainAxisAlignment.CENTER, spacing=20),
+                ],
+                alignment=ft.MainAxisAlignment.START,
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                scroll=ft.ScrollMode.AUTO,
+                spacing=8,
+            ),
+            image_src=self.background_image.src,
+            image_fit=ft.ImageFit.COVER,
+            expand=True,
+        )
+
+        return content
+
+    def show_details(self, row):
+        self.details.value = row["full_query"] + (f"\n\n{row['plan']}" if row["plan"] else "")
+        self.page.update()
+
+    def update_tables(self):
+        self.statements_table.set_rows(self.get_statement_rows(), update=False)
+        self.slow_table.set_rows(self.get_slow_rows(), update=False)
+        self.details.value = ""
+        self.page.update()
+
+    def reset(self):
+        self.db.profiler.reset()
+        self.update_tables()
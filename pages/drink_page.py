@@ -1,4 +1,5 @@
 import flet as ft
+from core import DrinkSale, record_drinks
 from utils.button_utils import create_button
 from datetime import datetime
 import sqlite3
@@ -71,14 +72,13 @@ class DrinkPage:
         return container
 
     def get_drink_options(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT item_name FROM expenses WHERE is_drink = 1")
-        return [ft.dropdown.Option(row[0]) for row in cursor.fetchall()]
+        # المفتاح expense_id والنص اسم الصنف، فلا يُبحث عن الصنف بالاسم عند الحفظ
+        rows = self.db.catalog.items(drink=True)
+        return [ft.dropdown.Option(key=str(expense_id), text=name) for expense_id, name in rows]
 
     def get_member_options(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT member_id, rank || ' ' || name FROM members")
-        return [ft.dropdown.Option(f"{row[0]} - {row[1]}") for row in cursor.fetchall()]
+        rows = self.db.catalog.member_labels()
+        return [ft.dropdown.Option(key=str(member_id), text=f"{member_id} - {label}") for member_id, label in rows]
 
     ### دالة جديدة لإعادة تعيين الحقول ###
     def reset_fields(self):
@@ -88,75 +88,19 @@ class DrinkPage:
         self.member_var.value = None  # إعادة تعيين اختيار الشخص لقيمة فارغة
         self.page.update()  # تحديث الصفحة لعرض التغييرات
     def save_drink_distribution(self, e):
-        drink_name = self.drink_var.value
+        expense_id = self.drink_var.value
         quantity = int(self.quantity_var.value) if self.quantity_var.value else 0
-        member_info = self.member_var.value
+        member_id = self.member_var.value
         date = self.date_var.value
 
-        if drink_name and quantity > 0 and member_info and date:
+        if expense_id and quantity > 0 and member_id and date:
             try:
-                cursor = self.db.conn.cursor()
-                member_id = member_info.split(" - ")[0]
-                
-                # جلب سعر الوحدة والكمية الأصلية (بدون الاعتماد على القيم السابقة للاستهلاك)
-                cursor.execute("""
-                    SELECT price, quantity 
-                    FROM expenses 
-                    WHERE item_name = ? AND is_drink = 1
-                """, (drink_name,))
-                price_data = cursor.fetchone()
-
-                if price_data:
-                    unit_price, original_quantity = price_data
-                    
-                    # حساب إجمالي الكمية المستهلكة حتى الآن
-                    cursor.execute("""
-                        SELECT SUM(quantity) 
-                        FROM drink_records 
-                        WHERE drink_name = ?
-                    """, (drink_name,))
-                    total_consumed = cursor.fetchone()[0] or 0
-                    
-                    # الكمية الجديدة التي سيتم استهلاكها
-                    new_consumption = quantity
-                    total_consumed_after = total_consumed + new_consumption
-                    
-                    if total_consumed_after <= original_quantity:
-                        total_cost = new_consumption * unit_price
-                        
-                        # تحديث دين العضو
-                        cursor.execute("""
-                            UPDATE members 
-                            SET total_due = total_due + ? 
-                            WHERE member_id = ?
-                        """, (total_cost, member_id))
-                        
-                        # تحديث جدول المشتروات:
-                        # 1. تحديث كمية الاستهلاك (إجمالي الكمية المستهلكة)
-                        # 2. تحديث المتبقيات (الكمية الأصلية - إجمالي المستهلك)
-                        cursor.execute("""
-                            UPDATE expenses 
-                            SET 
-                                consumption = ?,
-                                remaining = ?
-                            WHERE item_name = ?
-                        """, (total_consumed_after, original_quantity - total_consumed_after, drink_name))
-                        
-                        # تسجيل عملية التوزيع
-                        cursor.execute("""
-                            INSERT INTO drink_records (date, drink_name, member_id, quantity, total_cost) 
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (date, drink_name, member_id, new_consumption, total_cost))
-                        
-                        self.db.conn.commit()
-                        self.show_snackbar("تم توزيع المشروبات بنجاح!")
-                        self.reset_fields()
-                    else:
-                        self.show_snackbar("الكمية المطلوبة تتجاوز الكمية المتاحة.")
-                else:
-                    self.show_snackbar("المشروب غير موجود.")
+                record_drinks(self.db, [DrinkSale(date, int(expense_id), int(member_id), quantity)])
+                self.show_snackbar("تم توزيع المشروبات بنجاح!")
+                self.reset_fields()
+            except ValueError as e:
+                self.show_snackbar(str(e))
             except sqlite3.Error as e:
-                self.db.conn.rollback()
                 self.show_snackbar(f"حدث خطأ أثناء توزيع المشروبات: {e}")
         else:
             self.show_snackbar("يرجى ملء جميع الحقول بشكل صحيح.")
@@ -169,5 +113,4 @@ class DrinkPage:
         self.page.update()
 
     def close_connection(self, e):
-        if self.db.conn:
-            self.db.conn.close()
+        self.db.close_connection()
@@ -73,10 +73,13 @@ class ClearData:
                 self.show_snackbar("لم يتم اختيار أي جداول!")
                 return
 
-            with self.db.conn:
-                cursor = self.db.conn.cursor()
+            # كل الجداول المختارة تُمسح معًا أو لا يُمسح شيء
+            with self.db.transaction() as cursor:
                 for table in tables:
                     cursor.execute(f"DELETE FROM {table}")
+                if "members" in tables or "expenses" in tables:
+                    # قوائم الاختيار تُعاد قراءتها بعد الحفظ
+                    self.db.catalog.invalidate()
 
             self.show_snackbar("تم المسح بنجاح!")
             # إذا كان هناك نقل إلى صفحة معينة بعد المسح:
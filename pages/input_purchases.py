@@ -1,5 +1,8 @@
 import flet as ft
 from utils.button_utils import create_button
+from core import Purchase, add_purchase
+from utils.money import parse_money
+from utils.search import suggest, Debouncer, SUGGESTION_LIMIT
 from datetime import datetime  # لإضافة التاريخ
 
 class InputPurchasesPage:
@@ -47,13 +50,14 @@ class InputPurchasesPage:
             label_position=ft.LabelPosition.LEFT,
         )
 
+        # البحث يُنفذ بعد توقف الكتابة لا مع كل حرف
+        self.search_items_later = Debouncer(self.search_similar_items)
+
     def set_navigate(self, navigate):
         self.navigate = navigate
 
     def get_expense_options(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT DISTINCT item_name FROM expenses")
-        return [ft.dropdown.Option(row[0]) for row in cursor.fetchall()]
+        return [ft.dropdown.Option(name) for name in self.db.catalog.item_names()]
 
     def open_add_item_dialog(self, e):
         self.new_item_name_field = ft.TextField(
@@ -61,9 +65,17 @@ class InputPurchasesPage:
             width=300,
             height=50,
             bgcolor="#f0f0f0",
-            on_change=self.search_similar_items
+            on_change=self.search_items_later
         )
-        self.similar_items_list = ft.Column()
+        # أزرار الاقتراحات تُنشأ مرة واحدة وتُعاد تعبئتها مع كل بحث
+        self.similar_item_buttons = [
+            ft.TextButton(
+                content=ft.Text("", size=14, color="black"),
+                visible=False,
+                on_click=lambda e: self.select_similar_item(e.control.data)
+            ) for _ in range(SUGGESTION_LIMIT)
+        ]
+        self.similar_items_list = ft.Column(self.similar_item_buttons)
 
         self.add_item_dialog = ft.AlertDialog(
             title=ft.Text("إضافة صنف جديد"),
@@ -90,24 +102,14 @@ class InputPurchasesPage:
         self.add_item_dialog.open = True
         self.page.update()
 
-    def search_similar_items(self, e):
-        search_query = self.new_item_name_field.value.strip().lower()
-        if not search_query:
-            self.similar_items_list.controls = []
-            self.page.update()
-            return
-
-        similar_items = self.db.fetch_all(
-            "SELECT item_name FROM expenses WHERE LOWER(item_name) LIKE ?",
-            (f"%{search_query}%",)
-        )
-        similar_items = [item[0] for item in similar_items]
-        self.similar_items_list.controls = [
-            ft.TextButton(
-                content=ft.Text(item, size=14, color="black"),
-                on_click=lambda e, item=item: self.select_similar_item(item)
-            ) for item in similar_items
-        ]
+    def search_similar_items(self, e=None):
+        # فهرس الأسماء يوحد الهمزات والتاء المربوطة ويرتب النتائج ويحد عددها
+        similar_items = suggest(self.db, "items", self.new_item_name_field.value)
+        for index, button in enumerate(self.similar_item_buttons):
+            button.visible = index < len(similar_items)
+            if button.visible:
+                button.data = similar_items[index]
+                button.content.value = similar_items[index]
         self.page.update()
 
     def select_similar_item(self, selected_item):
@@ -131,12 +133,12 @@ class InputPurchasesPage:
         # إضافة التاريخ الحالي
         current_date = datetime.now().strftime("%Y-%m-%d")
 
-        cursor = self.db.conn.cursor()
-        cursor.execute(
-            "INSERT INTO expenses (item_name, quantity, price, total_price, remaining, consumption, date) VALUES (?, 0, 0, 0, 0, 0, ?)",
-            (new_item, current_date)
-        )
-        self.db.conn.commit()
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO expenses (item_name, quantity, price, total_price, remaining, consumption, date) VALUES (?, 0, 0, 0, 0, 0, ?)",
+                (new_item, current_date)
+            )
+            self.db.catalog.put_item(cursor.lastrowid, new_item)
 
         self.item_name_dropdown.options = self.get_expense_options()
         self.item_name_dropdown.value = new_item
@@ -144,6 +146,7 @@ class InputPurchasesPage:
         self.page.update()
 
     def close_add_item_dialog(self, e=None):
+        self.search_items_later.cancel()
         self.add_item_dialog.open = False
         self.page.update()
 
@@ -157,51 +160,18 @@ class InputPurchasesPage:
         try:
             item_name = self.item_name_dropdown.value
             quantity = int(self.quantity_field.value)
-            total_price = float(self.total_price_field.value)
+            total_price = parse_money(self.total_price_field.value)
 
             if not all([item_name, quantity > 0, total_price > 0]):
                 self.show_snackbar("يرجى ملء جميع الحقول بشكل صحيح!")
                 return
 
-            # إضافة التاريخ الحالي
-            current_date = datetime.now().strftime("%Y-%m-%d")
-
-            cursor = self.db.conn.cursor()
-
-            # Get existing item data
-            cursor.execute("SELECT quantity, price, consumption, is_miscellaneous, is_drink FROM expenses WHERE item_name = ?", (item_name,))
-            result = cursor.fetchone()
-
-            # Determine consumption and remaining based on is_miscellaneous
-            is_miscellaneous = self.is_miscellaneous_check.value
-            new_consumption = quantity if is_miscellaneous else 0
-            new_remaining = 0 if is_miscellaneous else None  # Will be set later based on context
-
-            if result:
-                # Update existing item
-                old_qty, old_price, old_consumption, old_is_miscellaneous, old_is_drink = result
-                new_qty = old_qty + quantity
-                new_total = (old_price * old_qty) + total_price
-                new_price = new_total / new_qty
-                new_is_miscellaneous = self.is_miscellaneous_check.value
-                new_is_drink = self.is_drink_check.value
-                new_consumption = old_consumption + quantity if is_miscellaneous else old_consumption
-                new_remaining = 0 if is_miscellaneous else new_qty
-
-                cursor.execute(
-                    "UPDATE expenses SET quantity=?, price=?, total_price=?, remaining=?, consumption=?, is_miscellaneous=?, is_drink=?, date=? WHERE item_name=?",
-                    (new_qty, new_price, new_total, new_remaining, new_consumption, new_is_miscellaneous, new_is_drink, current_date, item_name)
-                )
-            else:
-                # Insert new item
-                unit_price = total_price / quantity
-                new_remaining = 0 if is_miscellaneous else quantity
-                cursor.execute(
-                    "INSERT INTO expenses (item_name, quantity, price, total_price, remaining, consumption, is_miscellaneous, is_drink, date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (item_name, quantity, unit_price, total_price, new_remaining, new_consumption, self.is_miscellaneous_check.value, self.is_drink_check.value, current_date)
-                )
+            add_purchase(self.db, [Purchase(
+                item_name, quantity, total_price,
+                is_miscellaneous=self.is_miscellaneous_check.value,
+                is_drink=self.is_drink_check.value,
+            )])
 
-            self.db.conn.commit()
             self.reset_form()
             self.show_snackbar("تم الحفظ بنجاح!")
 
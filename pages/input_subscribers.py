@@ -1,5 +1,7 @@
 import flet as ft
 from utils.button_utils import create_button
+from utils.money import parse_money
+from utils.search import suggest, Debouncer, SUGGESTION_LIMIT
 from datetime import datetime  # لإضافة التاريخ
 
 class InputSubscribersPage:
@@ -24,19 +26,30 @@ class InputSubscribersPage:
             bgcolor="#f0f0f0",
         )
 
+        # البحث يُنفذ بعد توقف الكتابة لا مع كل حرف
+        self.search_names_later = Debouncer(self.search_similar_names)
+
         self.name_field = ft.TextField(
             label="اسم المشترك",
             width=300,
             height=50,
             bgcolor="#f0f0f0",
-            on_change=self.search_similar_names,
+            on_change=self.search_names_later,
         )
 
+        # أزرار الاقتراحات تُنشأ مرة واحدة وتُعاد تعبئتها مع كل بحث
+        self.similar_name_buttons = [
+            ft.TextButton(
+                content=ft.Text("", size=14, color=ft.colors.WHITE, width=300),
+                visible=False,
+                on_click=lambda e: self.select_similar_name(e.control.data)
+            ) for _ in range(SUGGESTION_LIMIT)
+        ]
         self.similar_names_list = ft.ListView(
+            self.similar_name_buttons,
             expand=True,
             spacing=5,
             padding=10,
-            auto_scroll=True,
             height=100,
         )
 
@@ -51,24 +64,14 @@ class InputSubscribersPage:
     def set_navigate(self, navigate):
         self.navigate = navigate
 
-    def search_similar_names(self, e):
-        search_query = self.name_field.value.strip().lower()
-        if not search_query:
-            self.similar_names_list.controls = []
-            self.page.update()
-            return
-        similar_names = self.db.fetch_all(
-              "SELECT name FROM members WHERE LOWER(name) LIKE ?",(f"%{search_query}%",)
-        )
-
-        similar_names = [row[0] for row in similar_names]
-
-        self.similar_names_list.controls = [
-            ft.TextButton(
-                content=ft.Text(name, size=14, color=ft.colors.WHITE, width=300),
-                on_click=lambda e, n=name: self.select_similar_name(n)
-            ) for name in similar_names
-        ]
+    def search_similar_names(self, e=None):
+        # فهرس الأسماء يوحد الهمزات والتاء المربوطة ويرتب النتائج ويحد عددها
+        similar_names = suggest(self.db, "members", self.name_field.value)
+        for index, button in enumerate(self.similar_name_buttons):
+            button.visible = index < len(similar_names)
+            if button.visible:
+                button.data = similar_names[index]
+                button.content.value = similar_names[index]
         self.page.update()
 
     def select_similar_name(self, selected_name):
@@ -87,41 +90,41 @@ class InputSubscribersPage:
             return
 
         try:
-            contribution = float(contribution)
+            contribution = parse_money(contribution)
             if contribution < 0:
                 self.show_snackbar("مبلغ المساهمة يجب أن يكون رقمًا موجبًا.")
                 return
 
-            cursor = self.db.conn.cursor()
-
-            # التحقق من عدم تكرار الاسم
-            cursor.execute("SELECT COUNT(*) FROM members WHERE name = ?", (name,))
-            if cursor.fetchone()[0] > 0:
-                self.show_snackbar("هذا الاسم موجود بالفعل!")
-                return
-
             # إضافة التاريخ الحالي
             current_date = datetime.now().strftime("%Y-%m-%d")
 
-            # إدراج البيانات مع التاريخ
-            cursor.execute(
-                "INSERT INTO members (rank, name, contribution, date) VALUES (?, ?, ?, ?)",
-                (rank, name, contribution, current_date)
-            )
-            self.db.conn.commit()
+            with self.db.transaction() as cursor:
+                # التحقق من عدم تكرار الاسم
+                cursor.execute("SELECT COUNT(*) FROM members WHERE name = ?", (name,))
+                if cursor.fetchone()[0] > 0:
+                    self.show_snackbar("هذا الاسم موجود بالفعل!")
+                    return
+
+                # إدراج البيانات مع التاريخ
+                cursor.execute(
+                    "INSERT INTO members (rank, name, contribution, date) VALUES (?, ?, ?, ?)",
+                    (rank, name, contribution, current_date)
+                )
+                self.db.catalog.put_member(cursor.lastrowid, rank, name)
             self.reset_form()
             self.show_snackbar("تم حفظ البيانات بنجاح!")
 
         except ValueError:
             self.show_snackbar("مبلغ المساهمة يجب أن يكون رقمًا.")
         except Exception as ex:
-            self.db.conn.rollback()
             self.show_snackbar(f"حدث خطأ أثناء حفظ البيانات: {str(ex)}")
 
     def reset_form(self):
         self.rank_dropdown.value = None
         self.name_field.value = ""
-        self.similar_names_list.controls = []
+        self.search_names_later.cancel()
+        for button in self.similar_name_buttons:
+            button.visible = False
         self.contribution_field.value = ""
         self.page.update()
 
@@ -1,5 +1,8 @@
 import flet as ft
 from utils.button_utils import create_button
+from core import Meal, record_meal
+from utils.money import parse_money
+from utils.distribution import MEAL_TYPES
 from datetime import datetime
 
 class MealPage:
@@ -42,11 +45,8 @@ class MealPage:
         )
         self.meal_type_dropdown = ft.Dropdown(
             label="نوع الوجبة",
-            options=[
-                ft.dropdown.Option("فطار"),
-                ft.dropdown.Option("غداء"),
-                ft.dropdown.Option("عشاء"),
-            ],
+            # نفس الأسماء التي تعتمد عليها أوزان التوزيع حسب نوع الوجبة
+            options=[ft.dropdown.Option(meal_type) for meal_type in MEAL_TYPES],
             width=300,
             bgcolor=ft.colors.WHITE,
             label_style=ft.TextStyle(size=18, weight=ft.FontWeight.BOLD)
@@ -103,11 +103,13 @@ class MealPage:
             text_align=ft.TextAlign.CENTER,
         )
         self.meal_options = self.get_meal_options()
+        # الاسم للعرض فقط؛ مفتاح الاختيار هو expense_id حتى لا تتأثر بإعادة تسمية الصنف أو تكرار اسمه
+        self.meal_names = dict(self.meal_options)
         self.selected_meals = {}
         meal_checkboxes = []
-        for meal in self.meal_options:
+        for expense_id, meal in self.meal_options:
             var = ft.Checkbox(value=False)
-            self.selected_meals[meal] = var
+            self.selected_meals[expense_id] = var
             meal_checkboxes.append(
                 ft.Row(
                     [
@@ -189,15 +191,15 @@ class MealPage:
         )
         self.meal_quantities = {}
         quantity_fields = []
-        for meal, var in self.selected_meals.items():
+        for expense_id, var in self.selected_meals.items():
             if var.value:
                 quantity_var = ft.TextField(
-                    label=f"كمية {meal}",
+                    label=f"كمية {self.meal_names[expense_id]}",
                     value="",
                     width=300,
                     bgcolor=ft.colors.WHITE
                 )
-                self.meal_quantities[meal] = quantity_var
+                self.meal_quantities[expense_id] = quantity_var
                 quantity_fields.append(quantity_var)
         if self.misc_var.value:
             self.misc_amount_var = ft.TextField(
@@ -246,8 +248,17 @@ class MealPage:
     
     def validate_quantities(self, e):
         error_messages = []
+        # المتبقي لكل الأصناف المختارة باستعلام واحد
+        remaining_by_item = {}
+        if self.meal_quantities:
+            placeholders = ", ".join("?" for _ in self.meal_quantities)
+            remaining_by_item = dict(self.db.fetch_all(
+                f"SELECT expense_id, remaining FROM expenses WHERE expense_id IN ({placeholders})",
+                list(self.meal_quantities)
+            ))
         # التحقق من حقول الوجبات
-        for meal, field in self.meal_quantities.items():
+        for expense_id, field in self.meal_quantities.items():
+            meal = self.meal_names[expense_id]
             value = field.value.strip()
             if not value:
                 error_messages.append(f"حقل كمية {meal} مطلوب!")
@@ -256,9 +267,7 @@ class MealPage:
             else:
                 try:
                     quantity = int(value)
-                    cursor = self.db.conn.cursor()
-                    cursor.execute("SELECT remaining FROM expenses WHERE item_name = ?", (meal,))
-                    remaining = cursor.fetchone()[0]
+                    remaining = remaining_by_item.get(expense_id) or 0
                     if quantity > remaining:
                         self.show_snackbar(f"الكمية المطلوبة لـ {meal} غير متوفرة!")
                         return
@@ -273,7 +282,7 @@ class MealPage:
                 self.misc_amount_var.update()
             else:
                 try:
-                    float(misc_value)
+                    parse_money(misc_value)
                 except ValueError:
                     error_messages.append("حقل مبلغ المصاريف الأخرى يجب أن يكون رقمًا!")
         if error_messages:
@@ -296,9 +305,10 @@ class MealPage:
         member_options = self.get_member_options()
         self.member_selection = {}
         member_checkboxes = []
-        for member in member_options:
+        # مفتاح الاختيار هو member_id حتى يتم الحفظ بالمفتاح الأساسي لا بنص الاسم
+        for member_id, member in member_options:
             var = ft.Checkbox(value=False)
-            self.member_selection[member] = var
+            self.member_selection[member_id] = var
             member_checkboxes.append(
                 ft.Row(
                     [
@@ -353,73 +363,34 @@ class MealPage:
     
     # حفظ البيانات
     def save_data(self, e):
-        total_cost = 0
+        # اختيار الأعضاء
+        selected_ids = [member_id for member_id, var in self.member_selection.items() if var.value]
+        if not selected_ids:
+            self.show_snackbar("لم يتم اختيار أي أعضاء!")
+            return
+
         try:
-            cursor = self.db.conn.cursor()
-            
-            # تحديث الكميات للأصناف
-            for meal, field in self.meal_quantities.items():
-                quantity = int(field.value)
-                cursor.execute("UPDATE expenses SET consumption = consumption + ?, remaining = remaining - ? WHERE item_name = ?", 
-                              (quantity, quantity, meal))
-                cursor.execute("SELECT price FROM expenses WHERE item_name = ?", (meal,))
-                price = cursor.fetchone()[0]
-                total_cost += quantity * price
-            
-            # اختيار الأعضاء
-            selected_members = [member for member, var in self.member_selection.items() if var.value]
-            if not selected_members:
-                self.show_snackbar("لم يتم اختيار أي أعضاء!")
-                return
-            
-            # حساب التكلفة لكل عضو
-            cost_per_member = total_cost / len(selected_members)
-            
-            # معالجة المصاريف النثرية
-            misc_expense_id = None
-            misc_amount_per_member = 0
-            if self.misc_var.value:
-                misc_total = float(self.misc_amount_var.value)
-                misc_amount_per_member = misc_total / len(selected_members)
-                total_cost += misc_total
-            
-            # إدراج المصاريف النثرية وسجلات الوجبات
-            for member in selected_members:
-                # تحديث إجمالي المدين للمشترك
-                cursor.execute("UPDATE members SET total_due = total_due + ? WHERE rank || ' ' || name = ?",
-                              (cost_per_member + misc_amount_per_member, member))
-                
-                # الحصول على معرف العضو
-                cursor.execute("SELECT member_id FROM members WHERE rank || ' ' || name = ?", (member,))
-                member_id = cursor.fetchone()[0]
-                
-                # إدراج سجل الوجبة
-                cursor.execute("INSERT INTO meal_records (meal_type, date, member_id, final_cost) VALUES (?, ?, ?, ?)",
-                              (self.meal_type_dropdown.value, self.date_field.value, member_id, cost_per_member))
-                meal_record_id = cursor.lastrowid
-                
-                # إدراج المصروف النثري المرتبط بالعضو والوجبة
-                if self.misc_var.value:
-                    cursor.execute("INSERT INTO miscellaneous_expenses (date, amount, meal_type, meal_record_id, member_id) VALUES (?, ?, ?, ?, ?)",
-                                  (self.date_field.value, misc_amount_per_member, self.meal_type_dropdown.value, meal_record_id, member_id))
-            
-            self.db.conn.commit()
+            meal = Meal(
+                date=self.date_field.value,
+                meal_type=self.meal_type_dropdown.value,
+                member_ids=selected_ids,
+                items={expense_id: int(field.value) for expense_id, field in self.meal_quantities.items()},
+                misc_amount=parse_money(self.misc_amount_var.value) if self.misc_var.value else 0,
+            )
+            # كل عملية الحفظ في معاملة واحدة حتى لا يختلف total_due عن سجلات الوجبات عند الفشل
+            record_meal(self.db, [meal])
             self.show_snackbar("تم حفظ البيانات بنجاح!")
             self.navigate("meal_page")
         except Exception as e:
-            self.db.conn.rollback()
             self.show_snackbar(f"حدث خطأ: {str(e)}")
     
     # وظائف مساعدة
     def get_meal_options(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT item_name FROM expenses WHERE is_drink = 0 AND is_miscellaneous = 0")
-        return [row[0] for row in cursor.fetchall()]
+        # من قائمة الأصناف في الذاكرة دون استعلام
+        return self.db.catalog.items(drink=False, miscellaneous=False)
     
     def get_member_options(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT rank || ' ' || name FROM members")
-        return [row[0] for row in cursor.fetchall()]
+        return self.db.catalog.member_labels()
     
     def show_snackbar(self, message):
         snack_bar = ft.SnackBar(ft.Text(message))
@@ -428,5 +399,4 @@ class MealPage:
         self.page.update()
     
     def close_connection(self, e):
-        if self.db.conn:
-            self.db.conn.close()
+        self.db.close_connection()
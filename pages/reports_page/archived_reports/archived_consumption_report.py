@@ -1,86 +1,55 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_consumption_report(self, archive_key_id):
     """عرض تقرير استهلاك المشتركين لفترة أرشيف محددة"""
     try:
-        query = f"""
-            SELECT m.name, 
-                   m.rank,
-                   COALESCE(csa.total_meals, 0) as total_meals,
-                   COALESCE(csa.total_drinks, 0) as total_drinks,
-                   COALESCE(csa.total_miscellaneous, 0) as total_miscellaneous,
-                   COALESCE(csa.total_consumption, 0) as total_consumption
-            FROM closure_summary_archive csa
-            JOIN members_archive m ON csa.member_id = m.member_id
-            WHERE csa.archive_key_id = ? AND m.archive_key_id = ?
-        """
-        consumption = self.db.fetch_all(query, (archive_key_id, archive_key_id))
+        query = self.db.reports.query("archived_consumption")
+        consumption = self.db.reports.rows("archived_consumption", archive_key_id=archive_key_id)
         
         # التحقق من وجود بيانات
         if not consumption:
             self.show_snackbar("لا توجد بيانات استهلاك لهذه الفترة")
             return
         
-        # إنشاء DataFrame مع عمود المسلسل
-        df = pd.DataFrame(consumption, columns=["الاسم", "الرتبة", "إجمالي الوجبات", "إجمالي المشروبات", "إجمالي النثريات", "إجمالي الاستهلاك"])
-        df.insert(0, "المسلسل", range(1, len(df) + 1))  # إضافة عمود المسلسل
+        # الصفوف مع عمود المسلسل للعرض والتصدير
+        numbered = [(i + 1,) + tuple(row) for i, row in enumerate(consumption)]
         
         # حساب الإجماليات
-        total_meals = df["إجمالي الوجبات"].sum()
-        total_drinks = df["إجمالي المشروبات"].sum()
-        total_misc = df["إجمالي النثريات"].sum()
-        total_consumption = df["إجمالي الاستهلاك"].sum()
+        totals = self.db.reports.totals("archived_consumption", archive_key_id=archive_key_id)
+        total_meals = totals["إجمالي الوجبات"]
+        total_drinks = totals["إجمالي المشروبات"]
+        total_misc = totals["إجمالي النثريات"]
+        total_consumption = totals["إجمالي الاستهلاك"]
         
-        # دالة لتوسيط النصوص
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
-        
-        # إنشاء جدول Flet مع ألوان متناوبة
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,
-            columns=[
-                ft.DataColumn(centered_text("المسلسل", style=self.text_style)),
-                ft.DataColumn(centered_text("الرتبة", style=self.text_style)),
-                ft.DataColumn(centered_text("الاسم", style=self.text_style)),
-                ft.DataColumn(centered_text("إجمالي الوجبات", style=self.text_style)),
-                ft.DataColumn(centered_text("إجمالي المشروبات", style=self.text_style)),
-                ft.DataColumn(centered_text("إجمالي النثريات", style=self.text_style)),
-                ft.DataColumn(centered_text("إجمالي الاستهلاك", style=self.text_style)),
+        # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+        data_table = VirtualTable(
+            [
+                ("المسلسل", 0),
+                ("الرتبة", 2),
+                ("الاسم", 1),
+                ("إجمالي الوجبات", 3, None, format_money),
+                ("إجمالي المشروبات", 4, None, format_money),
+                ("إجمالي النثريات", 5, None, format_money),
+                ("إجمالي الاستهلاك", 6, None, format_money),
             ],
-            rows=[
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(centered_text(str(i + 1), style=self.text_style)),
-                        ft.DataCell(centered_text(row[1], style=self.text_style)),
-                        ft.DataCell(centered_text(row[0], style=self.text_style)),
-                        ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                        ft.DataCell(centered_text(str(row[3]), style=self.text_style)),
-                        ft.DataCell(centered_text(str(row[4]), style=self.text_style)),
-                        ft.DataCell(centered_text(str(row[5]), style=self.text_style)),
-                    ],
-                    color=ft.colors.GREY_100 if i % 2 == 0 else ft.colors.WHITE
-                ) for i, row in enumerate(consumption)
-            ]
+            numbered,
+            text_style=self.text_style,
+            alternate_bgcolor=ft.colors.GREY_100,
         )
         
         # إنشاء أزرار
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, f"تقرير_استهلاك_المشتركين_أرشيف_{archive_key_id}"),
+            # التصدير من الصفوف المعروضة لأنها تتضمن عمود المسلسل الذي لا يعيده الاستعلام
+            on_click=lambda e: export_to_excel(self, ["المسلسل"] + self.db.reports.columns("archived_consumption"),
+                                               f"تقرير_استهلاك_المشتركين_أرشيف_{archive_key_id}",
+                                               total_rows=len(numbered), rows=numbered,
+                                               money_columns=self.db.reports.money_columns("archived_consumption")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -102,10 +71,10 @@ def show_consumption_report(self, archive_key_id):
         scrollable_content = ft.Container(
             content=ft.Column(
                 controls=[
-                    data_table,
+                    data_table.control,
                     ft.Container(height=10),
                     ft.Text(
-                        f"إجمالي الوجبات: {total_meals:.2f}, المشروبات: {total_drinks:.2f}, النثريات: {total_misc:.2f}, الاستهلاك: {total_consumption:.2f}",
+                        f"إجمالي الوجبات: {format_money(total_meals)}, المشروبات: {format_money(total_drinks)}, النثريات: {format_money(total_misc)}, الاستهلاك: {format_money(total_consumption)}",
                         style=self.text_style,
                         color="white",
                         text_align=ft.TextAlign.CENTER
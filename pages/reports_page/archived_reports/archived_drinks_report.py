@@ -1,31 +1,29 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_drinks_report(self, archive_key_id):
     """عرض تقرير المشروبات لفترة أرشيف محددة"""
     try:
-        query = f"""
-            SELECT m.name, dr.drink_name, dr.quantity, dr.date, dr.total_cost
-            FROM drink_records_archive dr
-            JOIN members_archive m ON dr.member_id = m.member_id
-            WHERE dr.archive_key_id = ?
-        """
-        drinks = self.db.fetch_all(query, [archive_key_id])
+        query = self.db.reports.query("archived_drinks")
+        drinks = self.db.reports.rows("archived_drinks", archive_key_id=archive_key_id)
         
         # التحقق من وجود بيانات
         if not drinks:
             self.show_snackbar("لا توجد بيانات مشروبات لهذه الفترة!")
             return
         
-        # إنشاء DataFrame
-        df = pd.DataFrame(drinks, columns=["اسم المشترك", "اسم المشروب", "الكمية", "التاريخ", "التكلفة"])
-        total_cost = df["التكلفة"].sum()
+        totals = self.db.reports.totals("archived_drinks", archive_key_id=archive_key_id)
+        total_cost = totals["التكلفة"]
         
         # حساب إجمالي الكمية لكل مشروب
-        drink_quantities = df.groupby("اسم المشروب")["الكمية"].sum().reset_index()
+        drink_quantities = {}
+        for row in drinks:
+            drink_quantities[row[1]] = drink_quantities.get(row[1], 0) + (row[2] or 0)
+        drink_quantities = sorted(drink_quantities.items())
         
         # دالة لتوسيط النصوص
         def centered_text(text, style=None):
@@ -37,29 +35,16 @@ def show_drinks_report(self, archive_key_id):
             )
         
         # إنشاء الجدول الرئيسي
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,
-            columns=[
-                ft.DataColumn(centered_text("اسم المشترك", style=self.text_style)),
-                ft.DataColumn(centered_text("اسم المشروب", style=self.text_style)),
-                ft.DataColumn(centered_text("الكمية", style=self.text_style)),
-                ft.DataColumn(centered_text("التاريخ", style=self.text_style)),
-                ft.DataColumn(centered_text("التكلفة", style=self.text_style)),
+        data_table = VirtualTable(
+            [
+                ("اسم المشترك", 0),
+                ("اسم المشروب", 1),
+                ("الكمية", 2),
+                ("التاريخ", 3),
+                ("التكلفة", 4, None, format_money),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(row[1], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                    ft.DataCell(centered_text(row[3], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[4]), style=self.text_style)),
-                ]) for row in drinks
-            ]
+            drinks,
+            text_style=self.text_style,
         )
         
         # إنشاء جدول إحصائية إجمالي الكمية لكل مشروب
@@ -76,9 +61,9 @@ def show_drinks_report(self, archive_key_id):
             ],
             rows=[
                 ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row["اسم المشروب"], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row["الكمية"]), style=self.text_style)),
-                ]) for _, row in drink_quantities.iterrows()
+                    ft.DataCell(centered_text(name, style=self.text_style)),
+                    ft.DataCell(centered_text(str(quantity), style=self.text_style)),
+                ]) for name, quantity in drink_quantities
             ]
         )
         
@@ -87,9 +72,13 @@ def show_drinks_report(self, archive_key_id):
             text="تصدير إلى Excel",
             on_click=lambda e: export_to_excel(
                 self,
-                df,
+                self.db.reports.columns("archived_drinks"),
                 f"تقرير_المشروبات_أرشيف_{archive_key_id}",
-                additional_dfs=[{"df": drink_quantities, "sheet_name": "إجمالي الكمية لكل مشروب", "start_row": len(df) + 3}]
+                query,
+                {"archive_key_id": archive_key_id},
+                total_rows=len(drinks),
+                extra_sheets=[("إجمالي الكمية لكل مشروب", ["اسم المشروب", "الكمية"], drink_quantities)],
+                money_columns=self.db.reports.money_columns("archived_drinks"),
             ),
             bgcolor=ft.colors.BLUE_700,
             width=200
@@ -112,10 +101,10 @@ def show_drinks_report(self, archive_key_id):
         scrollable_content = ft.Container(
             content=ft.Column(
                 controls=[
-                    data_table,
+                    data_table.control,
                     ft.Container(height=20),
                     ft.Text(
-                        f"إجمالي التكلفة: {total_cost:.2f}",
+                        f"إجمالي التكلفة: {format_money(total_cost)}",
                         style=self.text_style,
                         color="white",
                         text_align=ft.TextAlign.CENTER
@@ -1,71 +1,48 @@
 import flet as ft
-import pandas as pd
+from collections import Counter
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
+from utils.distribution import MEAL_TYPES
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_meals_report(self, archive_key_id):
     """عرض تقرير الوجبات لفترة أرشيف محددة"""
     try:
-        query = f"""
-            SELECT m.name, mr.meal_type, mr.date, mr.final_cost
-            FROM meal_records_archive mr
-            JOIN members_archive m ON mr.member_id = m.member_id
-            WHERE mr.archive_key_id = ?
-        """
-        meals = self.db.fetch_all(query, [archive_key_id])
+        query = self.db.reports.query("archived_meals")
+        meals = self.db.reports.rows("archived_meals", archive_key_id=archive_key_id)
         
         # التحقق من وجود بيانات
         if not meals:
             self.show_snackbar("لا توجد بيانات وجبات لهذه الفترة!")
             return
         
-        # إنشاء DataFrame
-        df = pd.DataFrame(meals, columns=["اسم المشترك", "نوع الوجبة", "التاريخ", "التكلفة"])
-        total_cost = df["التكلفة"].sum()
+        totals = self.db.reports.totals("archived_meals", archive_key_id=archive_key_id)
+        total_cost = totals["التكلفة"]
         
         # حساب إجمالي عدد الوجبات لكل نوع
-        breakfast_count = df[df["نوع الوجبة"] == "فطور"].shape[0]
-        lunch_count = df[df["نوع الوجبة"] == "غداء"].shape[0]
-        dinner_count = df[df["نوع الوجبة"] == "عشاء"].shape[0]
+        type_counts = Counter(row[1] for row in meals)
+        breakfast_count, lunch_count, dinner_count = (type_counts[meal_type] for meal_type in MEAL_TYPES)
         
-        # دالة لتوسيط النصوص
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
-        
-        # إنشاء جدول Flet
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,
-            columns=[
-                ft.DataColumn(centered_text("اسم المشترك", style=self.text_style)),
-                ft.DataColumn(centered_text("نوع الوجبة", style=self.text_style)),
-                ft.DataColumn(centered_text("التاريخ", style=self.text_style)),
-                ft.DataColumn(centered_text("التكلفة", style=self.text_style)),
+        # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+        data_table = VirtualTable(
+            [
+                ("اسم المشترك", 0),
+                ("نوع الوجبة", 1),
+                ("التاريخ", 2),
+                ("التكلفة", 3, None, format_money),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(row[1], style=self.text_style)),
-                    ft.DataCell(centered_text(row[2], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[3]), style=self.text_style)),
-                ]) for row in meals
-            ]
+            meals,
+            text_style=self.text_style,
         )
         
         # إنشاء أزرار
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, f"تقرير_الوجبات_أرشيف_{archive_key_id}"),
+            on_click=lambda e: export_to_excel(self, self.db.reports.columns("archived_meals"), f"تقرير_الوجبات_أرشيف_{archive_key_id}", query, {"archive_key_id": archive_key_id},
+                                               total_rows=len(meals),
+                                               money_columns=self.db.reports.money_columns("archived_meals")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -88,12 +65,12 @@ def show_meals_report(self, archive_key_id):
             [
                 ft.Text("تقرير الوجبات", style=self.title_style, color="white"),
                 ft.Container(height=20),
-                ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                data_table.control,
                 ft.Container(height=20),
                 ft.Row(
                     [
                         ft.Text(
-                            f"إجمالي التكلفة: {total_cost:.2f}",
+                            f"إجمالي التكلفة: {format_money(total_cost)}",
                             style=self.text_style,
                             color="white",
                             text_align=ft.TextAlign.CENTER
@@ -1,13 +1,16 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_member_consumption(self, archive_key_id):
     """عرض تقرير استهلاك مشترك محدد لفترة أرشيف محددة"""
     try:
-        subscribers = self.db.fetch_all("SELECT member_id, name FROM members_archive WHERE archive_key_id = ?", [archive_key_id])
+        subscribers = self.db.archives.period(archive_key_id).fetch_all(
+            "SELECT member_id, name FROM members_archive WHERE archive_key_id = ?", [archive_key_id]
+        )
         dropdown = ft.Dropdown(
             label="اختر المشترك",
             bgcolor=ft.colors.WHITE,
@@ -26,81 +29,38 @@ def show_member_consumption(self, archive_key_id):
             # تحويل subscriber_id إلى عدد صحيح
             subscriber_id = int(subscriber_id)
             
-            query = f"""
-                SELECT m.name, 
-                       COALESCE(mr.meal_type, 'غير محدد') as item, 
-                       COALESCE(mr.final_cost, 0) as cost, 
-                       mr.date
-                FROM meal_records_archive mr
-                JOIN members_archive m ON mr.member_id = m.member_id
-                WHERE mr.member_id = ? AND mr.archive_key_id = ?
-                UNION ALL
-                SELECT m.name, 
-                       dr.drink_name as item, 
-                       dr.total_cost as cost, 
-                       dr.date
-                FROM drink_records_archive dr
-                JOIN members_archive m ON dr.member_id = m.member_id
-                WHERE dr.member_id = ? AND dr.archive_key_id = ?
-                UNION ALL
-                SELECT m.name, 
-                       'نثريات' as item, 
-                       mc.misc_amount as cost, 
-                       mc.distribution_date as date
-                FROM miscellaneous_contributions_archive mc
-                JOIN members_archive m ON mc.member_id = m.member_id
-                WHERE mc.member_id = ? AND mc.archive_key_id = ?
-            """
-            consumption = self.db.fetch_all(query, (subscriber_id, archive_key_id, subscriber_id, archive_key_id, subscriber_id, archive_key_id))
+            query = self.db.reports.query("archived_member_consumption")
+            params = {"member_id": subscriber_id, "archive_key_id": archive_key_id}
+            consumption = self.db.reports.rows("archived_member_consumption", **params)
             
             # التحقق من وجود بيانات
             if not consumption:
                 self.show_snackbar("لا توجد بيانات لهذا المشترك في هذه الفترة")
                 return
             
-            df = pd.DataFrame(consumption, columns=["اسم المشترك", "البند", "التكلفة", "التاريخ"])
-            total_cost = df["التكلفة"].sum()
-            
-            # دالة لتوسيط النصوص
-            def centered_text(text, style=None):
-                return ft.Container(
-                    content=ft.Text(text, style=style),
-                    alignment=ft.alignment.center,
-                    padding=10,
-                    expand=True
-                )
+            totals = self.db.reports.totals("archived_member_consumption", **params)
+            total_cost = totals["التكلفة"]
             
-            # إنشاء جدول Flet مع ألوان متناوبة
-            data_table = ft.DataTable(
-                bgcolor=ft.colors.WHITE,
-                heading_row_color=ft.colors.BLUE,
-                border=ft.border.all(1, ft.colors.BLACK),
-                horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-                vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-                column_spacing=0,
-                columns=[
-                    ft.DataColumn(centered_text("اسم المشترك", style=self.text_style)),
-                    ft.DataColumn(centered_text("البند", style=self.text_style)),
-                    ft.DataColumn(centered_text("التكلفة", style=self.text_style)),
-                    ft.DataColumn(centered_text("التاريخ", style=self.text_style)),
+            # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+            data_table = VirtualTable(
+                [
+                    ("اسم المشترك", 0),
+                    ("البند", 1),
+                    ("التكلفة", 2, None, format_money),
+                    ("التاريخ", 3),
                 ],
-                rows=[
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(centered_text(row[0], style=self.text_style)),
-                            ft.DataCell(centered_text(row[1], style=self.text_style)),
-                            ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                            ft.DataCell(centered_text(row[3], style=self.text_style)),
-                        ],
-                        color=ft.colors.GREY_100 if i % 2 == 0 else ft.colors.WHITE
-                    ) for i, row in enumerate(consumption)
-                ]
+                consumption,
+                text_style=self.text_style,
+                alternate_bgcolor=ft.colors.GREY_100,
             )
             
             # إنشاء أزرار
             export_button = create_button(
                 text="تصدير إلى Excel",
-                on_click=lambda e: export_to_excel(self, df, f"تقرير_استهلاك_مشترك_{subscriber_id}_أرشيف_{archive_key_id}"),
+                on_click=lambda e: export_to_excel(self, self.db.reports.columns("archived_member_consumption"), f"تقرير_استهلاك_مشترك_{subscriber_id}_أرشيف_{archive_key_id}",
+                                                query, params,
+                                                total_rows=len(consumption),
+                                                money_columns=self.db.reports.money_columns("archived_member_consumption")),
                 bgcolor=ft.colors.BLUE_700,
                 width=200
             )
@@ -122,10 +82,10 @@ def show_member_consumption(self, archive_key_id):
             scrollable_content = ft.Container(
                 content=ft.Column(
                     controls=[
-                        data_table,
+                        data_table.control,
                         ft.Container(height=10),
                         ft.Text(
-                            f"إجمالي التكلفة: {total_cost:.2f}",
+                            f"إجمالي التكلفة: {format_money(total_cost)}",
                             style=self.text_style,
                             color="white",
                             text_align=ft.TextAlign.CENTER
@@ -1,67 +1,45 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_remaining_report(self, archive_key_id):
     """عرض تقرير المتبقيات لفترة أرشيف محددة (الأصناف التي المتبقي > 0 فقط)"""
     try:
         # استعلام SQL لجلب المتبقيات التي remaining > 0
-        query = f"""
-            SELECT item_name, remaining, price, (price * remaining) as total_price
-            FROM expenses_archive
-            WHERE archive_key_id = ? AND remaining > 0
-        """
-        remaining = self.db.fetch_all(query, [archive_key_id])
+        query = self.db.reports.query("archived_remaining")
+        remaining = self.db.reports.rows("archived_remaining", archive_key_id=archive_key_id)
         
         # التحقق من وجود بيانات
         if not remaining:
             self.show_snackbar("لا توجد أصناف متبقية لهذه الفترة!")
             return
         
-        # إنشاء DataFrame
-        df = pd.DataFrame(remaining, columns=["الصنف", "المتبقي", "سعر الوحدة", "السعر الإجمالي"])
         
         # حساب إجمالي السعر الإجمالي
-        total_remaining = df["السعر الإجمالي"].sum()
+        totals = self.db.reports.totals("archived_remaining", archive_key_id=archive_key_id)
+        total_remaining = totals["السعر الإجمالي"]
 
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
-        
-        # إنشاء جدول Flet
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,
-            columns=[
-                ft.DataColumn(centered_text("الصنف", style=self.text_style)),
-                ft.DataColumn(centered_text("المتبقي", style=self.text_style)),
-                ft.DataColumn(centered_text("سعر الوحدة", style=self.text_style)),
-                ft.DataColumn(centered_text("السعر الإجمالي", style=self.text_style)),
+        # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+        data_table = VirtualTable(
+            [
+                ("الصنف", 0),
+                ("المتبقي", 1),
+                ("سعر الوحدة", 2, None, format_money),
+                ("السعر الإجمالي", 3, None, format_money),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[1]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[3]), style=self.text_style)),
-                ]) for row in remaining
-            ]
+            remaining,
+            text_style=self.text_style,
         )
         
         # إنشاء أزرار
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, f"تقرير_المتبقيات_أرشيف_{archive_key_id}"),
+            on_click=lambda e: export_to_excel(self, self.db.reports.columns("archived_remaining"), f"تقرير_المتبقيات_أرشيف_{archive_key_id}", query, {"archive_key_id": archive_key_id},
+                                               total_rows=len(remaining),
+                                               money_columns=self.db.reports.money_columns("archived_remaining")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -84,10 +62,10 @@ def show_remaining_report(self, archive_key_id):
             [
                 ft.Text("تقرير المتبقيات", style=self.title_style, color="white"),
                 ft.Container(height=20),
-                ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                data_table.control,
                 ft.Container(height=20),
                 ft.Text(
-                    f"إجمالي المتبقيات: {total_remaining:.2f}",
+                    f"إجمالي المتبقيات: {format_money(total_remaining)}",
                     style=self.text_style,
                     color="white",
                     text_align=ft.TextAlign.CENTER
@@ -1,9 +1,10 @@
 import flet as ft
 from utils.button_utils import create_button
-import pandas as pd
 from datetime import datetime
-import os
 import logging
+from utils.export import export_sheets
+from utils.export_progress import run_export
+from utils.money import format_money, major_rows
 
 class ArchivedReportsPage:
     def __init__(self, page, background_image, db, navigate=None):
@@ -201,13 +202,15 @@ class ArchivedReportsPage:
             """.format(','.join(['?']*len(closure_ids)))
             
             params = [cid[0] for cid in closure_ids]
-            rows = self.db.fetch_all(query, params)
+            # بيانات الفترة نفسها من ملفها المستقل إن كانت مختومة
+            archive = self.db.archives.period(archive_key_id)
+            rows = archive.fetch_all(query, params)
             
             if not rows:
                 self.show_snackbar("لا توجد بيانات تفصيلية للتقارير المقفلة!")
                 return
 
-            totals_data = self.db.fetch_all("""
+            totals_data = archive.fetch_all("""
                 SELECT total_meals, total_drinks, total_misc, total_consumption, 
                        total_contributions, remaining_items, remaining_cash
                 FROM monthly_totals_archive
@@ -256,11 +259,11 @@ class ArchivedReportsPage:
                     ft.DataRow(
                         cells=[
                             ft.DataCell(centered_text(row[0], cell_style)),
-                            ft.DataCell(centered_text(f"{row[1]:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{row[2]:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{row[3]:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{row[4]:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{row[5]:.2f}", cell_style)),
+                            ft.DataCell(centered_text(format_money(row[1]), cell_style)),
+                            ft.DataCell(centered_text(format_money(row[2]), cell_style)),
+                            ft.DataCell(centered_text(format_money(row[3]), cell_style)),
+                            ft.DataCell(centered_text(format_money(row[4]), cell_style)),
+                            ft.DataCell(centered_text(format_money(row[5]), cell_style)),
                         ]
                     ) for row in rows
                 ],
@@ -288,12 +291,12 @@ class ArchivedReportsPage:
                     ft.DataRow(
                         cells=[
                             ft.DataCell(centered_text("الإجمالي", cell_style)),
-                            ft.DataCell(centered_text(f"{total_meals:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{total_drinks:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{total_misc:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{total_consumption:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{total_contributions:.2f}", cell_style)),
-                            ft.DataCell(centered_text(f"{total_remaining:.2f}", cell_style)),
+                            ft.DataCell(centered_text(format_money(total_meals), cell_style)),
+                            ft.DataCell(centered_text(format_money(total_drinks), cell_style)),
+                            ft.DataCell(centered_text(format_money(total_misc), cell_style)),
+                            ft.DataCell(centered_text(format_money(total_consumption), cell_style)),
+                            ft.DataCell(centered_text(format_money(total_contributions), cell_style)),
+                            ft.DataCell(centered_text(format_money(total_remaining), cell_style)),
                         ]
                     )
                 ],
@@ -428,7 +431,7 @@ class ArchivedReportsPage:
             closure_ids_str = ','.join(['?'] * len(closure_ids))
             closure_ids_values = [cid[0] for cid in closure_ids]
 
-            rows = self.db.fetch_all(f"""
+            summary_query = f"""
                 SELECT 
                     m.name, 
                     SUM(s.total_meals), SUM(s.total_drinks), SUM(s.total_miscellaneous),
@@ -438,17 +441,20 @@ class ArchivedReportsPage:
                 WHERE s.closure_id IN ({closure_ids_str})
                 GROUP BY m.name
                 ORDER BY m.name
-            """, closure_ids_values)
+            """
+            archive = self.db.archives.period(archive_key_id)
+            member_count = archive.fetch_all(f"""
+                SELECT COUNT(DISTINCT m.name)
+                FROM closure_summary_archive s
+                JOIN members_archive m ON s.member_id = m.member_id
+                WHERE s.closure_id IN ({closure_ids_str})
+            """, closure_ids_values)[0][0]
 
-            if not rows:
+            if not member_count:
                 self.show_snackbar("لا توجد بيانات للتصدير!")
                 return
 
-            summary_df = pd.DataFrame(rows, columns=[
-                "الاسم", "عدد الوجبات", "عدد المشروبات", "النثريات", "الاستهلاك", "المساهمة", "المتبقي"
-            ])
-
-            totals_data = self.db.fetch_all("""
+            totals_data = archive.fetch_all("""
                 SELECT total_meals, total_drinks, total_misc, total_consumption, 
                        total_contributions, remaining_items, remaining_cash
                 FROM monthly_totals_archive
@@ -461,37 +467,28 @@ class ArchivedReportsPage:
                 self.show_snackbar("لا توجد بيانات إجمالية للتصدير!")
                 return
 
-            total_meals, total_drinks, total_misc, total_consumption, total_contributions, total_remaining_items, total_remaining = totals_data[0]
-
-            totals_df = pd.DataFrame([{
-                "إجمالي الوجبات": total_meals,
-                "إجمالي المشروبات": total_drinks,
-                "إجمالي النثريات": total_misc,
-                "إجمالي الاستهلاك": total_consumption,
-                "إجمالي المساهمة": total_contributions,
-                "قيمة الأصناف المتبقية": total_remaining_items,
-                "النقدي المتبقي": total_remaining,
-            }])
-
-            info_df = pd.DataFrame([
+            info_rows = [
                 ["اسم الأرشيف", archive_name],
                 ["الفترة", f"من {start_date} إلى {end_date}"],
                 ["تاريخ الأرشفة", archived_at],
-                ["عدد الأعضاء", len(summary_df)],
-            ], columns=["المعلومة", "القيمة"])
-
-            reports_dir = "reports"
-            if not os.path.exists(reports_dir):
-                os.makedirs(reports_dir)
-
-            filename = f"{reports_dir}/تقرير_مؤرشف_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-            with pd.ExcelWriter(filename, engine="openpyxl") as writer:
-                info_df.to_excel(writer, sheet_name="معلومات", index=False)
-                summary_df.to_excel(writer, sheet_name="تفاصيل الأعضاء", index=False)
-                totals_df.to_excel(writer, sheet_name="الإجماليات", index=False)
+                ["عدد الأعضاء", member_count],
+            ]
+            totals_headers = [
+                "إجمالي الوجبات", "إجمالي المشروبات", "إجمالي النثريات", "إجمالي الاستهلاك",
+                "إجمالي المساهمة", "قيمة الأصناف المتبقية", "النقدي المتبقي",
+            ]
 
-            self.show_snackbar(f"تم حفظ التقرير في: {filename}")
+            # تفاصيل الأعضاء تُكتب مباشرة من مؤشر قاعدة البيانات في مهمة خلفية
+            def task(job):
+                return export_sheets([
+                    ("معلومات", ["المعلومة", "القيمة"], info_rows),
+                    ("تفاصيل الأعضاء", [
+                        "الاسم", "عدد الوجبات", "عدد المشروبات", "النثريات", "الاستهلاك", "المساهمة", "المتبقي"
+                    ], major_rows(archive.iter_query(summary_query, closure_ids_values), range(1, 7))),
+                    ("الإجماليات", totals_headers, major_rows(totals_data, range(7))),
+                ], "تقرير_مؤرشف", job)
+
+            run_export(self.page, task, self.show_snackbar, total_rows=member_count + len(info_rows) + 1)
 
         except Exception as e:
             logging.error(f"خطأ أثناء تصدير التقرير: {e}", exc_info=True)
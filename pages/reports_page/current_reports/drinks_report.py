@@ -1,67 +1,43 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_drinks_report(self):
     """عرض تقرير المشروبات"""
     try:
-        query = f"""
-            SELECT m.name, dr.drink_name, dr.quantity, dr.date, dr.total_cost
-            FROM drink_records dr
-            JOIN members m ON dr.member_id = m.member_id
-        """
-        drinks = self.db.fetch_all(query)
+        query = self.db.reports.query("drinks")
+        drinks = self.db.reports.rows("drinks")
         
         # التحقق من وجود بيانات
         if not drinks:
             self.show_snackbar("لا توجد بيانات مشروبات لهذا الشهر")
             return
         
-        # إنشاء DataFrame
-        df = pd.DataFrame(drinks, columns=["اسم المشترك", "اسم المشروب", "الكمية", "التاريخ", "التكلفة"])
-        total_cost = df["التكلفة"].sum()
+        totals = self.db.reports.totals("drinks")
+        total_cost = totals["التكلفة"]
         
-        # دالة لتوسيط النصوص
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
-        
-        # إنشاء جدول Flet
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,
-            columns=[
-                ft.DataColumn(centered_text("اسم المشترك", style=self.text_style)),
-                ft.DataColumn(centered_text("اسم المشروب", style=self.text_style)),
-                ft.DataColumn(centered_text("الكمية", style=self.text_style)),
-                ft.DataColumn(centered_text("التاريخ", style=self.text_style)),
-                ft.DataColumn(centered_text("التكلفة", style=self.text_style)),
+        # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+        data_table = VirtualTable(
+            [
+                ("اسم المشترك", 0),
+                ("اسم المشروب", 1),
+                ("الكمية", 2),
+                ("التاريخ", 3),
+                ("التكلفة", 4, None, format_money),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(row[1], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                    ft.DataCell(centered_text(row[3], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[4]), style=self.text_style)),
-                ]) for row in drinks
-            ]
+            drinks,
+            text_style=self.text_style,
         )
         
         # إنشاء أزرار
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, "تقرير_المشروبات"),
+            on_click=lambda e: export_to_excel(self, self.db.reports.columns("drinks"), "تقرير_المشروبات", query,
+                                               total_rows=len(drinks),
+                                               money_columns=self.db.reports.money_columns("drinks")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -84,10 +60,10 @@ def show_drinks_report(self):
             [
                 ft.Text("تقرير المشروبات", style=self.title_style, color="white"),
                 ft.Container(height=20),
-                ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                data_table.control,
                 ft.Container(height=20),
                 ft.Text(
-                    f"إجمالي التكلفة: {total_cost:.2f}",
+                    f"إجمالي التكلفة: {format_money(total_cost)}",
                     style=self.text_style,
                     color="white",
                     text_align=ft.TextAlign.CENTER
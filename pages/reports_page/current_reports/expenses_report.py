@@ -1,70 +1,47 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_expenses_report(self):
     """عرض تقرير المصروفات"""
     try:
         # استعلام SQL لجلب المصروفات من جدول expenses
-        query = f"""
-            SELECT item_name, quantity, price, (price * quantity) as total_price, consumption
-            FROM expenses
-        """
-        expenses = self.db.fetch_all(query)
+        query = self.db.reports.query("expenses")
+        expenses = self.db.reports.rows("expenses")
         
         # التحقق من وجود بيانات
         if not expenses:
             self.show_snackbar("لا توجد مصروفات")
             return
         
-        # إنشاء DataFrame باستخدام pandas
-        df = pd.DataFrame(expenses, columns=["اسم الصنف", "الكمية", "سعر الوحدة", "السعر الكامل", "الاستهلاك"])
         
         # حساب إجمالي المصروفات وإجمالي الاستهلاك
-        total_expenses = df["السعر الكامل"].sum()
-        total_consumption = (df["الاستهلاك"] * df["سعر الوحدة"]).sum()  # إجمالي سعر الاستهلاك
-        
-        # دالة لتوسيط النصوص
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
+        totals = self.db.reports.totals("expenses")
+        total_expenses = totals["السعر الكامل"]
+        total_consumption = sum((row[4] or 0) * (row[2] or 0) for row in expenses)  # إجمالي سعر الاستهلاك
         
         # إنشاء جدول Flet لعرض البيانات
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,  # خلفية الجدول بيضاء
-            heading_row_color=ft.colors.BLUE,  # رأس الجدول أزرق
-            border=ft.border.all(1, ft.colors.BLACK),  # حدود خارجية
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),  # خطوط أفقية
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),  # خطوط عمودية
-            column_spacing=0,  # تقليل المسافة بين الأعمدة
-            columns=[
-                ft.DataColumn(centered_text("اسم الصنف", style=self.text_style)),
-                ft.DataColumn(centered_text("الكمية", style=self.text_style)),
-                ft.DataColumn(centered_text("سعر الوحدة", style=self.text_style)),
-                ft.DataColumn(centered_text("السعر الكامل", style=self.text_style)),
-                ft.DataColumn(centered_text("الاستهلاك", style=self.text_style)),
+        data_table = VirtualTable(
+            [
+                ("اسم الصنف", 0),
+                ("الكمية", 1),
+                ("سعر الوحدة", 2, None, format_money),
+                ("السعر الكامل", 3, None, format_money),
+                ("الاستهلاك", 4),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[1]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[3]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[4]), style=self.text_style)),
-                ]) for row in expenses
-            ]
+            expenses,
+            text_style=self.text_style,
         )
         
         # إنشاء أزرار التصدير والرجوع
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, "تقرير_المصروفات"),
+            on_click=lambda e: export_to_excel(self, self.db.reports.columns("expenses"), "تقرير_المصروفات", query,
+                                               total_rows=len(expenses),
+                                               money_columns=self.db.reports.money_columns("expenses")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -87,18 +64,18 @@ def show_expenses_report(self):
             [
                 ft.Text("تقرير المصروفات", style=self.title_style, color="white"),
                 ft.Container(height=20),
-                ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                data_table.control,
                 ft.Container(height=20),
                 ft.Row(
                     [
                         ft.Text(
-                            f"إجمالي المصروفات: {total_expenses:.2f}",
+                            f"إجمالي المصروفات: {format_money(total_expenses)}",
                             style=self.text_style,
                             color="white",
                             text_align=ft.TextAlign.CENTER
                         ),
                         ft.Text(
-                            f"إجمالي الاستهلاك: {total_consumption:.2f}",
+                            f"إجمالي الاستهلاك: {format_money(total_consumption)}",
                             style=self.text_style,
                             color="white",
                             text_align=ft.TextAlign.CENTER
@@ -1,18 +1,27 @@
-import pandas as pd
-import os
-from datetime import datetime
+from utils.export import export_sheets
+from utils.export_progress import run_export
+from utils.money import major_rows
 
-def export_to_excel(self, df, filename):
-    """تصدير DataFrame إلى ملف Excel"""
-    try:
-        # إنشاء مجلد reports إذا لم يكن موجودًا
-        os.makedirs("reports", exist_ok=True)
-        
-        # تحديد مسار الحفظ داخل مجلد reports
-        output_path = os.path.join("reports", f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        
-        # تصدير DataFrame إلى ملف Excel
-        df.to_excel(output_path, index=False)
-        self.show_snackbar(f"تم تصدير التقرير إلى {output_path}")
-    except Exception as e:
-        self.show_snackbar(f"خطأ أثناء تصدير الملف: {str(e)}")
+def export_to_excel(self, headers, filename, query=None, params=(), total_rows=0, rows=None,
+                    extra_sheets=(), money_columns=()):
+    """تصدير التقرير إلى ملف Excel في الخلفية
+
+    عند تمرير الاستعلام تُقرأ الصفوف مباشرة من مؤشر قاعدة البيانات (أو ملف فترة الأرشيف)
+    وتُكتب على دفعات، وإلا تُكتب الصفوف rows المعروضة كما هي. extra_sheets أوراق إضافية
+    (العنوان، العناوين، الصفوف)، وأعمدة المبالغ money_columns (بالقروش) تُكتب بالجنيه.
+    """
+    headers = list(headers)
+    money_indexes = [headers.index(title) for title in money_columns]
+
+    def task(job):
+        if query:
+            # استعلامات الأرشيف تُقرأ من ملف الفترة إن كانت مختومة
+            source = self.db.archives.period(params["archive_key_id"]) if "archive_key_id" in params else self.db
+            report_rows = source.iter_query(query, params)
+        else:
+            report_rows = rows
+        sheets = [(filename, headers, major_rows(report_rows, money_indexes))]
+        sheets.extend(extra_sheets)
+        return export_sheets(sheets, filename, job)
+
+    run_export(self.page, task, self.show_snackbar, total_rows=total_rows)
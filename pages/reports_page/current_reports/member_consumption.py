@@ -1,17 +1,18 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_member_consumption(self):
     """عرض تقرير استهلاك مشترك محدد"""
     try:
-        subscribers = self.db.fetch_all("SELECT member_id, name FROM members")
+        subscribers = self.db.catalog.members()
         dropdown = ft.Dropdown(
             label="اختر المشترك",
             bgcolor=ft.colors.WHITE,
-            options=[ft.dropdown.Option(key=str(row[0]), text=row[1]) for row in subscribers],
+            options=[ft.dropdown.Option(key=str(member_id), text=name) for member_id, _, name in subscribers],
             width=300,
             text_style=self.text_style,color= "BLACK"
         )
@@ -23,78 +24,40 @@ def show_member_consumption(self):
                 return
             
 
-            query = f"""
-                SELECT m.name, 
-                       COALESCE(mr.meal_type, 'غير محدد') as item, 
-                       COALESCE(mr.final_cost, 0) as cost, 
-                       mr.date
-                FROM meal_records mr
-                JOIN members m ON mr.member_id = m.member_id
-                WHERE mr.member_id = ?
-                UNION ALL
-                SELECT m.name, 
-                       dr.drink_name as item, 
-                       dr.total_cost as cost, 
-                       dr.date
-                FROM drink_records dr
-                JOIN members m ON dr.member_id = m.member_id
-                WHERE dr.member_id = ?
-                UNION ALL
-                SELECT m.name, 
-                       'نثريات' as item, 
-                       mc.misc_amount as cost, 
-                       mc.distribution_date as date
-                FROM miscellaneous_contributions mc
-                JOIN members m ON mc.member_id = m.member_id
-                WHERE mc.member_id = ?
-            """
-            consumption = self.db.fetch_all(query, (subscriber_id, subscriber_id, subscriber_id))
+            query = self.db.reports.query("member_consumption")
+            params = {"member_id": int(subscriber_id)}
+            consumption = self.db.reports.rows("member_consumption", **params)
             
             # التحقق من وجود بيانات
             if not consumption:
                 self.show_snackbar("لا توجد بيانات لهذا المشترك في هذا الشهر")
                 return
             
-            df = pd.DataFrame(consumption, columns=["اسم المشترك", "البند", "التكلفة", "التاريخ"])
-            total_cost = df["التكلفة"].sum()
+            # الإجمالي من صف المشترك في member_period_totals بدل جمع السجلات
+            totals = self.db.fetch_member_totals(member_id=int(subscriber_id))
+            if totals:
+                total_cost = totals[0][6] + totals[0][8] + totals[0][9]
+            else:
+                total_cost = self.db.reports.totals("member_consumption", **params)["التكلفة"]
             
-            # دالة لتوسيط النصوص
-            def centered_text(text, style=None):
-                return ft.Container(
-                    content=ft.Text(text, style=style),
-                    alignment=ft.alignment.center,
-                    padding=10,
-                    expand=True
-                )
-            
-            # إنشاء جدول Flet
-            data_table = ft.DataTable(
-                bgcolor=ft.colors.WHITE,
-                heading_row_color=ft.colors.BLUE,
-                border=ft.border.all(1, ft.colors.BLACK),
-                horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-                vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-                column_spacing=0,
-                columns=[
-                    ft.DataColumn(centered_text("اسم المشترك", style=self.text_style)),
-                    ft.DataColumn(centered_text("البند", style=self.text_style)),
-                    ft.DataColumn(centered_text("التكلفة", style=self.text_style)),
-                    ft.DataColumn(centered_text("التاريخ", style=self.text_style)),
+            # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+            data_table = VirtualTable(
+                [
+                    ("اسم المشترك", 0),
+                    ("البند", 1),
+                    ("التكلفة", 2, None, format_money),
+                    ("التاريخ", 3),
                 ],
-                rows=[
-                    ft.DataRow(cells=[
-                        ft.DataCell(centered_text(row[0], style=self.text_style)),
-                        ft.DataCell(centered_text(row[1], style=self.text_style)),
-                        ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                        ft.DataCell(centered_text(row[3], style=self.text_style)),
-                    ]) for row in consumption
-                ]
+                consumption,
+                text_style=self.text_style,
             )
             
             # إنشاء أزرار
             export_button = create_button(
                 text="تصدير إلى Excel",
-                on_click=lambda e: export_to_excel(self, df, f"تقرير_استهلاك_مشترك_{subscriber_id}"),
+                on_click=lambda e: export_to_excel(self, self.db.reports.columns("member_consumption"), f"تقرير_استهلاك_مشترك_{subscriber_id}", query, params,
+                                                   total_rows=len(consumption),
+                                                   money_columns=self.db.reports.money_columns("member_consumption")),
                 bgcolor=ft.colors.BLUE_700,
                 width=200
             )
@@ -119,10 +82,10 @@ def show_member_consumption(self):
                     ft.Container(height=20),
                     dropdown,
                     ft.Container(height=20),
-                    ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                    data_table.control,
                     ft.Container(height=20),
                     ft.Text(
-                        f"إجمالي التكلفة: {total_cost:.2f}",
+                        f"إجمالي التكلفة: {format_money(total_cost)}",
                         style=self.text_style,
                         color="white",
                         text_align=ft.TextAlign.CENTER
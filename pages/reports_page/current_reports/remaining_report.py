@@ -1,7 +1,8 @@
 import flet as ft
-import pandas as pd
 from datetime import datetime
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable
+from utils.money import format_money
 from pages.reports_page.current_reports.export_to_excel import export_to_excel
 
 def show_remaining_report(self):
@@ -9,55 +10,31 @@ def show_remaining_report(self):
     try:
         
         # استعلام SQL لجلب المتبقيات من جدول المشتريات
-        query = f"""
-            SELECT item_name, remaining, price, (price * remaining) as total_price
-            FROM expenses
-        """
-        remaining = self.db.fetch_all(query)
+        query = self.db.reports.query("remaining")
+        remaining = self.db.reports.rows("remaining")
         
-        # إنشاء DataFrame باستخدام pandas
-        df = pd.DataFrame(remaining, columns=["الصنف", "المتبقي", "سعر الوحدة", "السعر الإجمالي"])
         
         # حساب إجمالي السعر الإجمالي
-        total_remaining = df["السعر الإجمالي"].sum()
-        def centered_text(text, style=None):
-            return ft.Container(
-                content=ft.Text(text, style=style),
-                alignment=ft.alignment.center,
-                padding=10,
-                expand=True
-            )
-        
-        # إنشاء جدول Flet لعرض البيانات
-        data_table = ft.DataTable(
-            bgcolor=ft.colors.WHITE,  # خلفية الجدول بيضاء
-            heading_row_color=ft.colors.BLUE,
-            border=ft.border.all(1, ft.colors.BLACK),  # حدود خارجية للجدول
-            horizontal_lines=ft.BorderSide(1, ft.colors.BLACK),
-            vertical_lines=ft.BorderSide(1, ft.colors.BLACK),
-            column_spacing=0,  # تقليل المسافة بين الأعمدة
-
-
-            columns=[
-                ft.DataColumn(centered_text("الصنف", style=self.text_style)),
-                ft.DataColumn(centered_text("المتبقي", style=self.text_style)),
-                ft.DataColumn(centered_text("سعر الوحدة", style=self.text_style)),
-                ft.DataColumn(centered_text("السعر الإجمالي", style=self.text_style)),
+        totals = self.db.reports.totals("remaining")
+        total_remaining = totals["السعر الإجمالي"]
+        # جدول يرسم الصفوف الظاهرة فقط مهما كان عدد السجلات
+        data_table = VirtualTable(
+            [
+                ("الصنف", 0),
+                ("المتبقي", 1),
+                ("سعر الوحدة", 2, None, format_money),
+                ("السعر الإجمالي", 3, None, format_money),
             ],
-            rows=[
-                ft.DataRow(cells=[
-                    ft.DataCell(centered_text(row[0], style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[1]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[2]), style=self.text_style)),
-                    ft.DataCell(centered_text(str(row[3]), style=self.text_style)),
-                ]) for row in remaining
-            ]
+            remaining,
+            text_style=self.text_style,
         )
         
         # إنشاء أزرار التصدير والرجوع
         export_button = create_button(
             text="تصدير إلى Excel",
-            on_click=lambda e: export_to_excel(self, df, "تقرير_المتبقيات"),
+            on_click=lambda e: export_to_excel(self, self.db.reports.columns("remaining"), "تقرير_المتبقيات", query,
+                                               total_rows=len(remaining),
+                                               money_columns=self.db.reports.money_columns("remaining")),
             bgcolor=ft.colors.BLUE_700,
             width=200
         )
@@ -81,10 +58,10 @@ def show_remaining_report(self):
             [
                 ft.Text("تقرير المتبقيات", style=self.title_style, color="white"),
                 ft.Container(height=20),
-                ft.ListView(controls=[data_table], expand=True, auto_scroll=False),
+                data_table.control,
                 ft.Container(height=20),
                 ft.Text(
-                    f"إجمالي المتبقيات: {total_remaining:.2f}",
+                    f"إجمالي المتبقيات: {format_money(total_remaining)}",
                     style=self.text_style,
                     color="white",
                     text_align=ft.TextAlign.CENTER
@@ -1,10 +1,64 @@
 import flet as ft
-from database import DatabaseManager
 from utils.button_utils import create_button
-import pandas as pd
 from datetime import datetime
-import os
 import logging
+from utils.export import export_query
+from utils.export_progress import run_export
+from utils.paginator import KeysetPaginator
+from utils.money import sql_major
+
+# أعمدة تصفح الاستهلاك لكل مشترك (من الإجماليات المجمعة في consumption_source)
+CONSUMPTION_SELECT = f"""
+    m.name, COALESCE(meals.meal_count, 0) as total_meals,
+    COALESCE(drinks.quantity, 0) as total_drinks, {sql_major("COALESCE(misc.misc_amount, 0)")} as total_misc,
+    {sql_major("COALESCE(meals.cost, 0) + COALESCE(drinks.cost, 0) + COALESCE(misc.misc_amount, 0)")} as total_consumption,
+    {sql_major("m.contribution")} as contribution,
+    {sql_major("m.contribution - m.total_due")} as remaining_cash
+"""
+
+
+def consumption_source(archived=False, archive_key_id=None, date_from=None, date_to=None):
+    """مصدر تصفح الاستهلاك (FROM ... WHERE) ومعاملاته: صف واحد لكل مشترك
+
+    كل مصدر (وجبات، مشروبات، نثريات) يُجمع لكل مشترك قبل الربط، فلا تتضاعف الصفوف
+    عند ربطها معًا ولا يصبح الإجمالي NULL لمشترك ليس له سجل في أحدها.
+    """
+    suffix = "_archive" if archived else ""
+    params = []
+
+    def aggregate(table, date_column, columns):
+        # المعاملات تُضاف بترتيب ظهورها في النص لأن KeysetPaginator يستخدم معاملات موضعية
+        conditions = []
+        if archived:
+            conditions.append("archive_key_id = ?")
+            params.append(archive_key_id)
+        if date_from:
+            conditions.append(f"{date_column} >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append(f"{date_column} <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"(SELECT member_id, {columns} FROM {table}{suffix} {where} GROUP BY member_id)"
+
+    meals = aggregate("meal_records", "date", "COUNT(*) as meal_count, SUM(final_cost) as cost")
+    drinks = aggregate("drink_records", "date", "SUM(quantity) as quantity, SUM(total_cost) as cost")
+    misc = aggregate("miscellaneous_contributions", "distribution_date", "SUM(misc_amount) as misc_amount")
+    source = f"""
+        FROM members{suffix} m
+        LEFT JOIN {meals} meals ON meals.member_id = m.member_id
+        LEFT JOIN {drinks} drinks ON drinks.member_id = m.member_id
+        LEFT JOIN {misc} misc ON misc.member_id = m.member_id
+        WHERE 1=1
+    """
+    if archived:
+        source += " AND m.archive_key_id = ?"
+        params.append(archive_key_id)
+    if date_from or date_to:
+        # مع فلتر التاريخ يظهر فقط من له سجل في الفترة
+        source += " AND (meals.member_id IS NOT NULL OR drinks.member_id IS NOT NULL OR misc.member_id IS NOT NULL)"
+    return source, params
+
 
 class ReportsPage:
     def __init__(self, page, background_image, db, navigate=None):
@@ -153,9 +207,9 @@ class CurrentReportsPage:
         )
 
     def load_members(self):
-        query = "SELECT member_id, name FROM members ORDER BY name"
         try:
-            members = self.db.fetch_all(query)
+            members = sorted(((member_id, name) for member_id, _, name in self.db.catalog.members()),
+                             key=lambda member: member[1])
             self.member.options = [ft.dropdown.Option(name, str(member_id)) for member_id, name in members]
             self.member.options.insert(0, ft.dropdown.Option("الكل", "all"))
             self.member.value = "all"
@@ -172,196 +226,149 @@ class CurrentReportsPage:
         except ValueError:
             return False
 
-    def show_report(self, e, page_number=1):
+    def show_report(self, e):
         if not self.validate_date(self.date_from.value) or not self.validate_date(self.date_to.value):
             self.show_snackbar("تنسيق التاريخ غلط! استخدم YYYY-MM-DD")
             return
-        self.current_page = page_number
         data_type = self.data_type.value
         date_from = self.date_from.value
         date_to = self.date_to.value
         member_id = self.member.value
         expense_type = self.expense_type.value
-        query = ""
-        count_query = ""
-        columns = []
         column_names = {}
         params = []
+        # مفتاح تقسيم الصفحات لكل نوع: (عمود الترتيب، المعرف)
+        order_column = None
+        group_by = None
         try:
             if data_type == "all":
-                query = """
-                    SELECT m.name, COUNT(mr.meal_record_id) as total_meals, 
-                           SUM(dr.quantity) as total_drinks, SUM(mc.misc_amount) as total_misc,
-                           SUM(mr.final_cost + dr.total_cost + mc.misc_amount) as total_consumption,
-                           m.contribution, (m.contribution - m.total_due) as remaining_cash
-                    FROM members m
-                    LEFT JOIN meal_records mr ON m.member_id = mr.member_id
-                    LEFT JOIN drink_records dr ON m.member_id = dr.member_id
-                    LEFT JOIN miscellaneous_contributions mc ON m.member_id = mc.member_id
-                    WHERE 1=1
-                """
-                count_query = "SELECT COUNT(*) FROM members WHERE 1=1"
+                # المبالغ تُجمع بالقروش ولا تُحول إلى جنيه إلا في الإخراج
+                select = CONSUMPTION_SELECT
+                source, params = consumption_source(date_from=date_from, date_to=date_to)
                 if member_id != "all":
-                    query += " AND m.member_id = ?"
-                    count_query += " AND member_id = ?"
+                    source += " AND m.member_id = ?"
                     params.append(member_id)
-                if date_from:
-                    query += " AND (mr.date >= ? OR dr.date >= ? OR mc.distribution_date >= ?)"
-                    params.extend([date_from] * 3)
-                if date_to:
-                    query += " AND (mr.date <= ? OR dr.date <= ? OR mc.distribution_date <= ?)"
-                    params.extend([date_to] * 3)
-                query += " GROUP BY m.member_id, m.name, m.contribution, m.total_due"
-                columns = ["name", "total_meals", "total_drinks", "total_misc", "total_consumption", "contribution", "remaining_cash"]
+                id_column = "m.member_id"
                 column_names = {
                     "name": "الاسم", "total_meals": "إجمالي الوجبات", "total_drinks": "إجمالي المشروبات",
                     "total_misc": "إجمالي النثريات", "total_consumption": "إجمالي الاستهلاك",
                     "contribution": "المساهمة", "remaining_cash": "النقدي المتبقي",
                 }
             elif data_type == "expenses":
-                query = """
-                    SELECT item_name, quantity, price, total_price, consumption, remaining, 
-                           CASE WHEN is_miscellaneous = 1 THEN 'نعم' ELSE 'لا' END as is_misc,
-                           CASE WHEN is_drink = 1 THEN 'نعم' ELSE 'لا' END as is_drink,
-                           date
-                    FROM expenses
-                    WHERE 1=1
+                select = f"""
+                    item_name, quantity, {sql_major("price")} as price, {sql_major("total_price")} as total_price,
+                    consumption, remaining,
+                    CASE WHEN is_miscellaneous = 1 THEN 'نعم' ELSE 'لا' END as is_misc,
+                    CASE WHEN is_drink = 1 THEN 'نعم' ELSE 'لا' END as is_drink,
+                    date
                 """
-                count_query = "SELECT COUNT(*) FROM expenses WHERE 1=1"
+                source = "FROM expenses WHERE 1=1"
                 if expense_type != "all":
                     if expense_type == "misc":
-                        query += " AND is_miscellaneous = 1"
-                        count_query += " AND is_miscellaneous = 1"
+                        source += " AND is_miscellaneous = 1"
                     elif expense_type == "drink":
-                        query += " AND is_drink = 1"
-                        count_query += " AND is_drink = 1"
+                        source += " AND is_drink = 1"
                     else:
-                        query += " AND is_miscellaneous = 0 AND is_drink = 0"
-                        count_query += " AND is_miscellaneous = 0 AND is_drink = 0"
+                        source += " AND is_miscellaneous = 0 AND is_drink = 0"
                 if date_from:
-                    query += " AND date >= ?"
-                    count_query += " AND date >= ?"
+                    source += " AND date >= ?"
                     params.append(date_from)
                 if date_to:
-                    query += " AND date <= ?"
-                    count_query += " AND date <= ?"
+                    source += " AND date <= ?"
                     params.append(date_to)
-                columns = ["item_name", "quantity", "price", "total_price", "consumption", "remaining", "is_misc", "is_drink", "date"]
+                order_column, id_column = "expenses.date", "expenses.expense_id"
                 column_names = {
                     "item_name": "اسم الصنف", "quantity": "الكمية", "price": "سعر الوحدة",
                     "total_price": "السعر الإجمالي", "consumption": "الاستهلاك", "remaining": "المتبقي",
                     "is_misc": "نثرية", "is_drink": "مشروب", "date": "التاريخ",
                 }
             elif data_type == "members":
-                query = """
-                    SELECT name, rank, contribution, total_due, date,
-                           (contribution - total_due) as balance
-                    FROM members
-                    WHERE 1=1
+                select = f"""
+                    name, rank, {sql_major("contribution")} as contribution, {sql_major("total_due")} as total_due, date,
+                    {sql_major("contribution - total_due")} as balance
                 """
-                count_query = "SELECT COUNT(*) FROM members WHERE 1=1"
+                source = "FROM members WHERE 1=1"
                 if member_id != "all":
-                    query += " AND member_id = ?"
-                    count_query += " AND member_id = ?"
+                    source += " AND member_id = ?"
                     params.append(member_id)
-                columns = ["name", "rank", "contribution", "total_due", "balance", "date"]
+                id_column = "member_id"
                 column_names = {
                     "name": "الاسم", "rank": "الرتبة", "contribution": "المساهمة",
                     "total_due": "المستحق", "balance": "الرصيد", "date": "تاريخ التسجيل",
                 }
             elif data_type == "meals":
-                query = """
-                    SELECT m.name, mr.meal_type, mr.date, mr.final_cost
+                select = f"m.name, mr.meal_type, mr.date, {sql_major('mr.final_cost')} as final_cost"
+                source = """
                     FROM meal_records mr
                     JOIN members m ON mr.member_id = m.member_id
                     WHERE 1=1
                 """
-                count_query = "SELECT COUNT(*) FROM meal_records mr JOIN members m ON mr.member_id = m.member_id WHERE 1=1"
                 if member_id != "all":
-                    query += " AND mr.member_id = ?"
-                    count_query += " AND mr.member_id = ?"
+                    source += " AND mr.member_id = ?"
                     params.append(member_id)
                 if date_from:
-                    query += " AND mr.date >= ?"
-                    count_query += " AND mr.date >= ?"
+                    source += " AND mr.date >= ?"
                     params.append(date_from)
                 if date_to:
-                    query += " AND mr.date <= ?"
-                    count_query += " AND mr.date <= ?"
+                    source += " AND mr.date <= ?"
                     params.append(date_to)
-                columns = ["name", "meal_type", "date", "final_cost"]
+                order_column, id_column = "mr.date", "mr.meal_record_id"
                 column_names = {
                     "name": "الاسم", "meal_type": "نوع الوجبة", "date": "التاريخ", "final_cost": "التكلفة",
                 }
             elif data_type == "drinks":
-                query = """
-                    SELECT m.name, dr.drink_name, dr.quantity, dr.total_cost, dr.date
+                select = f"m.name, dr.drink_name, dr.quantity, {sql_major('dr.total_cost')} as total_cost, dr.date"
+                source = """
                     FROM drink_records dr
                     JOIN members m ON dr.member_id = m.member_id
                     WHERE 1=1
                 """
-                count_query = "SELECT COUNT(*) FROM drink_records dr JOIN members m ON dr.member_id = m.member_id WHERE 1=1"
                 if member_id != "all":
-                    query += " AND dr.member_id = ?"
-                    count_query += " AND dr.member_id = ?"
+                    source += " AND dr.member_id = ?"
                     params.append(member_id)
                 if date_from:
-                    query += " AND dr.date >= ?"
-                    count_query += " AND dr.date >= ?"
+                    source += " AND dr.date >= ?"
                     params.append(date_from)
                 if date_to:
-                    query += " AND dr.date <= ?"
-                    count_query += " AND dr.date <= ?"
+                    source += " AND dr.date <= ?"
                     params.append(date_to)
-                columns = ["name", "drink_name", "quantity", "total_cost", "date"]
+                order_column, id_column = "dr.date", "dr.drink_record_id"
                 column_names = {
                     "name": "الاسم", "drink_name": "اسم المشروب", "quantity": "الكمية",
                     "total_cost": "التكلفة", "date": "التاريخ",
                 }
             elif data_type == "misc":
-                query = """
-                    SELECT m.name, mc.misc_amount, mc.meal_count, mc.distribution_date
+                select = f"m.name, {sql_major('mc.misc_amount')} as misc_amount, mc.meal_count, mc.distribution_date"
+                source = """
                     FROM miscellaneous_contributions mc
                     JOIN members m ON mc.member_id = m.member_id
                     WHERE 1=1
                 """
-                count_query = "SELECT COUNT(*) FROM miscellaneous_contributions mc JOIN members m ON mc.member_id = m.member_id WHERE 1=1"
                 if member_id != "all":
-                    query += " AND mc.member_id = ?"
-                    count_query += " AND mc.member_id = ?"
+                    source += " AND mc.member_id = ?"
                     params.append(member_id)
                 if date_from:
-                    query += " AND mc.distribution_date >= ?"
-                    count_query += " AND mc.distribution_date >= ?"
+                    source += " AND mc.distribution_date >= ?"
                     params.append(date_from)
                 if date_to:
-                    query += " AND mc.distribution_date <= ?"
-                    count_query += " AND mc.distribution_date <= ?"
+                    source += " AND mc.distribution_date <= ?"
                     params.append(date_to)
-                columns = ["name", "misc_amount", "meal_count", "distribution_date"]
+                order_column, id_column = "mc.distribution_date", "mc.misc_contribution_id"
                 column_names = {
                     "name": "الاسم", "misc_amount": "قيمة النثرية", "meal_count": "عدد الوجبات",
                     "distribution_date": "تاريخ التوزيع",
                 }
-            # إضافة Pagination
-            self.total_rows = self.db.fetch_one(count_query, params)[0] if count_query else 0
-            offset = (self.current_page - 1) * self.rows_per_page
-            query += f" LIMIT {self.rows_per_page} OFFSET {offset}"
-            rows = self.db.fetch_all(query, params)
-            if not rows:
-                self.show_snackbar("مفيش بيانات مطابقة للفلاتر دي!")
-                self.result_table.columns = [ft.DataColumn(ft.Text("لا توجد بيانات", style=self.text_style))]
-                self.result_table.rows = []
-                self.result_table.visible = True
-                self.pagination_row.controls = []
             else:
-                self.result_table.columns = [ft.DataColumn(ft.Text(col_name, style=self.text_style)) for col_name in column_names.values()]
-                self.result_table.rows = [
-                    ft.DataRow([ft.DataCell(ft.Text(str(cell), style=self.text_style)) for cell in row]) for row in rows
-                ]
-                self.result_table.visible = True
-                self.update_pagination()
-            self.page.update()
+                self.show_snackbar("اختار نوع البيانات أولاً!")
+                return
+            self.paginator = KeysetPaginator(
+                self.db, select, source, params, id_column, order_column, group_by, self.rows_per_page
+            )
+            self.column_headers = list(column_names.values())
+            # حفظ الاستعلام كاملًا (بدون تقسيم الصفحات) ليُصدَّر منه مباشرة
+            query, query_params = self.paginator.full_query()
+            self.export_source = (query, query_params, self.column_headers)
+            self.render_page(self.paginator.first())
         except Exception as e:
             logging.error(f"خطأ في جلب البيانات: {e}")
             self.show_snackbar("حدث خطأ في جلب البيانات!")
@@ -370,31 +377,56 @@ class CurrentReportsPage:
             self.result_table.visible = True
             self.page.update()
 
+    def render_page(self, rows):
+        self.current_page = self.paginator.page_number
+        self.total_rows = self.paginator.count()
+        if not rows:
+            self.show_snackbar("مفيش بيانات مطابقة للفلاتر دي!")
+            self.result_table.columns = [ft.DataColumn(ft.Text("لا توجد بيانات", style=self.text_style))]
+            self.result_table.rows = []
+            self.result_table.visible = True
+            self.pagination_row.controls = []
+        else:
+            self.result_table.columns = [ft.DataColumn(ft.Text(col_name, style=self.text_style)) for col_name in self.column_headers]
+            self.result_table.rows = [
+                ft.DataRow([ft.DataCell(ft.Text(str(cell), style=self.text_style)) for cell in row]) for row in rows
+            ]
+            self.result_table.visible = True
+            self.update_pagination()
+        self.page.update()
+
+    def change_page(self, move):
+        try:
+            rows = move()
+            if rows is not None:
+                self.render_page(rows)
+        except Exception as e:
+            logging.error(f"خطأ في جلب الصفحة: {e}")
+            self.show_snackbar("حدث خطأ في جلب البيانات!")
+
     def update_pagination(self):
-        total_pages = (self.total_rows + self.rows_per_page - 1) // self.rows_per_page
+        paginator = self.paginator
         self.pagination_row.controls = [
-            create_button("السابق", lambda e: self.show_report(e, self.current_page - 1) if self.current_page > 1 else None,
-                          bgcolor=ft.colors.GREY, disabled=self.current_page <= 1),
-            ft.Text(f"صفحة {self.current_page} من {total_pages}", style=self.text_style),
-            create_button("التالي", lambda e: self.show_report(e, self.current_page + 1) if self.current_page < total_pages else None,
-                          bgcolor=ft.colors.GREY, disabled=self.current_page >= total_pages),
+            create_button("السابق", lambda e: self.change_page(paginator.previous),
+                          bgcolor=ft.colors.GREY, disabled=not paginator.has_previous),
+            ft.Text(f"صفحة {paginator.page_number} من {paginator.total_pages}", style=self.text_style),
+            create_button("التالي", lambda e: self.change_page(paginator.next),
+                          bgcolor=ft.colors.GREY, disabled=not paginator.has_next),
         ]
 
     def export_to_excel(self, e):
-        if not self.result_table.rows:
+        if not self.result_table.rows or not getattr(self, "export_source", None):
             self.show_snackbar("مفيش بيانات للتصدير!")
             return
-        data_type = self.data_type.value
-        df = pd.DataFrame(
-            [[cell.content.value for cell in row.cells] for row in self.result_table.rows],
-            columns=[col.label.value for col in self.result_table.columns]
+        # تصدير كل الصفحات من مؤشر قاعدة البيانات وليس الصفحة المعروضة فقط
+        query, params, headers = self.export_source
+        filename = f"تقرير_{self.data_type.value}"
+        run_export(
+            self.page,
+            lambda job: export_query(self.db, query, params, headers, filename, job=job),
+            self.show_snackbar,
+            total_rows=self.total_rows,
         )
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
-        filename = f"{reports_dir}/تقرير_{data_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(filename, index=False, engine="openpyxl")
-        self.show_snackbar(f"تم حفظ التقرير في: {filename}")
 
     def show_snackbar(self, message):
         self.page.snack_bar = ft.SnackBar(ft.Text(message, style=self.text_style))
@@ -491,30 +523,36 @@ class ArchivedReportsPage:
     def update_members(self, e):
         pass  # سيتم استخدامها في ArchivedDataPage
 
-    def show_report(self, e, page_number=1):
+    def show_report(self, e):
         if not self.archive_dropdown.value:
             self.show_snackbar("اختار فترة أرشيف أولاً!")
             return
-        self.current_page = page_number
         archive_key_id = int(self.archive_dropdown.value)
         try:
-            query = """
-                SELECT m.name, s.total_meals, s.total_drinks, s.total_miscellaneous,
-                       s.total_consumption, s.total_contribution, s.remaining_cash
-                FROM closure_summary s
-                JOIN members_archive m ON s.member_id = m.member_id
-                WHERE s.closure_id IN (SELECT closure_id FROM monthly_closures WHERE archive_key_id = ?)
+            select = ", ".join(["m.name"] + [
+                f"{sql_major('s.' + column)} as {column}" for column in (
+                    "total_meals", "total_drinks", "total_miscellaneous",
+                    "total_consumption", "total_contribution", "remaining_cash",
+                )
+            ])
+            # الاستعلام على جداول الأرشيف وحدها فيُنفذ على ملف الفترة إن كانت مختومة
+            source = """
+                FROM closure_summary_archive s
+                JOIN members_archive m ON s.member_id = m.member_id AND m.archive_key_id = s.archive_key_id
+                WHERE s.archive_key_id = ?
             """
-            count_query = """
-                SELECT COUNT(*) 
-                FROM closure_summary s
-                WHERE s.closure_id IN (SELECT closure_id FROM monthly_closures WHERE archive_key_id = ?)
-            """
-            params = [archive_key_id]
-            self.total_rows = self.db.fetch_one(count_query, params)[0]
-            offset = (self.current_page - 1) * self.rows_per_page
-            query += f" LIMIT {self.rows_per_page} OFFSET {offset}"
-            rows = self.db.fetch_all(query, params)
+            self.paginator = KeysetPaginator(
+                self.db.archives.period(archive_key_id), select, source, [archive_key_id], "s.summary_id",
+                page_size=self.rows_per_page
+            )
+            query, query_params = self.paginator.full_query()
+            self.export_source = (query, query_params, [
+                "الاسم", "إجمالي الوجبات", "إجمالي المشروبات", "إجمالي النثريات",
+                "إجمالي الاستهلاك", "إجمالي المساهمة", "النقدي المتبقي"
+            ])
+            rows = self.paginator.first()
+            self.current_page = self.paginator.page_number
+            self.total_rows = self.paginator.count()
             if not rows:
                 self.show_snackbar("مفيش بيانات للفترة دي!")
                 self.result_table.columns = [ft.DataColumn(ft.Text("لا توجد بيانات", style=self.text_style))]
@@ -541,19 +579,18 @@ class ArchivedReportsPage:
             self.page.update()
 
     def export_to_excel(self, e):
-        if not self.result_table.rows:
+        if not self.result_table.rows or not getattr(self, "export_source", None):
             self.show_snackbar("مفيش بيانات للتصدير!")
             return
-        df = pd.DataFrame(
-            [[cell.content.value for cell in row.cells] for row in self.result_table.rows],
-            columns=[col.label.value for col in self.result_table.columns]
+        # تصدير كل الصفحات من مؤشر قاعدة البيانات وليس الصفحة المعروضة فقط
+        query, params, headers = self.export_source
+        filename = "تقرير_مؤرشف"
+        run_export(
+            self.page,
+            lambda job: export_query(self.paginator.db, query, params, headers, filename, job=job),
+            self.show_snackbar,
+            total_rows=self.total_rows,
         )
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
-        filename = f"{reports_dir}/تقرير_مؤرشف_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(filename, index=False, engine="openpyxl")
-        self.show_snackbar(f"تم حفظ التقرير في: {filename}")
 
     def show_snackbar(self, message):
         self.page.snack_bar = ft.SnackBar(ft.Text(message, style=self.text_style))
@@ -691,7 +728,7 @@ class ArchivedDataPage:
                 return
             archive_key_id = int(self.archive_dropdown.value)
             query = "SELECT member_id, name FROM members_archive WHERE archive_key_id = ? ORDER BY name"
-            members = self.db.fetch_all(query, (archive_key_id,))
+            members = self.db.archives.period(archive_key_id).fetch_all(query, (archive_key_id,))
             self.member.options = [ft.dropdown.Option(name, str(member_id)) for member_id, name in members]
             self.member.options.insert(0, ft.dropdown.Option("الكل", "all"))
             self.member.value = "all"
@@ -709,172 +746,125 @@ class ArchivedDataPage:
         except ValueError:
             return False
 
-    def show_data(self, e, page_number=1):
+    def show_data(self, e):
         if not self.archive_dropdown.value:
             self.show_snackbar("اختار فترة أرشيف أولاً!")
             return
-        self.current_page = page_number
         archive_key_id = int(self.archive_dropdown.value)
         data_type = self.data_type.value
         member_id = self.member.value
         expense_type = self.expense_type.value
-        query = ""
-        count_query = ""
-        columns = []
         column_names = {}
         params = [archive_key_id]
+        # مفتاح تقسيم الصفحات لكل نوع: (عمود الترتيب، المعرف) داخل فهرس الفترة
+        order_column = None
+        group_by = None
         try:
             if data_type == "all":
-                query = """
-                    SELECT m.name, COUNT(mr.meal_record_id) as total_meals, 
-                           SUM(dr.quantity) as total_drinks, SUM(mc.misc_amount) as total_misc,
-                           SUM(mr.final_cost + dr.total_cost + mc.misc_amount) as total_consumption,
-                           m.contribution, (m.contribution - m.total_due) as remaining_cash
-                    FROM members_archive m
-                    LEFT JOIN meal_records_archive mr ON m.member_id = mr.member_id AND mr.archive_key_id = ?
-                    LEFT JOIN drink_records_archive dr ON m.member_id = dr.member_id AND dr.archive_key_id = ?
-                    LEFT JOIN miscellaneous_contributions_archive mc ON m.member_id = mc.member_id AND mc.archive_key_id = ?
-                    WHERE m.archive_key_id = ?
-                """
-                count_query = "SELECT COUNT(*) FROM members_archive WHERE archive_key_id = ?"
+                # المبالغ تُجمع بالقروش ولا تُحول إلى جنيه إلا في الإخراج
+                select = CONSUMPTION_SELECT
+                source, params = consumption_source(archived=True, archive_key_id=archive_key_id)
                 if member_id != "all":
-                    query += " AND m.member_id = ?"
-                    count_query += " AND member_id = ?"
+                    source += " AND m.member_id = ?"
                     params.append(member_id)
-                query += " GROUP BY m.member_id, m.name, m.contribution, m.total_due"
-                columns = ["name", "total_meals", "total_drinks", "total_misc", "total_consumption", "contribution", "remaining_cash"]
+                id_column = "m.member_id"
                 column_names = {
                     "name": "الاسم", "total_meals": "إجمالي الوجبات", "total_drinks": "إجمالي المشروبات",
                     "total_misc": "إجمالي النثريات", "total_consumption": "إجمالي الاستهلاك",
                     "contribution": "المساهمة", "remaining_cash": "النقدي المتبقي",
                 }
-                params.extend([archive_key_id, archive_key_id, archive_key_id])
             elif data_type == "expenses":
-                query = """
-                    SELECT item_name, quantity, price, total_price, consumption, remaining, 
-                           CASE WHEN is_miscellaneous = 1 THEN 'نعم' ELSE 'لا' END as is_misc,
-                           CASE WHEN is_drink = 1 THEN 'نعم' ELSE 'لا' END as is_drink,
-                           date
-                    FROM expenses_archive
-                    WHERE archive_key_id = ?
+                select = f"""
+                    item_name, quantity, {sql_major("price")} as price, {sql_major("total_price")} as total_price,
+                    consumption, remaining,
+                    CASE WHEN is_miscellaneous = 1 THEN 'نعم' ELSE 'لا' END as is_misc,
+                    CASE WHEN is_drink = 1 THEN 'نعم' ELSE 'لا' END as is_drink,
+                    date
                 """
-                count_query = "SELECT COUNT(*) FROM expenses_archive WHERE archive_key_id = ?"
+                source = "FROM expenses_archive WHERE archive_key_id = ?"
                 if expense_type != "all":
                     if expense_type == "misc":
-                        query += " AND is_miscellaneous = 1"
-                        count_query += " AND is_miscellaneous = 1"
+                        source += " AND is_miscellaneous = 1"
                     elif expense_type == "drink":
-                        query += " AND is_drink = 1"
-                        count_query += " AND is_drink = 1"
+                        source += " AND is_drink = 1"
                     else:
-                        query += " AND is_miscellaneous = 0 AND is_drink = 0"
-                        count_query += " AND is_miscellaneous = 0 AND is_drink = 0"
-                columns = ["item_name", "quantity", "price", "total_price", "consumption", "remaining", "is_misc", "is_drink", "date"]
+                        source += " AND is_miscellaneous = 0 AND is_drink = 0"
+                order_column, id_column = "expenses_archive.date", "expenses_archive.expense_id"
                 column_names = {
                     "item_name": "اسم الصنف", "quantity": "الكمية", "price": "سعر الوحدة",
                     "total_price": "السعر الإجمالي", "consumption": "الاستهلاك", "remaining": "المتبقي",
                     "is_misc": "نثرية", "is_drink": "مشروب", "date": "التاريخ",
                 }
             elif data_type == "members":
-                query = """
-                    SELECT name, rank, contribution, total_due, date,
-                           (contribution - total_due) as balance
-                    FROM members_archive
-                    WHERE archive_key_id = ?
+                select = f"""
+                    name, rank, {sql_major("contribution")} as contribution, {sql_major("total_due")} as total_due, date,
+                    {sql_major("contribution - total_due")} as balance
                 """
-                count_query = "SELECT COUNT(*) FROM members_archive WHERE archive_key_id = ?"
+                source = "FROM members_archive WHERE archive_key_id = ?"
                 if member_id != "all":
-                    query += " AND member_id = ?"
-                    count_query += " AND member_id = ?"
+                    source += " AND member_id = ?"
                     params.append(member_id)
-                columns = ["name", "rank", "contribution", "total_due", "balance", "date"]
+                id_column = "member_id"
                 column_names = {
                     "name": "الاسم", "rank": "الرتبة", "contribution": "المساهمة",
                     "total_due": "المستحق", "balance": "الرصيد", "date": "تاريخ التسجيل",
                 }
             elif data_type == "meals":
-                query = """
-                    SELECT m.name, mr.meal_type, mr.date, mr.final_cost
+                select = f"m.name, mr.meal_type, mr.date, {sql_major('mr.final_cost')} as final_cost"
+                source = """
                     FROM meal_records_archive mr
-                    JOIN members_archive m ON mr.member_id = m.member_id
-                    WHERE mr.archive_key_id = ?
-                """
-                count_query = """
-                    SELECT COUNT(*) 
-                    FROM meal_records_archive mr 
-                    JOIN members_archive m ON mr.member_id = m.member_id 
+                    JOIN members_archive m ON mr.member_id = m.member_id AND m.archive_key_id = mr.archive_key_id
                     WHERE mr.archive_key_id = ?
                 """
                 if member_id != "all":
-                    query += " AND mr.member_id = ?"
-                    count_query += " AND mr.member_id = ?"
+                    source += " AND mr.member_id = ?"
                     params.append(member_id)
-                columns = ["name", "meal_type", "date", "final_cost"]
+                order_column, id_column = "mr.date", "mr.meal_record_id"
                 column_names = {
                     "name": "الاسم", "meal_type": "نوع الوجبة", "date": "التاريخ", "final_cost": "التكلفة",
                 }
             elif data_type == "drinks":
-                query = """
-                    SELECT m.name, dr.drink_name, dr.quantity, dr.total_cost, dr.date
+                select = f"m.name, dr.drink_name, dr.quantity, {sql_major('dr.total_cost')} as total_cost, dr.date"
+                source = """
                     FROM drink_records_archive dr
-                    JOIN members_archive m ON dr.member_id = m.member_id
-                    WHERE dr.archive_key_id = ?
-                """
-                count_query = """
-                    SELECT COUNT(*) 
-                    FROM drink_records_archive dr 
-                    JOIN members_archive m ON dr.member_id = m.member_id 
+                    JOIN members_archive m ON dr.member_id = m.member_id AND m.archive_key_id = dr.archive_key_id
                     WHERE dr.archive_key_id = ?
                 """
                 if member_id != "all":
-                    query += " AND dr.member_id = ?"
-                    count_query += " AND dr.member_id = ?"
+                    source += " AND dr.member_id = ?"
                     params.append(member_id)
-                columns = ["name", "drink_name", "quantity", "total_cost", "date"]
+                order_column, id_column = "dr.date", "dr.drink_record_id"
                 column_names = {
                     "name": "الاسم", "drink_name": "اسم المشروب", "quantity": "الكمية",
                     "total_cost": "التكلفة", "date": "التاريخ",
                 }
             elif data_type == "misc":
-                query = """
-                    SELECT m.name, mc.misc_amount, mc.meal_count, mc.distribution_date
+                select = f"m.name, {sql_major('mc.misc_amount')} as misc_amount, mc.meal_count, mc.distribution_date"
+                source = """
                     FROM miscellaneous_contributions_archive mc
-                    JOIN members_archive m ON mc.member_id = m.member_id
-                    WHERE mc.archive_key_id = ?
-                """
-                count_query = """
-                    SELECT COUNT(*) 
-                    FROM miscellaneous_contributions_archive mc 
-                    JOIN members_archive m ON mc.member_id = m.member_id 
+                    JOIN members_archive m ON mc.member_id = m.member_id AND m.archive_key_id = mc.archive_key_id
                     WHERE mc.archive_key_id = ?
                 """
                 if member_id != "all":
-                    query += " AND mc.member_id = ?"
-                    count_query += " AND mc.member_id = ?"
+                    source += " AND mc.member_id = ?"
                     params.append(member_id)
-                columns = ["name", "misc_amount", "meal_count", "distribution_date"]
+                order_column, id_column = "mc.distribution_date", "mc.misc_contribution_id"
                 column_names = {
                     "name": "الاسم", "misc_amount": "قيمة النثرية", "meal_count": "عدد الوجبات",
                     "distribution_date": "تاريخ التوزيع",
                 }
-            self.total_rows = self.db.fetch_one(count_query, params[:1])[0] if count_query else 0
-            offset = (self.current_page - 1) * self.rows_per_page
-            query += f" LIMIT {self.rows_per_page} OFFSET {offset}"
-            rows = self.db.fetch_all(query, params)
-            if not rows:
-                self.show_snackbar("مفيش بيانات مطابقة للفلاتر دي!")
-                self.result_table.columns = [ft.DataColumn(ft.Text("لا توجد بيانات", style=self.text_style))]
-                self.result_table.rows = []
-                self.result_table.visible = True
-                self.pagination_row.controls = []
             else:
-                self.result_table.columns = [ft.DataColumn(ft.Text(col_name, style=self.text_style)) for col_name in column_names.values()]
-                self.result_table.rows = [
-                    ft.DataRow([ft.DataCell(ft.Text(str(cell), style=self.text_style)) for cell in row]) for row in rows
-                ]
-                self.result_table.visible = True
-                self.update_pagination()
-            self.page.update()
+                self.show_snackbar("اختار نوع البيانات أولاً!")
+                return
+            self.paginator = KeysetPaginator(
+                self.db.archives.period(archive_key_id), select, source, params, id_column, order_column, group_by,
+                self.rows_per_page
+            )
+            self.column_headers = list(column_names.values())
+            # حفظ الاستعلام كاملًا (بدون تقسيم الصفحات) ليُصدَّر منه مباشرة
+            query, query_params = self.paginator.full_query()
+            self.export_source = (query, query_params, self.column_headers)
+            self.render_page(self.paginator.first())
         except Exception as e:
             logging.error(f"خطأ في جلب بيانات الأرشيف: {e}")
             self.show_snackbar("حدث خطأ في جلب البيانات!")
@@ -883,30 +873,56 @@ class ArchivedDataPage:
             self.result_table.visible = True
             self.page.update()
 
+    def render_page(self, rows):
+        self.current_page = self.paginator.page_number
+        self.total_rows = self.paginator.count()
+        if not rows:
+            self.show_snackbar("مفيش بيانات مطابقة للفلاتر دي!")
+            self.result_table.columns = [ft.DataColumn(ft.Text("لا توجد بيانات", style=self.text_style))]
+            self.result_table.rows = []
+            self.result_table.visible = True
+            self.pagination_row.controls = []
+        else:
+            self.result_table.columns = [ft.DataColumn(ft.Text(col_name, style=self.text_style)) for col_name in self.column_headers]
+            self.result_table.rows = [
+                ft.DataRow([ft.DataCell(ft.Text(str(cell), style=self.text_style)) for cell in row]) for row in rows
+            ]
+            self.result_table.visible = True
+            self.update_pagination()
+        self.page.update()
+
+    def change_page(self, move):
+        try:
+            rows = move()
+            if rows is not None:
+                self.render_page(rows)
+        except Exception as e:
+            logging.error(f"خطأ في جلب الصفحة: {e}")
+            self.show_snackbar("حدث خطأ في جلب البيانات!")
+
     def update_pagination(self):
-        total_pages = (self.total_rows + self.rows_per_page - 1) // self.rows_per_page
+        paginator = self.paginator
         self.pagination_row.controls = [
-            create_button("السابق", lambda e: self.show_data(e, self.current_page - 1) if self.current_page > 1 else None,
-                          bgcolor=ft.colors.GREY, disabled=self.current_page <= 1),
-            ft.Text(f"صفحة {self.current_page} من {total_pages}", style=self.text_style),
-            create_button("التالي", lambda e: self.show_data(e, self.current_page + 1) if self.current_page < total_pages else None,
-                          bgcolor=ft.colors.GREY, disabled=self.current_page >= total_pages),
+            create_button("السابق", lambda e: self.change_page(paginator.previous),
+                          bgcolor=ft.colors.GREY, disabled=not paginator.has_previous),
+            ft.Text(f"صفحة {paginator.page_number} من {paginator.total_pages}", style=self.text_style),
+            create_button("التالي", lambda e: self.change_page(paginator.next),
+                          bgcolor=ft.colors.GREY, disabled=not paginator.has_next),
         ]
 
     def export_to_excel(self, e):
-        if not self.result_table.rows:
+        if not self.result_table.rows or not getattr(self, "export_source", None):
             self.show_snackbar("مفيش بيانات للتصدير!")
             return
-        df = pd.DataFrame(
-            [[cell.content.value for cell in row.cells] for row in self.result_table.rows],
-            columns=[col.label.value for col in self.result_table.columns]
+        # تصدير كل الصفحات من مؤشر قاعدة البيانات وليس الصفحة المعروضة فقط
+        query, params, headers = self.export_source
+        filename = "بيانات_أرشيف"
+        run_export(
+            self.page,
+            lambda job: export_query(self.paginator.db, query, params, headers, filename, job=job),
+            self.show_snackbar,
+            total_rows=self.total_rows,
         )
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
-        filename = f"{reports_dir}/بيانات_أرشيف_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(filename, index=False, engine="openpyxl")
-        self.show_snackbar(f"تم حفظ البيانات في: {filename}")
 
     def show_snackbar(self, message):
         self.page.snack_bar = ft.SnackBar(ft.Text(message, style=self.text_style))
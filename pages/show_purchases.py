@@ -1,5 +1,7 @@
 import flet as ft
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable, QueryRowSource
+from utils.money import format_money, parse_money, divide
 
 class ShowPurchasesPage:
     def __init__(self, page, background_image, db):
@@ -11,29 +13,22 @@ class ShowPurchasesPage:
         # تهيئة المتغيرات لتتبع الصف المحدد
         self.selected_row = None
         self.selected_item_id = None
-        self.selected_row_control = None
 
     def set_navigate(self, navigate):
         self.navigate = navigate
 
     def get_expenses_data(self):
-        results = self.db.fetch_all(
-               "SELECT expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink FROM expenses WHERE is_miscellaneous = 0"
-        )
         columns = ["expense_id", "item_name", "quantity", "price", "total_price", "consumption", "remaining", "is_miscellaneous", "is_drink"]
-        return [dict(zip(columns, row)) for row in results]
-        
-
-    def select_row(self, e, row):
-        if self.selected_row_control is not None:
-            self.selected_row_control.bgcolor = None  # إعادة لون الصف السابق
+        return QueryRowSource(
+            self.db,
+            "SELECT expense_id, item_name, quantity, price, total_price, consumption, remaining, is_miscellaneous, is_drink FROM expenses WHERE is_miscellaneous = 0 ORDER BY expense_id",
+            row_factory=lambda row: dict(zip(columns, row)),
+        )
 
+    def select_row(self, row):
+        # الجدول يلون الصف المحدد بنفسه
         self.selected_row = row
         self.selected_item_id = row['expense_id']
-        if e is not None:  # إذا تم النقر على الصف
-            e.control.bgcolor = ft.colors.YELLOW  # تغيير لون الصف المحدد إلى أصفر
-            self.selected_row_control = e.control
-        self.page.update()
 
     def edit_item(self, e):
         if not hasattr(self, 'selected_row') or self.selected_row is None:
@@ -71,8 +66,8 @@ class ShowPurchasesPage:
         fields = [
             ft.TextField(label="اسم الصنف", value=self.selected_row['item_name'], height=40, text_size=12),
             ft.TextField(label="الكمية", value=str(self.selected_row['quantity']), height=40, text_size=12),
-            ft.TextField(label="سعر الوحدة", value=str(self.selected_row['price']), height=40, text_size=12),
-            ft.TextField(label="السعر الإجمالي", value=str(self.selected_row['total_price']), height=40, text_size=12),
+            ft.TextField(label="سعر الوحدة", value=format_money(self.selected_row['price']), height=40, text_size=12),
+            ft.TextField(label="السعر الإجمالي", value=format_money(self.selected_row['total_price']), height=40, text_size=12),
             ft.TextField(label="الاستهلاك", value=str(self.selected_row['consumption']), height=40, text_size=12),
             ft.TextField(label="المتبقي", value=str(self.selected_row['remaining']), height=40, text_size=12),
         ]
@@ -128,30 +123,43 @@ class ShowPurchasesPage:
     def save_edit(self, item_id, dialog):
         controls = dialog.content.controls
         item_name = controls[0].value
-        quantity = int(controls[1].value)
-        price = float(controls[2].value)
-        total_price = float(controls[3].value)
-        consumption = int(controls[4].value)
-        remaining = int(controls[5].value)
+        try:
+            quantity = int(controls[1].value)
+            price = parse_money(controls[2].value)
+            total_price = parse_money(controls[3].value)
+            consumption = int(controls[4].value)
+            remaining = int(controls[5].value)
+        except (TypeError, ValueError):
+            self.show_snackbar("يرجى ملء جميع الحقول بشكل صحيح.")
+            self.page.update()
+            return
 
         # التحقق من التغييرات التلقائية
         if remaining != quantity - consumption:
             self.show_snackbar("سيتم تعديل المتبقيات تلقائيًا بناءً على الكمية والاستهلاك.")
             remaining = quantity - consumption
 
-        if price != total_price / quantity:
+        # صنف نفدت كميته (الكمية صفر بعد الترحيل) يحتفظ بسعر وحدته
+        if quantity > 0 and price != divide(total_price, quantity):
             self.show_snackbar("سيتم تعديل سعر الوحدة تلقائيًا بناءً على السعر الإجمالي والكمية.")
-            price = total_price / quantity
+            price = divide(total_price, quantity)
 
         if item_name and quantity >= 0 and price >= 0:
             try:
-                cursor = self.db.conn.cursor()
-                cursor.execute("""
-                    UPDATE expenses 
-                    SET item_name=?, quantity=?, price=?, total_price=?, consumption=?, remaining=?, is_miscellaneous=?, is_drink=? 
-                    WHERE expense_id=?
-                """, (item_name, quantity, price, total_price, consumption, remaining, self.selected_row['is_miscellaneous'], self.selected_row['is_drink'], item_id))
-                self.db.conn.commit()
+                with self.db.transaction() as cursor:
+                    # فرق الكمية والاستهلاك يُسجل كحركة تسوية في دفتر المخزون
+                    cursor.execute("""
+                        INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date)
+                        SELECT expense_id, 'adjust', ? - quantity, ? - consumption, date('now')
+                        FROM expenses
+                        WHERE expense_id=? AND (quantity <> ? OR consumption <> ?)
+                    """, (quantity, consumption, item_id, quantity, consumption))
+                    cursor.execute("""
+                        UPDATE expenses 
+                        SET item_name=?, price=?, total_price=?, is_miscellaneous=?, is_drink=? 
+                        WHERE expense_id=?
+                    """, (item_name, price, total_price, self.selected_row['is_miscellaneous'], self.selected_row['is_drink'], item_id))
+                    self.db.catalog.put_item(item_id, item_name, self.selected_row['is_drink'], self.selected_row['is_miscellaneous'])
                 self.show_snackbar("تم تعديل البيانات بنجاح!")
                 self.close_dialog(dialog)
                 self.update_table()
@@ -183,9 +191,9 @@ class ShowPurchasesPage:
 
     def confirm_delete(self, item_id, dialog):
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("DELETE FROM expenses WHERE expense_id=?", (item_id,))
-            self.db.conn.commit()
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM expenses WHERE expense_id=?", (item_id,))
+                self.db.catalog.drop_item(item_id)
             self.show_snackbar("تم حذف الصنف بنجاح!")
             self.close_dialog(dialog)
             self.update_table()
@@ -194,27 +202,9 @@ class ShowPurchasesPage:
 
     def update_table(self):
         # تحديث البيانات في الجدول
-        self.rows = self.get_expenses_data()
-        self.data_rows.clear()
-        display_columns = ["remaining", "consumption", "total_price", "price", "quantity", "item_name", "expense_id"]
-        self.data_rows.extend([
-            ft.Container(
-                content=ft.Row(
-                    [
-                        ft.Container(
-                            content=ft.Text(str(row[col])),
-                            width=80 if col == "expense_id" else 100,
-                            alignment=ft.alignment.center,
-                            padding=10,
-                            bgcolor=None,
-                        ) for col in display_columns
-                    ],
-                    alignment=ft.MainAxisAlignment.CENTER,
-                ),
-                on_click=lambda e, row=row: self.select_row(e, row),
-            ) for row in self.rows
-        ])
-        self.scrollable_data.controls = self.data_rows
+        self.table_view.set_rows(self.get_expenses_data())
+        self.selected_row = None
+        self.selected_item_id = None
         self.page.update()
 
     def close_dialog(self, dialog):
@@ -248,68 +238,22 @@ class ShowPurchasesPage:
             "remaining": "المتبقي",
         }
 
-        # صف العناوين الثابت
-        self.header_row = ft.Container(
-            content=ft.Row(
-                [
-                    ft.Container(
-                        content=ft.Text(column_names[col], weight=ft.FontWeight.BOLD),
-                        width=80 if col == "expense_id" else 100,
-                        alignment=ft.alignment.center,
-                        padding=10,
-                        bgcolor=ft.colors.GREEN,
-                    ) for col in columns
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-            ),
-            bgcolor=ft.colors.GREEN,
-            shadow=ft.BoxShadow(blur_radius=30, color="green"),
-            width=750,
-        )
-
-        # بيانات الجدول
-        self.rows = self.get_expenses_data()
-        self.data_rows = [
-            ft.Container(
-                content=ft.Row(
-                    [
-                        ft.Container(
-                            content=ft.Text(str(row[col])),
-                            width=80 if col == "expense_id" else 100,
-                            alignment=ft.alignment.center,
-                            padding=10,
-                            bgcolor=None,
-                        ) for col in columns
-                    ],
-                    alignment=ft.MainAxisAlignment.CENTER,
-                ),
-                on_click=lambda e, row=row: self.select_row(e, row),
-            ) for idx, row in enumerate(self.rows)
-        ]
+        formats = {"price": format_money, "total_price": format_money}
 
-        # الجدول مع سكرول بار
-        self.scrollable_data = ft.ListView(
-            self.data_rows,
+        # الجدول يرسم الصفوف الظاهرة فقط مهما كان عدد الأصناف
+        self.table_view = VirtualTable(
+            [(column_names[col], col, 80 if col == "expense_id" else 100, formats.get(col)) for col in columns],
+            self.get_expenses_data(),
             height=300,
             width=750,
-            spacing=0,
-            padding=0,
-        )
-
-        # تغليف ListView داخل Container
-        scrollable_container = ft.Container(
-            content=self.scrollable_data,
+            on_select=self.select_row,
+            header_color=ft.colors.GREEN,
             bgcolor=ft.colors.LIGHT_GREEN,
-            shadow=ft.BoxShadow(blur_radius=30, color="green"),
+            border_color=None,
         )
-
-        # وضع صف العناوين والبيانات في عمود
-        self.table = ft.Column(
-            [
-                self.header_row,
-                scrollable_container,
-            ],
-            spacing=0,
+        self.table = ft.Container(
+            content=self.table_view.control,
+            shadow=ft.BoxShadow(blur_radius=30, color="green"),
         )
 
         # وضع الأزرار في سطر واحد باستخدام الزر الموحد
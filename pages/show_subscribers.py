@@ -1,5 +1,7 @@
 import flet as ft
 from utils.button_utils import create_button
+from utils.virtual_table import VirtualTable, QueryRowSource
+from utils.money import MINOR_UNITS, format_money, parse_money
 
 class ShowSubscribersPage:
     def __init__(self, page, background_image, db):
@@ -11,26 +13,22 @@ class ShowSubscribersPage:
         # تهيئة المتغيرات لتتبع الصف المحدد
         self.selected_row = None
         self.selected_member_id = None
-        self.selected_row_control = None
 
     def set_navigate(self, navigate):
         self.navigate = navigate
 
     def get_members_data(self):
-        rows = self.db.fetch_all("SELECT member_id, rank, name, contribution, total_due FROM members")
         columns = ["member_id", "rank", "name", "contribution", "total_due"]
-        return [dict(zip(columns, row)) for row in rows]
-
-    def select_row(self, e, row):
-        if self.selected_row_control is not None:
-            self.selected_row_control.bgcolor = None  # إعادة لون الصف السابق
+        return QueryRowSource(
+            self.db,
+            "SELECT member_id, rank, name, contribution, total_due FROM members ORDER BY member_id",
+            row_factory=lambda row: dict(zip(columns, row)),
+        )
 
+    def select_row(self, row):
+        # الجدول يلون الصف المحدد بنفسه
         self.selected_row = row
         self.selected_member_id = row['member_id']
-        if e is not None:  # إذا تم النقر على الصف
-            e.control.bgcolor = ft.colors.YELLOW  # تغيير لون الصف المحدد إلى أصفر
-            self.selected_row_control = e.control
-        self.page.update()
 
     def edit_member(self, e):
         if not hasattr(self, 'selected_row') or self.selected_row is None:
@@ -43,8 +41,8 @@ class ShowSubscribersPage:
         fields = [
             ft.TextField(label="الرتبة", value=self.selected_row['rank'], height=40, text_size=12),
             ft.TextField(label="الاسم", value=self.selected_row['name'], height=40, text_size=12),
-            ft.TextField(label="مبلغ المساهمة", value=str(self.selected_row['contribution']), height=40, text_size=12),
-            ft.TextField(label="المبلغ المستحق", value=str(self.selected_row['total_due']), height=40, text_size=12),
+            ft.TextField(label="مبلغ المساهمة", value=format_money(self.selected_row['contribution']), height=40, text_size=12),
+            ft.TextField(label="المبلغ المستحق", value=format_money(self.selected_row['total_due']), height=40, text_size=12),
         ]
 
         # إنشاء صف لأزرار الحفظ والإلغاء في السنتر
@@ -78,15 +76,15 @@ class ShowSubscribersPage:
         controls = dialog.content.controls
         rank = controls[0].value
         name = controls[1].value
-        contribution = float(controls[2].value)
-        total_due = float(controls[3].value)
+        contribution = parse_money(controls[2].value)
+        total_due = parse_money(controls[3].value)
 
         if rank and name and contribution >= 0 and total_due >= 0:
             try:
-                cursor = self.db.conn.cursor()
-                cursor.execute("UPDATE members SET total_due=?, contribution=?, name=?, rank=? WHERE member_id=?",
-                               (total_due, contribution, name, rank, member_id))
-                self.db.conn.commit()
+                with self.db.transaction() as cursor:
+                    cursor.execute("UPDATE members SET total_due=?, contribution=?, name=?, rank=? WHERE member_id=?",
+                                   (total_due, contribution, name, rank, member_id))
+                    self.db.catalog.put_member(member_id, rank, name)
                 self.show_snackbar("تم تعديل البيانات بنجاح!")
                 self.close_dialog(dialog)
                 self.update_table()
@@ -118,9 +116,9 @@ class ShowSubscribersPage:
 
     def confirm_delete(self, member_id, dialog):
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("DELETE FROM members WHERE member_id=?", (member_id,))
-            self.db.conn.commit()
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM members WHERE member_id=?", (member_id,))
+                self.db.catalog.drop_member(member_id)
             self.show_snackbar("تم حذف المشترك بنجاح!")
             self.close_dialog(dialog)
             self.update_table()
@@ -129,26 +127,9 @@ class ShowSubscribersPage:
 
     def update_table(self):
         # تحديث البيانات في الجدول
-        self.rows = self.get_members_data()
-        self.data_rows.clear()
-        self.data_rows.extend([
-            ft.Container(
-                content=ft.Row(
-                    [
-                        ft.Container(
-                            content=ft.Text(str(row[col])),
-                            width=120,
-                            alignment=ft.alignment.center,
-                            padding=10,
-                            bgcolor=None,
-                        ) for col in ["total_due", "contribution", "name", "rank", "member_id"]
-                    ],
-                    alignment=ft.MainAxisAlignment.CENTER,
-                ),
-                on_click=lambda e, row=row: self.select_row(e, row),
-            ) for idx, row in enumerate(self.rows)
-        ])
-        self.scrollable_data.controls = self.data_rows
+        self.table_view.set_rows(self.get_members_data())
+        self.selected_row = None
+        self.selected_member_id = None
         self.page.update()
 
     def close_dialog(self, dialog):
@@ -181,68 +162,25 @@ class ShowSubscribersPage:
             "total_due": "المبلغ المستحق",
         }
 
-        # صف العناوين الثابت
-        self.header_row = ft.Container(
-            content=ft.Row(
-                [
-                    ft.Container(
-                        content=ft.Text(column_names[col], weight=ft.FontWeight.BOLD),
-                        width=120,
-                        alignment=ft.alignment.center,
-                        padding=10,
-                        bgcolor=ft.colors.GREEN,
-                    ) for col in columns
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-            ),
-            bgcolor=ft.colors.GREEN,
-            shadow=ft.BoxShadow(blur_radius=30, color="green"),
-            width=600,
-        )
-
-        # بيانات الجدول
-        self.rows = self.get_members_data()
-        self.data_rows = [
-            ft.Container(
-                content=ft.Row(
-                    [
-                        ft.Container(
-                            content=ft.Text(f"{int(row[col])}" if col == "contribution" else f"{float(row[col]):.2f}" if col == "total_due" else str(row[col])),
-                            width=120,
-                            alignment=ft.alignment.center,
-                            padding=10,
-                            bgcolor=None,
-                        ) for col in columns
-                    ],
-                    alignment=ft.MainAxisAlignment.CENTER,
-                ),
-                on_click=lambda e, row=row: self.select_row(e, row),
-            ) for idx, row in enumerate(self.rows)
-        ]
+        formats = {
+            "contribution": lambda value: f"{value // MINOR_UNITS}",
+            "total_due": format_money,
+        }
 
-        # الجدول مع سكرول بار
-        self.scrollable_data = ft.ListView(
-            self.data_rows,
+        # الجدول يرسم الصفوف الظاهرة فقط مهما كان عدد المشتركين
+        self.table_view = VirtualTable(
+            [(column_names[col], col, 120, formats.get(col)) for col in columns],
+            self.get_members_data(),
             height=300,
             width=640,
-            spacing=0,
-            padding=0,
-        )
-
-        # تغليف ListView داخل Container
-        scrollable_container = ft.Container(
-            content=self.scrollable_data,
+            on_select=self.select_row,
+            header_color=ft.colors.GREEN,
             bgcolor=ft.colors.LIGHT_GREEN,
-            shadow=ft.BoxShadow(blur_radius=30, color="green"),
+            border_color=None,
         )
-
-        # وضع صف العناوين والبيانات في عمود
-        self.table = ft.Column(
-            [
-                self.header_row,
-                scrollable_container,
-            ],
-            spacing=0,
+        self.table = ft.Container(
+            content=self.table_view.control,
+            shadow=ft.BoxShadow(blur_radius=30, color="green"),
         )
 
         # وضع الأزرار في سطر واحد باستخدام الزر الموحد
@@ -7,6 +7,7 @@ class ViewPage:
         self.page = page
         self.navigate = None
         self.background_image = background_image
+        self.db = db
 
     def set_navigate(self, navigate):
         self.navigate = navigate
@@ -42,6 +43,13 @@ class ViewPage:
             bgcolor=ft.colors.GREEN
         )
 
+        # زر تشخيص الأداء (يظهر فقط عند التشغيل مع --profile-queries)
+        btn_diagnostics = create_button(
+            "تشخيص الأداء",
+            lambda e: self.navigate("diagnostics_page"),
+            bgcolor=ft.colors.BLUE
+        )
+
         # زر الرجوع
         btn_back = create_button(
             "رجوع",
@@ -61,6 +69,9 @@ class ViewPage:
                     ft.Container(height=20),
                     btn_view_members,
                     ft.Container(height=20),
+                ]
+                + ([btn_diagnostics, ft.Container(height=20)] if self.db.profiler.enabled else [])
+                + [
                     btn_back,
                 ],
                 alignment=ft.MainAxisAlignment.START,
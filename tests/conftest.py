@@ -0,0 +1,36 @@
+import shutil
+import sys
+from pathlib import Path
+import pytest
+
+# الاختبارات تستورد utils و core من جذر المشروع كما يفعل main.py
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# قاعدة البيانات كما تُشحن مع البرنامج (نسخة المخطط 0، مبالغ REAL)
+BASELINE_DB = ROOT / "utils" / "expenses.db"
+
+
+@pytest.fixture
+def db(tmp_path):
+    """DatabaseManager على نسخة مؤقتة من القاعدة الأصلية بعد ترقيتها لآخر نسخة"""
+    from utils.database import DatabaseManager
+    path = tmp_path / "expenses.db"
+    shutil.copyfile(BASELINE_DB, path)
+    db = DatabaseManager(str(path))
+    yield db
+    db.close_connection()
+
+
+@pytest.fixture
+def members(db):
+    """ثلاثة مشتركين جدد بمساهمة 100 جنيه ودون ديون؛ تعيد معرفاتهم"""
+    member_ids = []
+    with db.transaction() as cursor:
+        for name in ("مشترك أ", "مشترك ب", "مشترك ج"):
+            cursor.execute(
+                "INSERT INTO members (name, rank, contribution, total_due, date) VALUES (?, 'نقيب', 10000, 0, '2025-07-01')",
+                (name,)
+            )
+            member_ids.append(cursor.lastrowid)
+    return member_ids
@@ -0,0 +1,83 @@
+from pathlib import Path
+import pytest
+from core import DrinkSale, Meal, Purchase, add_purchase, close_period, record_drinks, record_meal
+from utils.archive_store import PARTITION_FILE
+
+
+@pytest.fixture
+def period(db, members):
+    """شهر فيه وجبة ومشروب ونثريات للمشتركين الثلاثة"""
+    rice, tea, _ = add_purchase(db, [
+        Purchase("أرز", 10, 1000, date="2025-07-01"),
+        Purchase("شاي أخضر", 10, 500, is_drink=True, date="2025-07-01"),
+        Purchase("غاز", 1, 300, is_miscellaneous=True, date="2025-07-01"),
+    ])
+    record_meal(db, [Meal("2025-07-01", "غداء", members, {rice.expense_id: 2})])
+    record_drinks(db, [DrinkSale("2025-07-02", tea.expense_id, members[0], 2)])
+    remaining_items = db.fetch_one("SELECT SUM(remaining * price) FROM expenses WHERE remaining > 0 AND is_miscellaneous = 0")[0]
+    return members, remaining_items
+
+
+def test_close_resets_member_totals(db, period):
+    members, _ = period
+    close_period(db)
+    rows = db.fetch_all("SELECT total_due, meal_cost, drink_cost, misc_amount FROM member_totals")
+    assert rows and set(rows) == {(0, 0, 0, 0)}
+    for table in ("meal_records", "drink_records", "miscellaneous_expenses", "miscellaneous_contributions"):
+        assert db.fetch_one(f"SELECT COUNT(*) FROM {table}")[0] == 0, table
+    assert db.fetch_one("SELECT COUNT(*) FROM expenses WHERE is_miscellaneous = 1")[0] == 0
+
+
+def test_close_seals_period_file(db, period):
+    closed = close_period(db)
+    file_name = db.fetch_one("SELECT file_name FROM archive_partitions WHERE archive_key_id = ?", (closed.archive_key_id,))[0]
+    assert file_name == PARTITION_FILE.format(closed.archive_key_id)
+    assert (Path(db.db_name).with_name("expenses_archive") / file_name).exists()
+    archive = db.archives.period(closed.archive_key_id)
+    assert archive is not db
+    # الصفوف انتقلت من القاعدة الرئيسية إلى ملف الفترة
+    assert db.fetch_one("SELECT COUNT(*) FROM closure_summary_archive WHERE archive_key_id = ?", (closed.archive_key_id,))[0] == 0
+    assert archive.fetch_one("SELECT COUNT(*) FROM meal_records_archive")[0] == 3
+    assert archive.fetch_one("SELECT COUNT(*) FROM drink_records_archive")[0] == 1
+
+
+def test_closure_summary_per_member(db, period):
+    members, _ = period
+    closed = close_period(db)
+    archive = db.archives.period(closed.archive_key_id)
+    rows = archive.fetch_all("""
+        SELECT member_id, total_meals, total_drinks, total_miscellaneous, total_consumption,
+               total_contribution, remaining_cash
+        FROM closure_summary_archive WHERE archive_key_id = ? ORDER BY member_id
+    """, (closed.archive_key_id,))
+    summary = {row[0]: row[1:] for row in rows}
+    assert len(summary) == db.fetch_one("SELECT COUNT(*) FROM members")[0]
+    # الوجبة 200 و النثريات 300 بعدد الوجبات، والمشروب 100 للأول؛
+    # المتبقي = المساهمة - الاستهلاك (النثريات داخل الاستهلاك مرة واحدة)
+    assert summary[members[0]] == (67, 100, 100, 267, 10000, 9733)
+    assert summary[members[1]] == (67, 0, 100, 167, 10000, 9833)
+    assert summary[members[2]] == (66, 0, 100, 166, 10000, 9834)
+
+
+def test_monthly_totals_archive(db, period):
+    _, remaining_items = period
+    closed = close_period(db)
+    archive = db.archives.period(closed.archive_key_id)
+    totals = archive.fetch_one("""
+        SELECT total_meals, total_drinks, total_misc, total_consumption, total_contributions,
+               remaining_items, remaining_cash
+        FROM monthly_totals_archive WHERE archive_key_id = ?
+    """, (closed.archive_key_id,))
+    meals, drinks, misc, consumption, contributions, items, cash = totals
+    assert (meals, drinks, misc, consumption) == (200, 100, 300, 600)
+    assert contributions == db.fetch_one("SELECT SUM(contribution) FROM members")[0]
+    assert items == remaining_items
+    assert cash == contributions - consumption - remaining_items
+
+
+def test_close_without_meals_keeps_data(db):
+    add_purchase(db, [Purchase("غاز", 1, 300, is_miscellaneous=True, date="2025-07-01")])
+    with pytest.raises(ValueError):
+        close_period(db)
+    assert db.fetch_one("SELECT COUNT(*) FROM expenses WHERE is_miscellaneous = 1")[0] == 1
+    assert db.fetch_one("SELECT COUNT(*) FROM monthly_closures")[0] == 1
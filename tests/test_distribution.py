@@ -0,0 +1,38 @@
+import pytest
+from utils.distribution import allocate, MEAL_TYPES, MEAL_TYPE_WEIGHTS
+
+
+@pytest.mark.parametrize("total, weights", [
+    (100, [1, 1, 1]),
+    (1, [1, 1, 1]),
+    (0, [3, 2]),
+    (1000, [1]),
+    (99999, [7, 3, 5, 11, 2]),
+    (12345, [1, 2, 1, 2, 1, 2, 1]),
+    (7, [1, 0, 1]),
+    (250, [10 ** 6, 1]),
+])
+def test_allocate_shares_sum_to_total(total, weights):
+    shares = allocate(total, weights)
+    assert sum(shares) == total
+    assert len(shares) == len(weights)
+    weight_sum = sum(weights)
+    for share, weight in zip(shares, weights):
+        # كل حصة تبتعد عن نصيبها الدقيق بأقل من وحدة صغرى
+        assert abs(share * weight_sum - total * weight) < weight_sum
+
+
+def test_allocate_gives_leftover_to_largest_remainders():
+    # 100 / 3 = 33.33: الوحدة الباقية للأول عند التعادل
+    assert allocate(100, [1, 1, 1]) == [34, 33, 33]
+    # 10 * 2/3 = 6.67 و 10 * 1/3 = 3.33
+    assert allocate(10, [2, 1]) == [7, 3]
+
+
+def test_allocate_rejects_empty_weights():
+    with pytest.raises(ValueError):
+        allocate(100, [0, 0])
+
+
+def test_meal_type_weights_cover_stored_meal_types():
+    assert set(MEAL_TYPE_WEIGHTS) == set(MEAL_TYPES)
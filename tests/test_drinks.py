@@ -0,0 +1,30 @@
+import pytest
+from core import DrinkSale, Purchase, add_purchase, record_drinks
+
+
+@pytest.fixture
+def tea(db):
+    return add_purchase(db, [Purchase("شاي أخضر", 10, 500, is_drink=True, date="2025-07-01")])[0].expense_id
+
+
+def test_drinks_charge_members_and_consume_stock(db, members, tea):
+    recorded = record_drinks(db, [DrinkSale("2025-07-01", tea, members[0], 2), DrinkSale("2025-07-01", tea, members[0], 1)])
+    assert [r.total_cost for r in recorded] == [100, 50]
+    assert db.fetch_one("SELECT total_due FROM members WHERE member_id = ?", (members[0],)) == (150,)
+    assert db.fetch_one("SELECT remaining, consumption FROM expenses WHERE expense_id = ?", (tea,)) == (7, 3)
+
+
+def test_overdraw_within_batch_rolls_back(db, members, tea):
+    # كل صرف وحده متاح، لكن مجموعهما يتجاوز الرصيد
+    sales = [DrinkSale("2025-07-01", tea, members[0], 6), DrinkSale("2025-07-01", tea, members[1], 5)]
+    with pytest.raises(ValueError, match="الصرف 2"):
+        record_drinks(db, sales)
+    assert db.fetch_one("SELECT COUNT(*) FROM drink_records")[0] == 0
+    assert db.fetch_one("SELECT remaining FROM expenses WHERE expense_id = ?", (tea,)) == (10,)
+    assert db.fetch_one("SELECT SUM(total_due) FROM members WHERE member_id IN (?, ?)", members[:2]) == (0,)
+
+
+def test_food_item_cannot_be_sold_as_drink(db, members):
+    rice, = add_purchase(db, [Purchase("أرز", 10, 1000, date="2025-07-01")])
+    with pytest.raises(ValueError):
+        record_drinks(db, [DrinkSale("2025-07-01", rice.expense_id, members[0], 1)])
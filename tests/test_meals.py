@@ -0,0 +1,56 @@
+import pytest
+from core import Meal, Purchase, add_purchase, record_meal
+
+
+@pytest.fixture
+def rice(db):
+    return add_purchase(db, [Purchase("أرز", 10, 1000, date="2025-07-01")])[0].expense_id
+
+
+def _due(db, member_ids):
+    placeholders = ", ".join("?" for _ in member_ids)
+    return dict(db.fetch_all(f"SELECT member_id, total_due FROM members WHERE member_id IN ({placeholders})", member_ids))
+
+
+def test_meal_shares_sum_to_cost(db, members, rice):
+    [recorded] = record_meal(db, [Meal("2025-07-01", "غداء", members, {rice: 2}, misc_amount=100)])
+    assert recorded.total_cost == 200
+    shares = db.fetch_all(
+        "SELECT member_id, final_cost FROM meal_records WHERE meal_record_id IN (?, ?, ?) ORDER BY meal_record_id",
+        recorded.meal_record_ids
+    )
+    # 200 / 3: القرش الباقي لأول مشترك
+    assert shares == list(zip(members, [67, 67, 66]))
+    misc = db.fetch_all("SELECT member_id, amount FROM miscellaneous_expenses ORDER BY meal_record_id")
+    assert misc == list(zip(members, [34, 33, 33]))
+    assert _due(db, members) == {members[0]: 101, members[1]: 100, members[2]: 99}
+    assert sum(_due(db, members).values()) == recorded.total_cost + recorded.misc_amount
+
+
+def test_meal_consumes_stock_through_ledger(db, members, rice):
+    record_meal(db, [Meal("2025-07-01", "غداء", members, {rice: 2}), Meal("2025-07-01", "عشاء", members[:1], {rice: 3})])
+    assert db.fetch_one("SELECT remaining, consumption FROM expenses WHERE expense_id = ?", (rice,)) == (5, 5)
+    movements = db.fetch_all(
+        "SELECT movement_type, consumed_delta FROM stock_movements WHERE expense_id = ? ORDER BY movement_id", (rice,)
+    )
+    assert movements == [("purchase", 0), ("meal", 2), ("meal", 3)]
+
+
+def test_zero_quantity_items_are_skipped(db, members, rice):
+    [recorded] = record_meal(db, [Meal("2025-07-01", "فطار", members, {rice: 0})])
+    assert recorded.total_cost == 0
+    assert db.fetch_one("SELECT remaining FROM expenses WHERE expense_id = ?", (rice,)) == (10,)
+
+
+def test_shortage_in_later_meal_rolls_back_batch(db, members, rice):
+    meals = [Meal("2025-07-01", "غداء", members, {rice: 6}), Meal("2025-07-01", "عشاء", members, {rice: 6})]
+    with pytest.raises(ValueError, match="الوجبة 2"):
+        record_meal(db, meals)
+    assert db.fetch_one("SELECT COUNT(*) FROM meal_records")[0] == 0
+    assert db.fetch_one("SELECT remaining FROM expenses WHERE expense_id = ?", (rice,)) == (10,)
+    assert set(_due(db, members).values()) == {0}
+
+
+def test_negative_quantity_is_rejected(db, members, rice):
+    with pytest.raises(ValueError):
+        record_meal(db, [Meal("2025-07-01", "غداء", members, {rice: -1})])
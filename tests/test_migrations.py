@@ -0,0 +1,116 @@
+import shutil
+import sqlite3
+import pytest
+from utils import search
+from utils.database import DatabaseManager
+from utils.migrations import LATEST_VERSION, MONEY_COLUMNS, PERIOD_TOTALS_SOURCES
+from utils.archive_store import PARTITIONED_TABLES
+from conftest import BASELINE_DB
+
+
+def _tables(conn):
+    return [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+
+
+def _snapshot(conn):
+    """عدد الصفوف ومجموع كل عمود مبالغ بالوحدات الصغرى لكل جدول"""
+    counts, sums = {}, {}
+    for table in _tables(conn):
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for column in MONEY_COLUMNS.get(table, ()):
+            sums[table, column] = conn.execute(f"SELECT TOTAL({column}) FROM {table}").fetchone()[0]
+    return counts, sums
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    """نسخة من القاعدة الأصلية قبل الترحيل، ثم DatabaseManager بعد ترقيتها لآخر نسخة"""
+    path = tmp_path / "expenses.db"
+    shutil.copyfile(BASELINE_DB, path)
+    with sqlite3.connect(path) as conn:
+        before = _snapshot(conn)
+    db = DatabaseManager(str(path))
+    yield before, db
+    db.close_connection()
+
+
+def _archived(db, table, query):
+    """مجموع query على صفوف table في القاعدة الرئيسية وفي ملفات الفترات المختومة"""
+    total = db.fetch_one(query.format(table=table))[0] or 0
+    if table in PARTITIONED_TABLES:
+        for (archive_key_id,) in db.fetch_all("SELECT archive_key_id FROM archive_partitions"):
+            source = db.archives.period(archive_key_id)
+            if source is not db:
+                total += source.fetch_one(query.format(table=table))[0] or 0
+    return total
+
+
+def test_baseline_reaches_latest_version(migrated):
+    _, db = migrated
+    assert db.fetch_one("PRAGMA user_version")[0] == LATEST_VERSION
+
+
+def test_row_counts_preserved(migrated):
+    (counts, _), db = migrated
+    for table, count in counts.items():
+        assert _archived(db, table, "SELECT COUNT(*) FROM {table}") == count, table
+
+
+def test_money_columns_converted_to_minor_units(migrated):
+    (_, sums), db = migrated
+    for (table, column), before in sums.items():
+        after = _archived(db, table, f"SELECT TOTAL({column}) FROM {{table}}")
+        assert after == round(before * 100), (table, column)
+        kinds = {row[1]: row[2].upper() for row in db.fetch_all(f"PRAGMA table_info({table})")}
+        assert kinds[column] == "INTEGER", (table, column)
+
+
+def test_triggers_and_views_present(migrated):
+    _, db = migrated
+    objects = {(kind, name) for kind, name in db.fetch_all(
+        "SELECT type, name FROM sqlite_master WHERE type IN ('trigger', 'view')"
+    )}
+    expected = {("view", "member_totals"), ("trigger", "trg_stock_movements_apply")}
+    for _, short, _ in PERIOD_TOTALS_SOURCES:
+        for event in ("insert", "delete", "update"):
+            expected.add(("trigger", f"trg_{short}_totals_{event}"))
+    # فهرس البحث يُنشأ فقط إن دعمت SQLite المثبتة FTS5 مع trigram
+    if db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'expenses_name_fts'"):
+        for table, _, _, _ in search.INDEXES.values():
+            for event in ("insert", "update", "delete"):
+                expected.add(("trigger", f"trg_{table}_{event}"))
+    assert expected <= objects, expected - objects
+
+
+def test_migrated_database_reopens_unchanged(migrated):
+    _, db = migrated
+    path = db.db_name
+    counts = {table: db.fetch_one(f"SELECT COUNT(*) FROM {table}")[0] for table in _tables(db.conn)}
+    db.close_connection()
+    reopened = DatabaseManager(path)
+    try:
+        assert reopened.fetch_one("PRAGMA user_version")[0] == LATEST_VERSION
+        for table, count in counts.items():
+            assert reopened.fetch_one(f"SELECT COUNT(*) FROM {table}")[0] == count, table
+    finally:
+        reopened.close_connection()
+
+
+def test_deleting_item_keeps_its_drink_records(migrated):
+    _, db = migrated
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO expenses (item_name, quantity, price, is_drink) VALUES ('شاي', 5, 100, 1)")
+        expense_id = cursor.lastrowid
+        member_id = db.fetch_one("SELECT MIN(member_id) FROM members")[0]
+        cursor.execute(
+            "INSERT INTO drink_records (date, drink_name, expense_id, member_id, quantity, total_cost) "
+            "VALUES ('2024-05-01', 'شاي', ?, ?, 1, 100)", (expense_id, member_id)
+        )
+        record_id = cursor.lastrowid
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM expenses WHERE expense_id = ?", (expense_id,))
+    assert db.fetch_one(
+        "SELECT drink_name, expense_id FROM drink_records WHERE drink_record_id = ?", (record_id,)
+    ) == ("شاي", None)
@@ -0,0 +1,42 @@
+import pytest
+from core import Purchase, add_purchase
+
+
+def _stock(db, expense_id):
+    return db.fetch_one(
+        "SELECT quantity, price, total_price, remaining, consumption FROM expenses WHERE expense_id = ?", (expense_id,)
+    )
+
+
+def test_new_item_gets_unit_price_and_stock(db):
+    [result] = add_purchase(db, [Purchase("أرز", 10, 1000, date="2025-07-01")])
+    assert result.created and result.unit_price == 100
+    assert _stock(db, result.expense_id) == (10, 100, 1000, 10, 0)
+
+
+def test_repeat_purchase_averages_unit_price(db):
+    first, = add_purchase(db, [Purchase("أرز", 10, 1000, date="2025-07-01")])
+    second, = add_purchase(db, [Purchase("أرز", 5, 800, date="2025-07-02")])
+    # (10 × 100 + 800) / 15 = 120
+    assert second.expense_id == first.expense_id and not second.created
+    assert second.unit_price == 120
+    assert _stock(db, first.expense_id) == (15, 120, 1800, 15, 0)
+
+
+def test_average_rounds_to_nearest_minor_unit(db):
+    add_purchase(db, [Purchase("سكر", 3, 100, date="2025-07-01")])
+    result, = add_purchase(db, [Purchase("سكر", 3, 101, date="2025-07-01")])
+    # (3 × 33 + 101) / 6 = 33.33
+    assert result.unit_price == 33
+
+
+def test_miscellaneous_purchase_is_consumed_at_once(db):
+    result, = add_purchase(db, [Purchase("غاز", 1, 300, is_miscellaneous=True, date="2025-07-01")])
+    assert _stock(db, result.expense_id) == (1, 300, 300, 0, 1)
+
+
+def test_invalid_purchase_rolls_back_batch(db):
+    count = db.fetch_one("SELECT COUNT(*) FROM expenses")[0]
+    with pytest.raises(ValueError):
+        add_purchase(db, [Purchase("أرز", 10, 1000), Purchase("عدس", 0, 500)])
+    assert db.fetch_one("SELECT COUNT(*) FROM expenses")[0] == count
@@ -0,0 +1,34 @@
+import threading
+
+QUERY = "SELECT COUNT(*) FROM members"
+
+
+def test_cached_result_refreshes_after_write(db):
+    before = db.reports.fetch(QUERY)
+    db.execute_query("INSERT INTO members (name) VALUES ('مشترك جديد')")
+    assert db.reports.fetch(QUERY)[0][0] == before[0][0] + 1
+
+
+def test_read_during_other_thread_transaction_expires_on_commit(db):
+    """قراءة من اتصال قراءة أثناء معاملة خيط آخر تُخزن، ثم يجب ألا تُعاد بعد حفظها"""
+    written, commit = threading.Event(), threading.Event()
+
+    def writer():
+        with db.transaction() as cursor:
+            cursor.execute("INSERT INTO members (name) VALUES ('مشترك جديد')")
+            written.set()
+            commit.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    written.wait(5)
+    # ما يفعله ReportService._entry في خيط اجتاز فحص المعاملة قبل بدئها
+    generation = db.write_generation
+    stale = db.fetch_all(QUERY)
+    key = ("race", ())
+    db.reports._store(key, generation, stale)
+    commit.set()
+    thread.join()
+
+    assert db.reports._lookup(key, db.write_generation) is None
+    assert db.reports.fetch(QUERY)[0][0] == stale[0][0] + 1
@@ -0,0 +1,251 @@
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from utils.report_service import ReportService
+
+# جداول الأرشيف التي تُنقل صفوف كل فترة منها إلى ملف الفترة
+PARTITIONED_TABLES = (
+    "expenses_archive",
+    "members_archive",
+    "meal_records_archive",
+    "drink_records_archive",
+    "miscellaneous_expenses_archive",
+    "miscellaneous_contributions_archive",
+    "closure_summary_archive",
+    "monthly_totals_archive",
+)
+
+# اسم ملف الفترة داخل مجلد الأرشيف
+PARTITION_FILE = "period_{:04d}.db"
+
+# اسم المخطط الذي يُربط به ملف الفترة على اتصال الكتابة أثناء الختم فقط
+PARTITION_SCHEMA = "archive_part"
+
+# مراجع archive_keys لا معنى لها في ملف الفترة (الجدول في القاعدة الرئيسية)
+_FOREIGN_KEY = re.compile(r",\s*FOREIGN KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\)", re.IGNORECASE)
+
+
+class ArchivePartition:
+    """فترة أرشيف مختومة في ملف مستقل، تُقرأ باتصال قراءة فقط يُفتح عند أول استعلام
+
+    تعرض واجهة القراءة نفسها في DatabaseManager (fetch_all / fetch_one / iter_query / reports)
+    فتعمل عليها التقارير والتصفح والتصدير بنفس استعلاماتها.
+    """
+
+    def __init__(self, store, archive_key_id, path):
+        self.store = store
+        self.archive_key_id = archive_key_id
+        self.path = Path(path)
+        self.conn = None
+        self._lock = threading.RLock()
+        self._generation = 0
+        self.reports = ReportService(self)
+
+    def _connection(self):
+        with self._lock:
+            if self.conn is None:
+                db = self.store.db
+                uri = self.path.resolve().as_uri() + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=db.busy_timeout / 1000)
+                # نفس إعدادات الذاكرة في القاعدة الرئيسية (mmap_size يقرأ الملف من الذاكرة مباشرة)
+                db._apply_pragmas(conn)
+                conn.execute("PRAGMA query_only = ON;")
+                self.conn = conn
+            return self.conn
+
+    @property
+    def write_generation(self):
+        """يتغير فقط عند إعادة ختم الفترة، فنتائج reports تبقى صالحة حتى ذلك"""
+        return self._generation
+
+    def invalidate(self):
+        self._generation += 1
+
+    def fetch_all(self, query, params=()):
+        try:
+            conn = self._connection()
+            with self._lock:
+                # عبر _run في القاعدة الرئيسية حتى يشمل القياس تقارير الأرشيف
+                return self.store.db._run(conn, query, params, fetch=True)
+        except Exception as e:
+            print(f"حدث خطأ أثناء استرجاع بيانات الأرشيف: {e}")
+            return []
+
+    def fetch_one(self, query, params=()):
+        rows = self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    def iter_query(self, query, params=(), batch_size=500):
+        """قراءة النتيجة على دفعات؛ الاتصال مشترك فيُقفل لكل دفعة لا للقراءة كلها"""
+        conn = self._connection()
+        with self._lock:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+class ArchiveStore:
+    """تخزين الأرشيف مقسمًا: ملف SQLite مستقل لكل فترة مقفلة (صف في archive_keys)
+
+    التقفيل يكتب في جداول *_archive بالقاعدة الرئيسية داخل معاملته كالمعتاد، ثم تُختم الفترة
+    فتُنقل صفوفها إلى ملفها ويُسجل في archive_partitions. القاعدة الرئيسية تبقى صغيرة للشهر
+    الحالي، وملفات الفترات لا تُفتح إلا عند طلب تقرير منها.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        # قاعدة في الذاكرة (الاختبارات) لا مجلد لها فيبقى أرشيفها فيها
+        return not self.db._is_memory()
+
+    @property
+    def directory(self):
+        path = Path(self.db.db_name)
+        return path.with_name(f"{path.stem}_archive")
+
+    def period(self, archive_key_id):
+        """مصدر قراءة الفترة: ملفها المستقل إن خُتمت، وإلا القاعدة الرئيسية"""
+        archive_key_id = int(archive_key_id)
+        with self._lock:
+            partition = self._partitions.get(archive_key_id)
+        if partition is not None:
+            return partition
+        if not self.enabled():
+            return self.db
+        row = self.db.fetch_one(
+            "SELECT file_name FROM archive_partitions WHERE archive_key_id = ?", (archive_key_id,)
+        )
+        if row is None:
+            return self.db
+        path = self.directory / row[0]
+        if not path.exists():
+            logging.warning(f"ملف فترة الأرشيف {archive_key_id} غير موجود: {path}")
+            return self.db
+        with self._lock:
+            return self._partitions.setdefault(archive_key_id, ArchivePartition(self, archive_key_id, path))
+
+    def _create_schema(self, path):
+        """إنشاء جداول الأرشيف وفهارسها في ملف الفترة بتعريفها الحالي في القاعدة الرئيسية"""
+        placeholders = ", ".join("?" for _ in PARTITIONED_TABLES)
+        definitions = self.db.fetch_all(
+            f"SELECT type, tbl_name, sql FROM sqlite_master "
+            f"WHERE tbl_name IN ({placeholders}) AND type IN ('table', 'index') AND sql IS NOT NULL "
+            f"ORDER BY type DESC",
+            PARTITIONED_TABLES
+        )
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                for kind, table, sql in definitions:
+                    if kind == "table":
+                        sql = _FOREIGN_KEY.sub("", sql)
+                        sql = re.sub(r"^CREATE TABLE\s+(IF NOT EXISTS\s+)?", "CREATE TABLE IF NOT EXISTS ", sql)
+                    else:
+                        sql = re.sub(r"^CREATE (UNIQUE )?INDEX\s+(IF NOT EXISTS\s+)?",
+                                     r"CREATE \1INDEX IF NOT EXISTS ", sql)
+                    conn.execute(sql)
+                # ملف فترة قديم يأخذ الأعمدة التي أضافتها الترحيلات بعد ختمه
+                for table in PARTITIONED_TABLES:
+                    existing = {col[1] for col in conn.execute(f"PRAGMA table_info({table})")}
+                    for col in self.db.fetch_all(f"PRAGMA table_info({table})"):
+                        if col[1] not in existing:
+                            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col[1]} {col[2]}")
+        finally:
+            conn.close()
+
+    def seal(self, archive_key_id):
+        """نقل صفوف الفترة من جداول الأرشيف في القاعدة الرئيسية إلى ملفها وإعادة عددها
+
+        النسخ والحذف في معاملتين: لو توقف البرنامج بينهما تبقى الصفوف في الملفين،
+        والقراءة من ملف الفترة، ويُكمل seal_pending النقل لاحقًا (الإدراج INSERT OR REPLACE).
+        """
+        if not self.enabled():
+            return 0
+        archive_key_id = int(archive_key_id)
+        file_name = PARTITION_FILE.format(archive_key_id)
+        path = self.directory / file_name
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._create_schema(path)
+
+        db = self.db
+        with db.lock:
+            if db.conn.in_transaction:
+                raise RuntimeError("لا يمكن ختم فترة أرشيف داخل معاملة مفتوحة")
+            # ATTACH غير مسموح داخل معاملة، لذا يُربط الملف قبلها ويُفصل بعدها
+            db.conn.execute(f"ATTACH DATABASE ? AS {PARTITION_SCHEMA}", (str(path),))
+            try:
+                row_count = 0
+                with db.transaction() as cursor:
+                    for table in PARTITIONED_TABLES:
+                        cursor.execute(f"PRAGMA main.table_info({table})")
+                        columns = ", ".join(col[1] for col in cursor.fetchall())
+                        cursor.execute(
+                            f"INSERT OR REPLACE INTO {PARTITION_SCHEMA}.{table} ({columns}) "
+                            f"SELECT {columns} FROM main.{table} WHERE archive_key_id = ?",
+                            (archive_key_id,)
+                        )
+                        cursor.execute(
+                            f"SELECT COUNT(*) FROM {PARTITION_SCHEMA}.{table} WHERE archive_key_id = ?",
+                            (archive_key_id,)
+                        )
+                        row_count += cursor.fetchone()[0]
+            finally:
+                db.conn.execute(f"DETACH DATABASE {PARTITION_SCHEMA}")
+
+            with db.transaction() as cursor:
+                cursor.execute("""
+                    INSERT INTO archive_partitions (archive_key_id, file_name, row_count, sealed_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (archive_key_id) DO UPDATE SET
+                        file_name = excluded.file_name,
+                        row_count = excluded.row_count,
+                        sealed_at = excluded.sealed_at
+                """, (archive_key_id, file_name, row_count, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                for table in PARTITIONED_TABLES:
+                    cursor.execute(f"DELETE FROM main.{table} WHERE archive_key_id = ?", (archive_key_id,))
+
+        with self._lock:
+            partition = self._partitions.get(archive_key_id)
+        if partition is not None:
+            partition.invalidate()
+        db.reports.invalidate_archive(archive_key_id)
+        logging.info(f"تم نقل فترة الأرشيف {archive_key_id} إلى {path} ({row_count} صف)")
+        return row_count
+
+    def seal_pending(self):
+        """ختم كل فترة ما زالت لها صفوف في القاعدة الرئيسية (أرشيف قديم أو نقل لم يكتمل)"""
+        if not self.enabled():
+            return []
+        pending = " UNION ".join(
+            f"SELECT archive_key_id FROM {table} WHERE archive_key_id IS NOT NULL"
+            for table in PARTITIONED_TABLES
+        )
+        archive_key_ids = [row[0] for row in self.db.fetch_all(pending)]
+        for archive_key_id in archive_key_ids:
+            self.seal(archive_key_id)
+        return archive_key_ids
+
+    def close(self):
+        """إغلاق اتصالات ملفات الفترات المفتوحة"""
+        with self._lock:
+            partitions = list(self._partitions.values())
+            self._partitions = {}
+        for partition in partitions:
+            partition.close()
@@ -11,7 +11,8 @@ def create_button(
     shadow_color=None,
     hover_bgcolor=None,
     icon=None,
-    icon_color=None
+    icon_color=None,
+    disabled=False
 ):
     hover_bgcolor = hover_bgcolor or ft.colors.with_opacity(0.8, bgcolor)
     shadow_color = shadow_color or bgcolor
@@ -33,6 +34,7 @@ def create_button(
             on_click=on_click,
             icon=icon,
             icon_color=icon_color,
+            disabled=disabled,
             style=ft.ButtonStyle(
                 shape=ft.RoundedRectangleBorder(radius=10),
                 elevation={"pressed": 0, "": elevation}
@@ -0,0 +1,146 @@
+import threading
+
+
+class Catalog:
+    """قائمة المشتركين والأصناف في الذاكرة لقوائم الاختيار (db.catalog)
+
+    تُقرأ من قاعدة البيانات مرة واحدة عند أول طلب، ثم تحدّثها مسارات الإضافة والتعديل
+    والحذف بعد كل كتابة (put_* / drop_*)، فتُبنى القوائم المنسدلة دون أي استعلام.
+    التحديث المطلوب داخل db.transaction() يُطبق بعد حفظ المعاملة فقط ويُهمل إن أُلغيت.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.RLock()
+        self._loaded = False
+        # member_id -> (الرتبة، الاسم)
+        self._members = {}
+        # expense_id -> (اسم الصنف، مشروب، نثريات)
+        self._items = {}
+        # الفهارس العكسية: الاسم -> المعرف
+        self._member_ids = {}
+        self._item_ids = {}
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            members = self.db.fetch_all("SELECT member_id, rank, name FROM members")
+            items = self.db.fetch_all("SELECT expense_id, item_name, is_drink, is_miscellaneous FROM expenses")
+            self._members = {member_id: (rank, name) for member_id, rank, name in members}
+            self._items = {expense_id: (name, bool(is_drink), bool(is_misc))
+                           for expense_id, name, is_drink, is_misc in items}
+            self._member_ids = {name: member_id for member_id, (_, name) in self._members.items()}
+            self._item_ids = {}
+            for expense_id, (name, _, _) in self._items.items():
+                # عند تكرار الاسم يبقى أقدم صنف كما يختاره البحث بالاسم
+                self._item_ids.setdefault(name, expense_id)
+            self._loaded = True
+
+    def invalidate(self):
+        """إسقاط القائمة لتُقرأ من جديد عند الطلب التالي (بعد تعديلات جماعية كالتقفيل)"""
+        self.db.on_commit(self._invalidate)
+
+    def _invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    # --- المشتركون ---
+
+    def members(self):
+        """[(member_id, الرتبة، الاسم)] بترتيب المعرف"""
+        self._ensure_loaded()
+        with self._lock:
+            return [(member_id, rank, name) for member_id, (rank, name) in sorted(self._members.items())]
+
+    def member_labels(self):
+        """[(member_id, "الرتبة الاسم")] بترتيب المعرف لقوائم الاختيار"""
+        return [(member_id, f"{rank} {name}" if rank else name) for member_id, rank, name in self.members()]
+
+    def member_name(self, member_id):
+        self._ensure_loaded()
+        member = self._members.get(member_id)
+        return member[1] if member else None
+
+    def member_id(self, name):
+        self._ensure_loaded()
+        return self._member_ids.get(name)
+
+    def put_member(self, member_id, rank, name):
+        """تسجيل مشترك جديد أو تعديل رتبته واسمه"""
+        self.db.on_commit(lambda: self._put_member(member_id, rank, name))
+
+    def _put_member(self, member_id, rank, name):
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._members.get(member_id)
+            if old and self._member_ids.get(old[1]) == member_id:
+                del self._member_ids[old[1]]
+            self._members[member_id] = (rank, name)
+            self._member_ids[name] = member_id
+
+    def drop_member(self, member_id):
+        self.db.on_commit(lambda: self._drop_member(member_id))
+
+    def _drop_member(self, member_id):
+        with self._lock:
+            old = self._members.pop(member_id, None)
+            if old and self._member_ids.get(old[1]) == member_id:
+                del self._member_ids[old[1]]
+
+    # --- الأصناف ---
+
+    def items(self, drink=None, miscellaneous=None):
+        """[(expense_id, اسم الصنف)] بترتيب المعرف، مع تصفية اختيارية حسب النوع"""
+        self._ensure_loaded()
+        with self._lock:
+            return [
+                (expense_id, name)
+                for expense_id, (name, is_drink, is_misc) in sorted(self._items.items())
+                if (drink is None or is_drink == drink) and (miscellaneous is None or is_misc == miscellaneous)
+            ]
+
+    def item_names(self):
+        """أسماء الأصناف دون تكرار بترتيب أول ظهور"""
+        return list(dict.fromkeys(name for _, name in self.items()))
+
+    def item_name(self, expense_id):
+        self._ensure_loaded()
+        item = self._items.get(expense_id)
+        return item[0] if item else None
+
+    def item_id(self, name):
+        self._ensure_loaded()
+        return self._item_ids.get(name)
+
+    def put_item(self, expense_id, name, is_drink=False, is_miscellaneous=False):
+        """تسجيل صنف جديد أو تعديل اسمه ونوعه"""
+        self.db.on_commit(lambda: self._put_item(expense_id, name, bool(is_drink), bool(is_miscellaneous)))
+
+    def _put_item(self, expense_id, name, is_drink, is_miscellaneous):
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._items.get(expense_id)
+            if old and self._item_ids.get(old[0]) == expense_id:
+                del self._item_ids[old[0]]
+            self._items[expense_id] = (name, is_drink, is_miscellaneous)
+            if self._item_ids.get(name, expense_id + 1) > expense_id:
+                self._item_ids[name] = expense_id
+
+    def drop_item(self, expense_id):
+        self.db.on_commit(lambda: self._drop_item(expense_id))
+
+    def _drop_item(self, expense_id):
+        with self._lock:
+            old = self._items.pop(expense_id, None)
+            if old and self._item_ids.get(old[0]) == expense_id:
+                del self._item_ids[old[0]]
+                # صنف آخر بنفس الاسم يصبح المرجع
+                for other_id, (name, _, _) in sorted(self._items.items()):
+                    if name == old[0]:
+                        self._item_ids[name] = other_id
+                        break
@@ -1,12 +1,54 @@
 import sqlite3
 import threading
+import logging
+import queue
+import time
+from contextlib import contextmanager
+from pathlib import Path
 from datetime import datetime
+from utils.migrations import MIGRATIONS, LATEST_VERSION
+from utils.report_service import ReportService
+from utils.archive_store import ArchiveStore
+from utils.query_profiler import QueryProfiler, ProfiledCursor
+from utils.catalog import Catalog
 
 class DatabaseManager:
-    def __init__(self, db_name="utils/expenses.db"):
-        self.lock = threading.Lock()
+    def __init__(self, db_name="utils/expenses.db", readers=3, synchronous="NORMAL",
+                 cache_size=-16000, mmap_size=64 * 1024 * 1024, busy_timeout=5000,
+                 profile_queries=False, slow_query_ms=None):
+        # قفل قابل لإعادة الدخول حتى يمكن استدعاء execute_query داخل transaction
+        self.lock = threading.RLock()
         self.db_name = db_name
         self.conn = None
+        self._tx_depth = 0
+        self._tx_owner = None
+        # ما يُنفذ بعد حفظ المعاملة الخارجية (on_commit)، ويُهمل عند إلغائها
+        self._after_commit = []
+        # يزداد مع كل إعادة اتصال لأن عداد التعديلات يبدأ من الصفر في الاتصال الجديد
+        self._connection_epoch = 0
+        # يزداد بعد كل حفظ على اتصال الكتابة؛ total_changes يتغير عند الكتابة لا عند الحفظ،
+        # فقراءة من اتصال قراءة بين الاثنين ترى ما قبل الحفظ ولا يجوز أن تبقى صالحة بعده
+        self._commit_count = 0
+        # إعدادات الأداء: cache_size السالب بالكيلوبايت، و mmap_size بالبايت
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        # مجمع اتصالات القراءة فقط (تُنشأ عند الحاجة حتى الحد الأقصى)
+        self.max_readers = readers
+        self._readers = queue.Queue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        # طبقة التقارير المشتركة مع تخزين النتائج مؤقتًا
+        self.reports = ReportService(self)
+        # ملفات فترات الأرشيف المقفلة (ملف لكل فترة، تُفتح عند الحاجة)
+        self.archives = ArchiveStore(self)
+        # المشتركون والأصناف في الذاكرة لقوائم الاختيار، تُحدّث مع كل إضافة أو تعديل أو حذف
+        self.catalog = Catalog(self)
+        # قياس زمن الاستعلامات وسجل البطيء منها (معطل إلا عند الطلب)
+        self.profiler = QueryProfiler(db_name)
+        if profile_queries:
+            self.profiler.enable(slow_query_ms)
         self.reconnect()
 
     def reconnect(self):
@@ -14,308 +56,284 @@ class DatabaseManager:
         try:
             if self.conn:
                 self.conn.close()
-            self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            self._close_readers()
+            self.archives.close()
+            self.conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=self.busy_timeout / 1000)
+            self._connection_epoch += 1
+            if not self._is_memory():
+                # WAL يسمح للقراء بالعمل أثناء الكتابة دون انتظار
+                self.conn.execute("PRAGMA journal_mode = WAL;")
+            self._apply_pragmas(self.conn)
+            self.conn.execute(f"PRAGMA synchronous = {self.synchronous};")
             self.conn.execute("PRAGMA foreign_keys = ON;")  # تفعيل المفاتيح الأجنبية
             self.create_tables()
         except Exception as e:
             print(f"فشل إعادة الاتصال: {e}")
 
-    def create_tables(self):
-        """إنشاء الجداول إذا لم تكن موجودة"""
-        try:
-            cursor = self.conn.cursor()
-            self.conn.execute("BEGIN TRANSACTION")
-
-            # جدول المصاريف
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS expenses (
-                    expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    item_name TEXT,
-                    quantity INTEGER,
-                    price REAL,
-                    total_price REAL,
-                    consumption INTEGER DEFAULT 0,
-                    remaining INTEGER DEFAULT 0,
-                    is_miscellaneous INTEGER DEFAULT 0,
-                    is_drink INTEGER DEFAULT 0,
-                    date TEXT
-                )
-            """)
-
-            # جدول المشتركين
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS members (
-                    member_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    rank TEXT,
-                    contribution REAL,
-                    total_due REAL DEFAULT 0,
-                    date TEXT
-                )
-            """)
+    def _is_memory(self):
+        return self.db_name == ":memory:" or str(self.db_name).startswith("file::memory:")
 
-            # جدول سجلات الوجبات
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS meal_records (
-                    meal_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    meal_type TEXT,
-                    date TEXT,
-                    member_id INTEGER,
-                    final_cost REAL,
-                    FOREIGN KEY (member_id) REFERENCES members(member_id)
-                )
-            """)
+    def _apply_pragmas(self, conn):
+        """تطبيق إعدادات الذاكرة والانتظار المشتركة بين الكاتب والقراء"""
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)};")
 
-            # جدول سجلات المشروبات
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS drink_records (
-                    drink_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT,
-                    drink_name TEXT,
-                    member_id INTEGER,
-                    quantity INTEGER,
-                    total_cost REAL,
-                    FOREIGN KEY (member_id) REFERENCES members(member_id)
-                )
-            """)
+    def _open_reader(self):
+        """فتح اتصال قراءة فقط على نفس الملف"""
+        uri = Path(self.db_name).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=self.busy_timeout / 1000)
+        self._apply_pragmas(conn)
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
 
-            # جدول المصاريف النثرية العام
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS miscellaneous_expenses (
-                    misc_expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT,
-                    amount REAL,
-                    meal_type TEXT,
-                    meal_record_id INTEGER,
-                    member_id INTEGER,
-                    FOREIGN KEY (meal_record_id) REFERENCES meal_records(meal_record_id)ON DELETE CASCADE,
-                    FOREIGN KEY (member_id) REFERENCES members(member_id)
-                )
-            """)
-
-            # جدول النثريات الخاص بالمشتركين
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS miscellaneous_contributions (
-                    misc_contribution_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    member_id INTEGER,
-                    misc_amount REAL,
-                    meal_count INTEGER DEFAULT 0,
-                    distribution_date TEXT,
-                    FOREIGN KEY (member_id) REFERENCES members(member_id)
-                )
-            """)
+    def _acquire_reader(self):
+        """الحصول على اتصال قراءة من المجمع أو إنشاء واحد جديد إن لم يكتمل العدد"""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self.max_readers:
+                conn = self._open_reader()
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
 
-            # جدول مفاتيح الأرشيف
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS archive_keys (
-                    archive_key_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    archive_name TEXT,
-                    start_date TEXT,
-                    end_date TEXT,
-                    archived_at TEXT
-                )
-            """)
+    def _release_reader(self, conn):
+        with self._readers_lock:
+            if any(reader is conn for reader in self._all_readers):
+                self._readers.put(conn)
+                return
+        # اتصال من مجمع أُغلق أثناء استخدامه (مثل جلب مسبق في الخلفية) يُغلق الآن
+        conn.close()
 
+    def _close_readers(self):
+        """إغلاق اتصالات القراءة؛ المستخدمة حاليًا في خيط آخر تُغلق عند إرجاعها"""
+        with self._readers_lock:
+            while True:
+                try:
+                    conn = self._readers.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all_readers = []
+            self._readers = queue.Queue()
 
+    def create_tables(self):
+        """إنشاء الجداول وتطبيق الترحيلات المعلقة"""
+        try:
+            self._run_migrations()
+        except Exception as e:
+            print(f"حدث خطأ أثناء إنشاء الجداول أو التعديلات: {e}")
+        try:
+            # فترات ما زالت صفوفها في الملف الرئيسي (أرشيف ما قبل التقسيم أو نقل لم يكتمل)
+            self.archives.seal_pending()
+        except Exception as e:
+            print(f"تعذر نقل فترات الأرشيف إلى ملفاتها: {e}")
 
-            # جداول الأرشيف
-            self._create_archive_tables(cursor)
+    def _run_migrations(self):
+        """تطبيق خطوات الترحيل التي لم تُطبق بعد حسب PRAGMA user_version"""
+        # المسار السريع: قاعدة محدثة لا تحتاج أي فحص للمخطط
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] >= LATEST_VERSION:
+            return
 
+        cursor = self.conn.cursor()
+        # إعادة بناء الجداول في الترحيلات تحتاج المفاتيح الأجنبية معطلة (لا تتغير داخل معاملة)
+        self.conn.execute("PRAGMA foreign_keys = OFF;")
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # إعادة القراءة داخل المعاملة تحسبًا لتطبيقها من نسخة أخرى في نفس اللحظة
+            cursor.execute("PRAGMA user_version")
+            current_version = cursor.fetchone()[0]
+            pending = [m for m in MIGRATIONS if m[0] > current_version]
+            for version, name, migrate in pending:
+                migrate(cursor)
+                logging.info(f"تم تطبيق ترحيل قاعدة البيانات {version}: {name}")
+            if pending:
+                cursor.execute(f"PRAGMA user_version = {pending[-1][0]}")
+            cursor.execute("PRAGMA foreign_key_check")
+            violations = cursor.fetchall()
+            if violations:
+                logging.warning(f"مراجع مفاتيح أجنبية غير صالحة بعد الترحيل: {len(violations)}")
             self.conn.commit()
-            self._run_migrations(cursor)
-
-        except Exception as e:
+        except Exception:
             self.conn.rollback()
-            print(f"حدث خطأ أثناء إنشاء الجداول أو التعديلات: {e}")
+            raise
         finally:
-            pass
-
-    def _create_archive_tables(self, cursor):
-        """إنشاء جداول الأرشيف"""
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS monthly_closures (
-                closure_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                closure_date TEXT,
-                archive_key_id INTEGER,
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-
-        
-        # جدول ملخص الإغلاق الأرشيفي
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS closure_summary_archive (
-                summary_id INTEGER,
-                closure_id INTEGER,
-                member_id INTEGER,
-                total_meals REAL,
-                total_drinks REAL,
-                total_miscellaneous REAL,
-                total_consumption REAL,
-                total_contribution REAL,
-                remaining_cash REAL,
-                archive_key_id INTEGER,
-                PRIMARY KEY (summary_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-        # أرشيف المصاريف
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS expenses_archive (
-                expense_id INTEGER,
-                item_name TEXT,
-                quantity INTEGER,
-                price REAL,
-                total_price REAL,
-                consumption INTEGER DEFAULT 0,
-                remaining INTEGER DEFAULT 0,
-                is_miscellaneous INTEGER DEFAULT 0,
-                is_drink INTEGER DEFAULT 0,
-                date TEXT,
-                archive_key_id INTEGER,
-                PRIMARY KEY (expense_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
+            self.conn.execute("PRAGMA foreign_keys = ON;")
 
-        # أرشيف المشتركين
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS members_archive (
-                member_id INTEGER,
-                name TEXT,
-                rank TEXT,
-                contribution REAL,
-                total_due REAL,
-                date TEXT,
-                archive_key_id INTEGER,
-                PRIMARY KEY (member_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
+    def _in_own_transaction(self):
+        return self._tx_depth > 0 and self._tx_owner == threading.get_ident()
 
-        # أرشيف سجلات الوجبات
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS meal_records_archive (
-                meal_record_id INTEGER,
-                meal_type TEXT,
-                date TEXT,
-                member_id INTEGER,
-                final_cost REAL,
-                archive_key_id INTEGER,
-                PRIMARY KEY (meal_record_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-
-        # أرشيف سجلات المشروبات
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS drink_records_archive (
-                drink_record_id INTEGER,
-                date TEXT,
-                drink_name TEXT,
-                member_id INTEGER,
-                quantity INTEGER,
-                total_cost REAL,
-                archive_key_id INTEGER,
-                PRIMARY KEY (drink_record_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-
-        # أرشيف المصاريف النثرية
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS miscellaneous_expenses_archive (
-                misc_expense_id INTEGER,
-                date TEXT,
-                amount REAL,
-                meal_type TEXT,
-                meal_record_id INTEGER,
-                archive_key_id INTEGER,
-                PRIMARY KEY (misc_expense_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-
-        # أرشيف توزيعات النثريات
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS miscellaneous_contributions_archive (
-                misc_contribution_id INTEGER,
-                member_id INTEGER,
-                misc_amount REAL,
-                meal_count INTEGER,
-                distribution_date TEXT,
-                archive_key_id INTEGER,
-                PRIMARY KEY (misc_contribution_id, archive_key_id),
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS monthly_totals_archive (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                archive_key_id INTEGER,
-                total_meals INTEGER,
-                total_drinks INTEGER,
-                total_misc REAL,
-                total_consumption REAL,
-                total_contributions REAL,
-                remaining_items REAL,
-                remaining_cash REAL,
-                recorded_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
-            );
-
-        """)
-    def _run_migrations(self, cursor):
-        """التعديلات على الجداول (Migrations)"""
-        try:
-            # تعديل جدول miscellaneous_expenses
-            cursor.execute("PRAGMA table_info(miscellaneous_expenses)")
-            cols = [col[1] for col in cursor.fetchall()]
-            if "meal_record_id" not in cols:
-                cursor.execute("ALTER TABLE miscellaneous_expenses ADD COLUMN meal_record_id INTEGER")
-            if "member_id" not in cols:
-                cursor.execute("ALTER TABLE miscellaneous_expenses ADD COLUMN member_id INTEGER REFERENCES members(member_id)")
+    @contextmanager
+    def transaction(self):
+        """وحدة عمل واحدة: كل ما يُنفذ داخلها يُحفظ مرة واحدة أو يُلغى بالكامل"""
+        # يمكن تداخل الكتل؛ الحفظ أو الإلغاء يتم عند خروج الكتلة الخارجية فقط
+        with self.lock:
+            if not self.conn:
+                self.reconnect()
+            if self._tx_depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._tx_owner = threading.get_ident()
+            self._tx_depth += 1
+            try:
+                cursor = self.conn.cursor()
+                yield ProfiledCursor(cursor, self.profiler) if self.profiler.enabled else cursor
+            except BaseException:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._tx_owner = None
+                    self._after_commit = []
+                    self.conn.rollback()
+                raise
+            else:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._tx_owner = None
+                    callbacks, self._after_commit = self._after_commit, []
+                    self.conn.commit()
+                    self._commit_count += 1
+                    for callback in callbacks:
+                        callback()
 
-            # تعديل جدول miscellaneous_contributions
-            cursor.execute("PRAGMA table_info(miscellaneous_contributions)")
-            cols = [col[1] for col in cursor.fetchall()]
-            if "meal_count" not in cols:
-                cursor.execute("ALTER TABLE miscellaneous_contributions ADD COLUMN meal_count INTEGER DEFAULT 0")
-            if "distribution_date" not in cols:
-                cursor.execute("ALTER TABLE miscellaneous_contributions ADD COLUMN distribution_date TEXT")
+    def on_commit(self, callback):
+        """تنفيذ callback بعد حفظ المعاملة الجارية في هذا الخيط، أو فورًا إن لم توجد معاملة"""
+        with self.lock:
+            if self._in_own_transaction():
+                self._after_commit.append(callback)
+                return
+        callback()
 
-            self.conn.commit()
-        except Exception as e:
-            print(f"حدث خطأ أثناء تنفيذ التعديلات: {e}")
+    def _run(self, conn, query, params, fetch=False):
+        """تنفيذ استعلام على conn وإعادة المؤشر أو كل الصفوف، مع القياس إن كان مفعلًا"""
+        if not self.profiler.enabled:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall() if fetch else cursor
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        result = cursor.fetchall() if fetch else cursor
+        self.profiler.record(conn, query, params, time.perf_counter() - started,
+                             len(result) if fetch else cursor.rowcount)
+        return result
 
     def execute_query(self, query, params=()):
         """تنفيذ استعلام مع قفل للسلامة في البيئات متعددة الخيوط"""
         with self.lock:
+            if self._in_own_transaction():
+                # داخل وحدة عمل: الخطأ يُرفع لإلغاء المعاملة كاملة والحفظ يتم عند نهايتها
+                return self._run(self.conn, query, params)
             try:
                 if not self.conn:
                     self.reconnect()
-                cursor = self.conn.cursor()
-                cursor.execute(query, params)
+                cursor = self._run(self.conn, query, params)
                 self.conn.commit()
+                self._commit_count += 1
                 return cursor
             except Exception as e:
                 print(f"حدث خطأ أثناء تنفيذ الاستعلام: {e}")
                 return None
 
+    def executemany(self, query, seq_of_params):
+        """تنفيذ نفس الاستعلام لمجموعة من القيم في معاملة واحدة"""
+        with self.transaction() as cursor:
+            cursor.executemany(query, seq_of_params)
+            return cursor
+
+    def bulk_insert(self, table, columns, rows):
+        """إدراج مجموعة صفوف في جدول دفعة واحدة"""
+        placeholders = ", ".join("?" for _ in columns)
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        return self.executemany(query, rows)
+
     def fetch_all(self, query, params=()):
-        """استرجاع جميع البيانات من قاعدة البيانات"""
+        """استرجاع جميع البيانات من قاعدة البيانات عبر اتصال قراءة من المجمع"""
         try:
             if not self.conn:
                 self.reconnect()
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
+            if self._is_memory() or self.max_readers <= 0 or self._in_own_transaction():
+                # قاعدة في الذاكرة لا يمكن مشاركتها، والقراءة داخل وحدة عمل يجب أن ترى
+                # تعديلاتها غير المحفوظة، لذا تتم عبر اتصال الكتابة
+                with self.lock:
+                    return self._run(self.conn, query, params, fetch=True)
+            reader = self._acquire_reader()
+            try:
+                return self._run(reader, query, params, fetch=True)
+            finally:
+                self._release_reader(reader)
         except Exception as e:
             print(f"حدث خطأ أثناء استرجاع البيانات: {e}")
             return []
 
+    def fetch_one(self, query, params=()):
+        """استرجاع أول صف من نتيجة الاستعلام أو None"""
+        rows = self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    @property
+    def write_generation(self):
+        """رقم يتغير مع كل تعديل وكل حفظ عبر اتصال الكتابة، لإبطال النتائج المخزنة مؤقتًا"""
+        return (self._connection_epoch, self.conn.total_changes if self.conn else 0, self._commit_count)
+
+    def iter_query(self, query, params=(), batch_size=500):
+        """قراءة نتيجة استعلام على دفعات من اتصال قراءة دون تحميلها كاملة في الذاكرة"""
+        if not self.conn:
+            self.reconnect()
+        if self._is_memory() or self.max_readers <= 0 or self._in_own_transaction():
+            yield from self.fetch_all(query, params)
+            return
+        reader = self._acquire_reader()
+        try:
+            # الزمن المقاس يشمل استهلاك المستدعي للدفعات (مثل الكتابة أثناء التصدير)
+            started = time.perf_counter()
+            count = 0
+            cursor = reader.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+            if self.profiler.enabled:
+                self.profiler.record(reader, query, params, time.perf_counter() - started, count)
+        finally:
+            self._release_reader(reader)
+
+    def fetch_member_totals(self, cursor=None, member_id=None):
+        """إجماليات الوجبات والمشروبات والنثريات لكل مشترك من العرض member_totals
+
+        العرض يقرأ صفًا واحدًا لكل مشترك من member_period_totals التي تحدّثها المشغلات.
+        تُمرر cursor عند القراءة داخل معاملة مفتوحة لرؤية تعديلاتها.
+        """
+        query = """
+            SELECT member_id, name, rank, contribution, total_due,
+                   meal_count, meal_cost, drink_quantity, drink_cost, misc_amount
+            FROM member_totals
+        """
+        params = ()
+        if member_id is not None:
+            query += " WHERE member_id = ?"
+            params = (member_id,)
+        query += " ORDER BY member_id"
+        if cursor is not None:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        return self.fetch_all(query, params)
+
     def close_connection(self):
-        """إغلاق اتصال قاعدة البيانات"""
+        """إغلاق اتصال قاعدة البيانات واتصالات القراءة"""
+        self._close_readers()
+        self.archives.close()
         if self.conn:
+            # تحديث إحصائيات المخطط حتى يختار فهارس البحث المناسبة مع نمو الجداول
+            try:
+                self.conn.execute("PRAGMA optimize;")
+            except sqlite3.Error:
+                pass
             self.conn.close()
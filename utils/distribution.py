@@ -0,0 +1,107 @@
+# أنواع الوجبات كما تحفظها صفحة الوجبات في meal_records.meal_type
+MEAL_TYPES = ("فطار", "غداء", "عشاء")
+
+# أوزان أنواع الوجبات عند التوزيع حسب نوع الوجبة؛ الأنواع غير المذكورة وزنها 1
+MEAL_TYPE_WEIGHTS = dict(zip(MEAL_TYPES, (1, 2, 1)))
+
+# طرق التوزيع المتاحة: الاسم -> استعلام يعيد (member_id، الوزن، عدد الوجبات)
+WEIGHTINGS = {
+    # بعدد الوجبات (الطريقة الأصلية)
+    "meals": """
+        SELECT member_id, COUNT(*), COUNT(*)
+        FROM meal_records
+        WHERE member_id IS NOT NULL
+        GROUP BY member_id
+        ORDER BY member_id
+    """,
+    # بوزن كل نوع وجبة (MEAL_TYPE_WEIGHTS)
+    "meal_type": """
+        SELECT member_id, SUM({case}), COUNT(*)
+        FROM meal_records
+        WHERE member_id IS NOT NULL
+        GROUP BY member_id
+        ORDER BY member_id
+    """,
+    # بعدد أيام الحضور (يوم واحد مهما تعددت وجباته)
+    "days": """
+        SELECT member_id, COUNT(DISTINCT date), COUNT(*)
+        FROM meal_records
+        WHERE member_id IS NOT NULL
+        GROUP BY member_id
+        ORDER BY member_id
+    """,
+}
+
+DEFAULT_WEIGHTING = "meals"
+
+
+def allocate(total, weights):
+    """تقسيم total (وحدات صغرى) على الأوزان بطريقة أكبر باقٍ فيساوي مجموع الحصص total تمامًا
+
+    كل حصة تأخذ الجزء الصحيح من نصيبها، ثم تُوزع الوحدات المتبقية واحدةً واحدة
+    على أصحاب أكبر كسور (والتعادل يُحسم بالترتيب).
+    """
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        raise ValueError("مجموع الأوزان يجب أن يكون أكبر من صفر")
+    quotients = [divmod(total * weight, weight_sum) for weight in weights]
+    shares = [quotient for quotient, _ in quotients]
+    leftover = total - sum(shares)
+    by_remainder = sorted(range(len(weights)), key=lambda i: -quotients[i][1])
+    for i in by_remainder[:leftover]:
+        shares[i] += 1
+    return shares
+
+
+def member_weights(cursor, weighting=DEFAULT_WEIGHTING, meal_type_weights=None):
+    """(member_id، الوزن، عدد الوجبات) لكل مشترك له وجبات حسب طريقة التوزيع"""
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"طريقة توزيع غير معروفة: {weighting}")
+    query = WEIGHTINGS[weighting]
+    params = []
+    if weighting == "meal_type":
+        type_weights = meal_type_weights or MEAL_TYPE_WEIGHTS
+        whens = " ".join("WHEN ? THEN ?" for _ in type_weights)
+        query = query.format(case=f"CASE meal_type {whens} ELSE 1 END")
+        for meal_type, weight in type_weights.items():
+            params += [meal_type, weight]
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def compute_shares(cursor, total_units, weighting=DEFAULT_WEIGHTING, meal_type_weights=None):
+    """حصة كل مشترك من total_units (وحدات صغرى): قائمة (member_id، الحصة، عدد الوجبات)"""
+    rows = member_weights(cursor, weighting, meal_type_weights)
+    if not rows:
+        return []
+    shares = allocate(total_units, [weight for _, weight, _ in rows])
+    return [(member_id, share, meal_count) for (member_id, _, meal_count), share in zip(rows, shares)]
+
+
+def apply_shares(cursor, shares, distribution_date):
+    """تسجيل الحصص في miscellaneous_contributions وإضافتها لديون المشتركين بعمليتين مجمعتين"""
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS misc_shares (
+            member_id INTEGER PRIMARY KEY,
+            amount INTEGER,
+            meal_count INTEGER
+        )
+    """)
+    cursor.execute("DELETE FROM temp.misc_shares")
+    cursor.executemany(
+        "INSERT INTO temp.misc_shares (member_id, amount, meal_count) VALUES (?, ?, ?)",
+        shares
+    )
+    cursor.execute("""
+        INSERT INTO miscellaneous_contributions (member_id, misc_amount, meal_count, distribution_date)
+        SELECT member_id, amount, meal_count, ? FROM temp.misc_shares ORDER BY member_id
+    """, (distribution_date,))
+    # استعلام فرعي مرتبط بدل UPDATE ... FROM الذي يحتاج SQLite 3.33 أو أحدث
+    cursor.execute("""
+        UPDATE members
+        SET total_due = total_due + (
+            SELECT s.amount FROM temp.misc_shares s WHERE s.member_id = members.member_id
+        )
+        WHERE member_id IN (SELECT member_id FROM temp.misc_shares)
+    """)
+    cursor.execute("DELETE FROM temp.misc_shares")
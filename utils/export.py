@@ -0,0 +1,184 @@
+import csv
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# مجلد التصدير الافتراضي لكل التقارير
+EXPORT_DIR = "reports"
+
+# عدد الصفوف المقروءة من المؤشر في كل دفعة أثناء التصدير
+EXPORT_BATCH_SIZE = 1000
+
+# كل كم صف يُبلّغ عن التقدم ويُفحص طلب الإلغاء
+PROGRESS_EVERY = 200
+
+# عدد مهام التصدير التي تعمل في نفس الوقت
+EXPORT_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ExportCancelled(Exception):
+    """أُلغيت مهمة التصدير بطلب من المستخدم"""
+
+
+class ExportJob:
+    """مهمة تصدير تعمل في الخلفية مع إبلاغ عن التقدم وإمكانية الإلغاء"""
+
+    def __init__(self, task, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        self.task = task
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.rows_done = 0
+        self.total_rows = None
+        self._last_report = 0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """رفع ExportCancelled إذا طلب المستخدم الإلغاء"""
+        if self.cancel_event.is_set():
+            raise ExportCancelled()
+
+    def report(self, rows_done, total_rows=None, force=False):
+        """تحديث التقدم؛ يُستدعى on_progress بحد أقصى 5 مرات في الثانية"""
+        self.rows_done = rows_done
+        if total_rows is not None:
+            self.total_rows = total_rows
+        now = time.monotonic()
+        if self.on_progress and (force or now - self._last_report >= 0.2):
+            self._last_report = now
+            self.on_progress(self.rows_done, self.total_rows)
+
+    def run(self):
+        try:
+            result = self.task(self)
+        except ExportCancelled:
+            if self.on_cancel:
+                self.on_cancel()
+            return None
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            return None
+        if self.on_done:
+            self.on_done(result)
+        return result
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        return _executor
+
+
+def submit_export(task, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+    """إضافة مهمة تصدير إلى طابور الخلفية؛ task(job) تُرجع مسار الملف"""
+    job = ExportJob(task, on_progress, on_done, on_error, on_cancel)
+    job.future = _get_executor().submit(job.run)
+    return job
+
+
+def build_export_path(filename, extension="xlsx", directory=EXPORT_DIR):
+    """إنشاء مسار ملف التصدير داخل مجلد reports مع ختم زمني"""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
+
+def _sheet_title(title):
+    # أسماء أوراق Excel محدودة بـ 31 حرفًا ولا تقبل بعض الرموز
+    return re.sub(r"[\[\]:*?/\\]", "_", str(title))[:31] or "Sheet"
+
+
+def _track(rows, job, counter):
+    # تمرير الصفوف مع فحص الإلغاء والإبلاغ عن التقدم كل PROGRESS_EVERY صف
+    for row in rows:
+        counter[0] += 1
+        if job is not None and counter[0] % PROGRESS_EVERY == 0:
+            job.check()
+            job.report(counter[0])
+        yield row
+
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def write_xlsx(path, sheets, job=None):
+    """كتابة أوراق متعددة في ملف xlsx بوضع الكتابة فقط (ذاكرة ثابتة مهما كان عدد الصفوف)
+
+    sheets: قائمة من (عنوان الورقة، العناوين، الصفوف) والصفوف أي متسلسلة قابلة للتكرار.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    counter = [0]
+    for title, headers, rows in sheets:
+        sheet = workbook.create_sheet(title=_sheet_title(title))
+        sheet.append(list(headers))
+        for row in _track(rows, job, counter):
+            sheet.append(list(row))
+    if job is not None:
+        job.check()
+    workbook.save(path)
+    if job is not None:
+        job.report(counter[0], force=True)
+    return counter[0]
+
+
+def write_csv(path, headers, rows, job=None):
+    """كتابة الصفوف في ملف CSV بترميز يفتحه Excel بالعربية مباشرة"""
+    counter = [0]
+    try:
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(headers))
+            for row in _track(rows, job, counter):
+                writer.writerow(list(row))
+    except ExportCancelled:
+        _remove_partial(path)
+        raise
+    if job is not None:
+        job.report(counter[0], force=True)
+    return counter[0]
+
+
+def export_rows(rows, headers, filename, fmt="xlsx", sheet_title=None, job=None):
+    """تصدير صفوف (من مؤشر أو قائمة) إلى ملف وإرجاع مساره"""
+    path = build_export_path(filename, fmt)
+    if fmt == "csv":
+        write_csv(path, headers, rows, job)
+    else:
+        write_xlsx(path, [(sheet_title or filename, headers, rows)], job)
+    return path
+
+
+def export_query(db, query, params, headers, filename, fmt="xlsx", sheet_title=None, job=None):
+    """تصدير نتيجة استعلام مباشرة من مؤشر قاعدة البيانات دون تحميلها كاملة في الذاكرة"""
+    rows = db.iter_query(query, params, batch_size=EXPORT_BATCH_SIZE)
+    return export_rows(rows, headers, filename, fmt, sheet_title, job)
+
+
+def export_sheets(sheets, filename, job=None):
+    """تصدير عدة أوراق في ملف xlsx واحد؛ كل ورقة (العنوان، العناوين، الصفوف)"""
+    path = build_export_path(filename, "xlsx")
+    write_xlsx(path, sheets, job)
+    return path
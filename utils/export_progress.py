@@ -0,0 +1,45 @@
+import flet as ft
+from utils.export import submit_export
+
+
+def run_export(page, task, show_message, title="جاري التصدير...", total_rows=None):
+    """تشغيل مهمة تصدير في الخلفية مع شريط تقدم وزر إلغاء في الشريط السفلي
+
+    task(job) تُنفذ في خيط منفصل وتُرجع مسار الملف، و show_message تعرض النتيجة النهائية.
+    """
+    progress_bar = ft.ProgressBar(width=320, value=None)
+    status_text = ft.Text(title)
+
+    def on_progress(rows_done, total):
+        total = total or total_rows
+        if total:
+            progress_bar.value = min(rows_done / total, 1.0)
+            status_text.value = f"{title} {rows_done} من {total} صف"
+        else:
+            status_text.value = f"{title} {rows_done} صف"
+        page.update()
+
+    def on_done(path):
+        show_message(f"تم حفظ التقرير في: {path}")
+
+    def on_error(error):
+        show_message(f"خطأ أثناء تصدير الملف: {error}")
+
+    def on_cancel():
+        show_message("تم إلغاء التصدير")
+
+    jobs = []
+    # الشريط يُعرض قبل بدء المهمة حتى لا يغطي رسالة نتيجة مهمة سريعة
+    snack_bar = ft.SnackBar(
+        content=ft.Column([status_text, progress_bar], tight=True),
+        action="إلغاء",
+        on_action=lambda e: [job.cancel() for job in jobs],
+        duration=24 * 60 * 60 * 1000,  # يبقى ظاهرًا حتى تنتهي المهمة وتستبدله رسالة النتيجة
+    )
+    page.snack_bar = snack_bar
+    snack_bar.open = True
+    page.update()
+
+    job = submit_export(task, on_progress, on_done, on_error, on_cancel)
+    jobs.append(job)
+    return job
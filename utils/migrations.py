@@ -0,0 +1,788 @@
+# سجل ترحيلات مخطط قاعدة البيانات
+# كل خطوة تُطبق مرة واحدة فقط حسب قيمة PRAGMA user_version، ويجب أن تكون آمنة
+# عند إعادة تطبيقها (IF NOT EXISTS / فحص الأعمدة) لأن ملفات expenses.db القديمة
+# تبدأ من النسخة 0 رغم وجود جداولها.
+
+import logging
+import re
+import sqlite3
+from utils.money import MINOR_UNITS
+from utils import search
+
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _add_column_if_missing(cursor, table, column, definition):
+    if column not in _column_names(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _m001_baseline(cursor):
+    """الجداول الأساسية وجداول الأرشيف والأعمدة المضافة سابقًا"""
+    # جدول المصاريف
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expenses (
+            expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT,
+            quantity INTEGER,
+            price REAL,
+            total_price REAL,
+            consumption INTEGER DEFAULT 0,
+            remaining INTEGER DEFAULT 0,
+            is_miscellaneous INTEGER DEFAULT 0,
+            is_drink INTEGER DEFAULT 0,
+            date TEXT
+        )
+    """)
+
+    # جدول المشتركين
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS members (
+            member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            rank TEXT,
+            contribution REAL,
+            total_due REAL DEFAULT 0,
+            date TEXT
+        )
+    """)
+
+    # جدول سجلات الوجبات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_records (
+            meal_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meal_type TEXT,
+            date TEXT,
+            member_id INTEGER,
+            final_cost REAL,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+        )
+    """)
+
+    # جدول سجلات المشروبات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS drink_records (
+            drink_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            drink_name TEXT,
+            member_id INTEGER,
+            quantity INTEGER,
+            total_cost REAL,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+        )
+    """)
+
+    # جدول المصاريف النثرية العام
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS miscellaneous_expenses (
+            misc_expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            amount REAL,
+            meal_type TEXT,
+            meal_record_id INTEGER,
+            member_id INTEGER,
+            FOREIGN KEY (meal_record_id) REFERENCES meal_records(meal_record_id)ON DELETE CASCADE,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+        )
+    """)
+
+    # جدول النثريات الخاص بالمشتركين
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS miscellaneous_contributions (
+            misc_contribution_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER,
+            misc_amount REAL,
+            meal_count INTEGER DEFAULT 0,
+            distribution_date TEXT,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+        )
+    """)
+
+    # جدول مفاتيح الأرشيف
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archive_keys (
+            archive_key_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            archive_name TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            archived_at TEXT
+        )
+    """)
+
+    # جدول ملخص الإغلاق
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS closure_summary (
+            summary_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            closure_id INTEGER,
+            member_id INTEGER,
+            total_meals REAL,
+            total_drinks REAL,
+            total_miscellaneous REAL,
+            total_consumption REAL,
+            total_contribution REAL,
+            remaining_cash REAL,
+            FOREIGN KEY (closure_id) REFERENCES monthly_closures(closure_id),
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+        )
+    """)
+
+    _create_archive_tables(cursor)
+
+    # أعمدة أضيفت لاحقًا إلى ملفات قديمة
+    _add_column_if_missing(cursor, "miscellaneous_expenses", "meal_record_id", "INTEGER")
+    _add_column_if_missing(cursor, "miscellaneous_expenses", "member_id", "INTEGER REFERENCES members(member_id)")
+    _add_column_if_missing(cursor, "miscellaneous_contributions", "meal_count", "INTEGER DEFAULT 0")
+    _add_column_if_missing(cursor, "miscellaneous_contributions", "distribution_date", "TEXT")
+
+
+def _create_archive_tables(cursor):
+    """إنشاء جداول الأرشيف"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_closures (
+            closure_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            closure_date TEXT,
+            archive_key_id INTEGER,
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # جدول ملخص الإغلاق الأرشيفي
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS closure_summary_archive (
+            summary_id INTEGER,
+            closure_id INTEGER,
+            member_id INTEGER,
+            total_meals REAL,
+            total_drinks REAL,
+            total_miscellaneous REAL,
+            total_consumption REAL,
+            total_contribution REAL,
+            remaining_cash REAL,
+            archive_key_id INTEGER,
+            PRIMARY KEY (summary_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف المصاريف
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expenses_archive (
+            expense_id INTEGER,
+            item_name TEXT,
+            quantity INTEGER,
+            price REAL,
+            total_price REAL,
+            consumption INTEGER DEFAULT 0,
+            remaining INTEGER DEFAULT 0,
+            is_miscellaneous INTEGER DEFAULT 0,
+            is_drink INTEGER DEFAULT 0,
+            date TEXT,
+            archive_key_id INTEGER,
+            PRIMARY KEY (expense_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف المشتركين
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS members_archive (
+            member_id INTEGER,
+            name TEXT,
+            rank TEXT,
+            contribution REAL,
+            total_due REAL,
+            date TEXT,
+            archive_key_id INTEGER,
+            PRIMARY KEY (member_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف سجلات الوجبات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_records_archive (
+            meal_record_id INTEGER,
+            meal_type TEXT,
+            date TEXT,
+            member_id INTEGER,
+            final_cost REAL,
+            archive_key_id INTEGER,
+            PRIMARY KEY (meal_record_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف سجلات المشروبات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS drink_records_archive (
+            drink_record_id INTEGER,
+            date TEXT,
+            drink_name TEXT,
+            member_id INTEGER,
+            quantity INTEGER,
+            total_cost REAL,
+            archive_key_id INTEGER,
+            PRIMARY KEY (drink_record_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف المصاريف النثرية
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS miscellaneous_expenses_archive (
+            misc_expense_id INTEGER,
+            date TEXT,
+            amount REAL,
+            meal_type TEXT,
+            meal_record_id INTEGER,
+            archive_key_id INTEGER,
+            PRIMARY KEY (misc_expense_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    # أرشيف توزيعات النثريات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS miscellaneous_contributions_archive (
+            misc_contribution_id INTEGER,
+            member_id INTEGER,
+            misc_amount REAL,
+            meal_count INTEGER,
+            distribution_date TEXT,
+            archive_key_id INTEGER,
+            PRIMARY KEY (misc_contribution_id, archive_key_id),
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_totals_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            archive_key_id INTEGER,
+            total_meals INTEGER,
+            total_drinks INTEGER,
+            total_misc REAL,
+            total_consumption REAL,
+            total_contributions REAL,
+            remaining_items REAL,
+            remaining_cash REAL,
+            recorded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+
+# حزمة الفهارس الثانوية لأعمدة البحث المتكررة
+INDEXES = [
+    # الجداول الحالية
+    ("idx_expenses_item_name", "expenses", "item_name"),
+    ("idx_expenses_type", "expenses", "is_drink, is_miscellaneous"),
+    ("idx_expenses_date", "expenses", "date"),
+    ("idx_members_name", "members", "name"),
+    ("idx_members_rank_name", "members", "rank, name"),
+    ("idx_meal_records_member", "meal_records", "member_id"),
+    ("idx_meal_records_date", "meal_records", "date"),
+    ("idx_drink_records_member", "drink_records", "member_id"),
+    ("idx_drink_records_drink_name", "drink_records", "drink_name"),
+    ("idx_drink_records_date", "drink_records", "date"),
+    ("idx_misc_expenses_meal_record", "miscellaneous_expenses", "meal_record_id"),
+    ("idx_misc_expenses_member", "miscellaneous_expenses", "member_id"),
+    ("idx_misc_expenses_date", "miscellaneous_expenses", "date"),
+    ("idx_misc_contributions_member", "miscellaneous_contributions", "member_id"),
+    ("idx_misc_contributions_date", "miscellaneous_contributions", "distribution_date"),
+    ("idx_archive_keys_archived_at", "archive_keys", "archived_at"),
+    ("idx_monthly_closures_archive_key", "monthly_closures", "archive_key_id"),
+    ("idx_closure_summary_closure", "closure_summary", "closure_id, member_id"),
+    # جداول الأرشيف
+    ("idx_members_archive_key_member", "members_archive", "archive_key_id, member_id"),
+    ("idx_meal_records_archive_key_member", "meal_records_archive", "archive_key_id, member_id"),
+    ("idx_drink_records_archive_key_member", "drink_records_archive", "archive_key_id, member_id"),
+    ("idx_misc_contributions_archive_key_member", "miscellaneous_contributions_archive", "archive_key_id, member_id"),
+    ("idx_closure_summary_archive_key_member", "closure_summary_archive", "archive_key_id, member_id"),
+    ("idx_closure_summary_archive_closure", "closure_summary_archive", "closure_id"),
+    ("idx_expenses_archive_key_item", "expenses_archive", "archive_key_id, item_name"),
+    ("idx_misc_expenses_archive_key", "miscellaneous_expenses_archive", "archive_key_id, meal_record_id"),
+    ("idx_monthly_totals_archive_key", "monthly_totals_archive", "archive_key_id, recorded_at"),
+]
+
+
+def _create_indexes(cursor, indexes):
+    for index_name, table, columns in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})")
+
+
+def _m002_index_pack(cursor):
+    """الفهارس الثانوية لأعمدة البحث والربط"""
+    _create_indexes(cursor, INDEXES)
+    cursor.execute("ANALYZE")
+
+
+def _create_stock_triggers(cursor):
+    """المتبقي والاستهلاك في expenses رصيد جارٍ يُحدّث مع كل حركة مخزون"""
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movements_apply
+        AFTER INSERT ON stock_movements
+        BEGIN
+            UPDATE expenses
+            SET quantity = quantity + NEW.quantity_delta,
+                consumption = consumption + NEW.consumed_delta,
+                remaining = remaining + NEW.quantity_delta - NEW.consumed_delta
+            WHERE expense_id = NEW.expense_id;
+        END
+    """)
+
+
+def _m003_stock_ledger(cursor):
+    """دفتر حركات المخزون لكل صنف"""
+    # أنواع الحركات: opening, purchase, meal, drink, adjust, rollover
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expense_id INTEGER NOT NULL,
+            movement_type TEXT NOT NULL,
+            quantity_delta INTEGER DEFAULT 0,
+            consumed_delta INTEGER DEFAULT 0,
+            date TEXT,
+            ref_id INTEGER,
+            FOREIGN KEY (expense_id) REFERENCES expenses(expense_id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_expense ON stock_movements (expense_id, movement_id)")
+
+    # توحيد الرصيد القديم: المتبقي = الكمية - الاستهلاك كما تفرضه شاشات التعديل
+    cursor.execute("UPDATE expenses SET remaining = COALESCE(quantity, 0) - COALESCE(consumption, 0)")
+
+    # رصيد افتتاحي لكل صنف قبل إنشاء المشغل حتى لا يُضاف مرتين
+    cursor.execute("""
+        INSERT INTO stock_movements (expense_id, movement_type, quantity_delta, consumed_delta, date)
+        SELECT e.expense_id, 'opening', COALESCE(e.quantity, 0), COALESCE(e.consumption, 0), e.date
+        FROM expenses e
+        WHERE NOT EXISTS (SELECT 1 FROM stock_movements m WHERE m.expense_id = e.expense_id)
+    """)
+    _create_stock_triggers(cursor)
+
+
+def _create_member_totals_view(cursor):
+    """إجماليات استهلاك كل مشترك: كل مصدر يُجمّع مرة واحدة ثم يُربط بالأعضاء"""
+    cursor.execute("DROP VIEW IF EXISTS member_totals")
+    cursor.execute("""
+        CREATE VIEW member_totals AS
+        SELECT m.member_id, m.name, m.rank, m.contribution, m.total_due,
+               COALESCE(mr.meal_count, 0) AS meal_count,
+               COALESCE(mr.meal_cost, 0) AS meal_cost,
+               COALESCE(dr.drink_quantity, 0) AS drink_quantity,
+               COALESCE(dr.drink_cost, 0) AS drink_cost,
+               COALESCE(mc.misc_amount, 0) AS misc_amount
+        FROM members m
+        LEFT JOIN (
+            SELECT member_id, COUNT(*) AS meal_count, SUM(final_cost) AS meal_cost
+            FROM meal_records GROUP BY member_id
+        ) mr ON mr.member_id = m.member_id
+        LEFT JOIN (
+            SELECT member_id, SUM(quantity) AS drink_quantity, SUM(total_cost) AS drink_cost
+            FROM drink_records GROUP BY member_id
+        ) dr ON dr.member_id = m.member_id
+        LEFT JOIN (
+            SELECT member_id, SUM(misc_amount) AS misc_amount
+            FROM miscellaneous_contributions GROUP BY member_id
+        ) mc ON mc.member_id = m.member_id
+    """)
+
+
+def _m004_member_totals(cursor):
+    """فهارس تغطية للتجميع حسب المشترك وعرض الإجماليات المشترك"""
+    # الفهارس المغطية تغني عن الفهارس أحادية العمود على member_id
+    for index_name in ("idx_meal_records_member", "idx_drink_records_member", "idx_misc_contributions_member"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+    _create_indexes(cursor, [
+        ("idx_meal_records_member_cost", "meal_records", "member_id, final_cost"),
+        ("idx_drink_records_member_cost", "drink_records", "member_id, quantity, total_cost"),
+        ("idx_misc_contributions_member_amount", "miscellaneous_contributions", "member_id, misc_amount"),
+    ])
+    _create_member_totals_view(cursor)
+
+
+# مصادر الإجماليات: (الجدول، اسم مختصر للمشغلات، تعبير الإضافة لكل عمود)
+PERIOD_TOTALS_SOURCES = [
+    ("meal_records", "meal", {"meal_count": "1", "meal_cost": "COALESCE({row}.final_cost, 0)"}),
+    ("drink_records", "drink", {"drink_quantity": "COALESCE({row}.quantity, 0)", "drink_cost": "COALESCE({row}.total_cost, 0)"}),
+    ("miscellaneous_contributions", "misc", {"misc_amount": "COALESCE({row}.misc_amount, 0)"}),
+]
+
+
+def _period_totals_add(columns, row):
+    """إضافة قيم السجل إلى صف المشترك (ينشئ الصف إن لم يوجد)"""
+    names = ", ".join(columns)
+    values = ", ".join(expr.format(row=row) for expr in columns.values())
+    updates = ", ".join(f"{col} = {col} + excluded.{col}" for col in columns)
+    return f"""
+                INSERT INTO member_period_totals (member_id, {names})
+                SELECT {row}.member_id, {values} WHERE {row}.member_id IS NOT NULL
+                ON CONFLICT(member_id) DO UPDATE SET {updates};"""
+
+
+def _period_totals_subtract(columns, row):
+    """طرح قيم السجل من صف المشترك"""
+    updates = ", ".join(f"{col} = {col} - {expr.format(row=row)}" for col, expr in columns.items())
+    return f"""
+                UPDATE member_period_totals SET {updates}
+                WHERE member_id = {row}.member_id;"""
+
+
+def _create_period_totals_triggers(cursor):
+    """مشغلات تحدّث member_period_totals مع كل إضافة أو تعديل أو حذف في السجلات"""
+    for table, short, columns in PERIOD_TOTALS_SOURCES:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{short}_totals_insert
+            AFTER INSERT ON {table}
+            BEGIN{_period_totals_add(columns, "NEW")}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{short}_totals_delete
+            AFTER DELETE ON {table}
+            BEGIN{_period_totals_subtract(columns, "OLD")}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{short}_totals_update
+            AFTER UPDATE ON {table}
+            BEGIN{_period_totals_subtract(columns, "OLD")}{_period_totals_add(columns, "NEW")}
+            END
+        """)
+
+
+def _m005_member_period_totals(cursor):
+    """جدول إجماليات الفترة لكل مشترك تحدّثه المشغلات"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS member_period_totals (
+            member_id INTEGER PRIMARY KEY,
+            meal_count INTEGER DEFAULT 0,
+            meal_cost REAL DEFAULT 0,
+            drink_quantity INTEGER DEFAULT 0,
+            drink_cost REAL DEFAULT 0,
+            misc_amount REAL DEFAULT 0,
+            FOREIGN KEY (member_id) REFERENCES members(member_id) ON DELETE CASCADE
+        )
+    """)
+    # تعبئة أولية من السجلات الحالية قبل تفعيل المشغلات
+    _fill_member_period_totals(cursor)
+    _create_period_totals_triggers(cursor)
+
+    # العرض member_totals يقرأ الآن صفًا واحدًا لكل مشترك بدل تجميع السجلات
+    cursor.execute("DROP VIEW IF EXISTS member_totals")
+    cursor.execute("""
+        CREATE VIEW member_totals AS
+        SELECT m.member_id, m.name, m.rank, m.contribution, m.total_due,
+               COALESCE(t.meal_count, 0) AS meal_count,
+               COALESCE(t.meal_cost, 0) AS meal_cost,
+               COALESCE(t.drink_quantity, 0) AS drink_quantity,
+               COALESCE(t.drink_cost, 0) AS drink_cost,
+               COALESCE(t.misc_amount, 0) AS misc_amount
+        FROM members m
+        LEFT JOIN member_period_totals t ON t.member_id = m.member_id
+    """)
+
+
+def _fill_member_period_totals(cursor):
+    """إعادة حساب member_period_totals كاملًا من السجلات الحالية"""
+    cursor.execute("DELETE FROM member_period_totals")
+    cursor.execute("""
+        INSERT INTO member_period_totals (member_id, meal_count, meal_cost, drink_quantity, drink_cost, misc_amount)
+        SELECT m.member_id, COALESCE(mr.meal_count, 0), COALESCE(mr.meal_cost, 0),
+               COALESCE(dr.drink_quantity, 0), COALESCE(dr.drink_cost, 0), COALESCE(mc.misc_amount, 0)
+        FROM members m
+        LEFT JOIN (
+            SELECT member_id, COUNT(*) AS meal_count, SUM(final_cost) AS meal_cost
+            FROM meal_records GROUP BY member_id
+        ) mr ON mr.member_id = m.member_id
+        LEFT JOIN (
+            SELECT member_id, SUM(quantity) AS drink_quantity, SUM(total_cost) AS drink_cost
+            FROM drink_records GROUP BY member_id
+        ) dr ON dr.member_id = m.member_id
+        LEFT JOIN (
+            SELECT member_id, SUM(misc_amount) AS misc_amount
+            FROM miscellaneous_contributions GROUP BY member_id
+        ) mc ON mc.member_id = m.member_id
+    """)
+
+
+def _m006_keyset_indexes(cursor):
+    """فهارس (الفترة، التاريخ، المعرف) لتقسيم صفحات الأرشيف بالبحث على المفتاح"""
+    # الجداول الحالية يكفيها فهرس التاريخ لأنه يتضمن rowid ضمنيًا
+    _create_indexes(cursor, [
+        ("idx_expenses_archive_key_date", "expenses_archive", "archive_key_id, date, expense_id"),
+        ("idx_meal_records_archive_key_date", "meal_records_archive", "archive_key_id, date, meal_record_id"),
+        ("idx_drink_records_archive_key_date", "drink_records_archive", "archive_key_id, date, drink_record_id"),
+        ("idx_misc_contributions_archive_key_date", "miscellaneous_contributions_archive",
+         "archive_key_id, distribution_date, misc_contribution_id"),
+    ])
+
+
+# أعمدة المبالغ في كل جدول؛ تُخزن من النسخة 7 أعدادًا صحيحة بالوحدات الصغرى (utils.money)
+MONEY_COLUMNS = {
+    "expenses": ("price", "total_price"),
+    "members": ("contribution", "total_due"),
+    "meal_records": ("final_cost",),
+    "drink_records": ("total_cost",),
+    "miscellaneous_expenses": ("amount",),
+    "miscellaneous_contributions": ("misc_amount",),
+    "closure_summary": ("total_meals", "total_drinks", "total_miscellaneous",
+                        "total_consumption", "total_contribution", "remaining_cash"),
+    "member_period_totals": ("meal_cost", "drink_cost", "misc_amount"),
+    "expenses_archive": ("price", "total_price"),
+    "members_archive": ("contribution", "total_due"),
+    "meal_records_archive": ("final_cost",),
+    "drink_records_archive": ("total_cost",),
+    "miscellaneous_expenses_archive": ("amount",),
+    "miscellaneous_contributions_archive": ("misc_amount",),
+    "closure_summary_archive": ("total_meals", "total_drinks", "total_miscellaneous",
+                                "total_consumption", "total_contribution", "remaining_cash"),
+    "monthly_totals_archive": ("total_meals", "total_drinks", "total_misc", "total_consumption",
+                               "total_contributions", "remaining_items", "remaining_cash"),
+}
+
+
+def _table_sql(cursor, table):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone()[0]
+
+
+def _drop_dependents(cursor):
+    """حذف كل المشغلات والعروض قبل استبدال جدول، وإعادة تعريفاتها لتُنشأ بعده كما هي
+
+    حتى لا يشير أي منها إلى جدول محذوف أثناء الاستبدال.
+    """
+    cursor.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('trigger', 'view') AND sql IS NOT NULL
+        ORDER BY type DESC
+    """)
+    dependents = cursor.fetchall()
+    for kind, name, _ in dependents:
+        cursor.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+    return [sql for _, _, sql in dependents]
+
+
+def _rebuild_table(cursor, table, edit_sql, values=None):
+    """إعادة بناء الجدول بتعريف جديد ونسخ صفوفه إليه
+
+    SQLite لا يغير نوع عمود قائم ولا قيوده، فيُنشأ جدول جديد بالتعريف الذي تعيده
+    edit_sql(create_sql) وتُنسخ إليه الصفوف (values: تعبير لكل عمود، والافتراضي العمود
+    نفسه) ثم يحل محل القديم مع فهارسه وقيمة AUTOINCREMENT الأخيرة.
+    """
+    create_sql = _table_sql(cursor, table)
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))
+    index_sqls = [row[0] for row in cursor.fetchall()]
+    # sqlite_sequence موجود دائمًا هنا لأن جداول النسخة 1 تستخدم AUTOINCREMENT
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    sequence = cursor.fetchone()
+
+    new_table = f"{table}__rebuild"
+    new_sql = re.sub(rf"^CREATE TABLE\s+\"?{table}\"?", f"CREATE TABLE {new_table}", create_sql)
+    cursor.execute(edit_sql(new_sql))
+
+    columns = _column_names(cursor, table)
+    values = values or {}
+    selected = [values.get(col, col) for col in columns]
+    cursor.execute(f"INSERT INTO {new_table} ({', '.join(columns)}) SELECT {', '.join(selected)} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for index_sql in index_sqls:
+        cursor.execute(index_sql)
+    if sequence is not None:
+        cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (sequence[0], table))
+
+
+def _rebuild_with_integer_money(cursor, table, money_columns):
+    """إعادة بناء الجدول بأعمدة مبالغ INTEGER وتحويل القيم إلى وحدات صغرى"""
+    def edit_sql(sql):
+        for column in money_columns:
+            sql = re.sub(rf"\b{column}\s+REAL\b", f"{column} INTEGER", sql)
+        return sql
+
+    _rebuild_table(cursor, table, edit_sql, {
+        column: f"CAST(ROUND({column} * {MINOR_UNITS}) AS INTEGER)" for column in money_columns
+    })
+
+
+def _m007_integer_money(cursor):
+    """تخزين المبالغ أعدادًا صحيحة بالوحدات الصغرى بدل REAL
+
+    يُشغّل والمفاتيح الأجنبية معطلة (انظر DatabaseManager._run_migrations) لأن حذف الجداول
+    القديمة ينفذ ON DELETE CASCADE. الجداول التي تحولت سابقًا لا تُعاد.
+    """
+    pending = {}
+    for table, money_columns in MONEY_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        types = {col[1]: col[2].upper() for col in cursor.fetchall()}
+        if any(types.get(column) == "REAL" for column in money_columns):
+            pending[table] = money_columns
+    if not pending:
+        return
+
+    dependents = _drop_dependents(cursor)
+    for table, money_columns in pending.items():
+        _rebuild_with_integer_money(cursor, table, money_columns)
+    # الإجماليات تُعاد من السجلات المحولة حتى تطابق مجموعها تمامًا
+    _fill_member_period_totals(cursor)
+    for sql in dependents:
+        cursor.execute(sql)
+
+
+# حذف الصنف يُبقي سجلات صرفه (drink_name يحمل اسمه للعرض) كما كان قبل الربط بالمعرف
+DRINK_ITEM_REFERENCE = "REFERENCES expenses(expense_id) ON DELETE SET NULL"
+
+
+def _m008_item_references(cursor):
+    """ربط سجلات المشروبات بالصنف بالمعرف بدل مطابقة الاسم
+
+    drink_name يبقى اسم الصنف وقت التسجيل للعرض فقط، فلا تنكسر السجلات القديمة إذا أُعيدت تسمية الصنف.
+    """
+    _add_column_if_missing(cursor, "drink_records", "expense_id", f"INTEGER {DRINK_ITEM_REFERENCE}")
+    _add_column_if_missing(cursor, "drink_records_archive", "expense_id", "INTEGER")
+
+    # تعبئة السجلات القديمة بمطابقة الاسم مرة واحدة (يُفضَّل الصنف المعلّم كمشروب)
+    cursor.execute("""
+        UPDATE drink_records
+        SET expense_id = (
+            SELECT e.expense_id FROM expenses e
+            WHERE e.item_name = drink_records.drink_name
+            ORDER BY e.is_drink DESC, e.expense_id
+            LIMIT 1
+        )
+        WHERE expense_id IS NULL
+    """)
+    # في الأرشيف يُبحث أولًا في مشتروات نفس الفترة ثم في المشتروات الحالية
+    cursor.execute("""
+        UPDATE drink_records_archive
+        SET expense_id = COALESCE(
+            (SELECT ea.expense_id FROM expenses_archive ea
+             WHERE ea.archive_key_id = drink_records_archive.archive_key_id
+               AND ea.item_name = drink_records_archive.drink_name
+             ORDER BY ea.is_drink DESC, ea.expense_id
+             LIMIT 1),
+            (SELECT e.expense_id FROM expenses e
+             WHERE e.item_name = drink_records_archive.drink_name
+             ORDER BY e.is_drink DESC, e.expense_id
+             LIMIT 1)
+        )
+        WHERE expense_id IS NULL
+    """)
+    _create_indexes(cursor, [
+        ("idx_drink_records_expense", "drink_records", "expense_id"),
+        ("idx_drink_records_archive_key_expense", "drink_records_archive", "archive_key_id, expense_id"),
+        # حركات المخزون المرتبطة بسجل (وجبة أو مشروب) حسب نوعها
+        ("idx_stock_movements_ref", "stock_movements", "movement_type, ref_id"),
+    ])
+
+
+def _m009_archive_partitions(cursor):
+    """فهرس ملفات الأرشيف: كل فترة مقفلة تُنقل إلى ملف مستقل (انظر utils/archive_store.py)
+
+    نقل الفترات القديمة نفسه لا يتم هنا لأنه يحتاج ATTACH خارج المعاملة، بل عند الاتصال
+    التالي عبر ArchiveStore.seal_pending.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            archive_key_id INTEGER PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            row_count INTEGER DEFAULT 0,
+            sealed_at TEXT,
+            FOREIGN KEY (archive_key_id) REFERENCES archive_keys(archive_key_id)
+        )
+    """)
+
+
+def _create_name_search(cursor):
+    """جداول فهرس الأسماء ومشغلاتها، وإعادة تعبئتها بالتوحيد الحالي في utils/search.py"""
+    for table, source, id_column, name_column in search.INDEXES.values():
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table}
+                USING fts5(name UNINDEXED, normalized, tokenize = 'trigram')
+            """)
+        except sqlite3.OperationalError as e:
+            # SQLite دون FTS5 أو trigram (أقدم من 3.34): يبقى البحث بدون اقتراحات سريعة
+            logging.warning(f"تعذر إنشاء فهرس البحث {table}: {e}")
+            return
+        normalized = search.normalized_sql("NEW." + name_column)
+        # المشغلات تُعاد من جديد حتى تحمل تعبير التوحيد الحالي
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event}")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {source}
+            BEGIN
+                INSERT INTO {table} (rowid, name, normalized) VALUES (NEW.{id_column}, NEW.{name_column}, {normalized});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update AFTER UPDATE OF {name_column} ON {source}
+            BEGIN
+                DELETE FROM {table} WHERE rowid = OLD.{id_column};
+                INSERT INTO {table} (rowid, name, normalized) VALUES (NEW.{id_column}, NEW.{name_column}, {normalized});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {source}
+            BEGIN
+                DELETE FROM {table} WHERE rowid = OLD.{id_column};
+            END
+        """)
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"""
+            INSERT INTO {table} (rowid, name, normalized)
+            SELECT {id_column}, {name_column}, {search.normalized_sql(name_column)} FROM {source}
+        """)
+
+
+def _m010_name_search(cursor):
+    """فهرس FTS5 (trigram) لأسماء الأصناف والمشتركين لاقتراحات البحث (انظر utils/search.py)
+
+    كل جدول فهرس يحمل الاسم كما هو والاسم الموحد (همزات، تاء مربوطة، تشكيل)، و rowid هو
+    معرف الصف الأصلي، والمشغلات تبقيه مطابقًا للجدول الأصلي.
+    """
+    _create_name_search(cursor)
+
+
+def _m011_name_search_whitespace(cursor):
+    """توحيد المسافات المتتالية في الفهرس كما في نص البحث (إعادة المشغلات والتعبئة)"""
+    _create_name_search(cursor)
+
+
+def _m012_drink_item_set_null(cursor):
+    """ربط drink_records بالصنف مع ON DELETE SET NULL حتى يبقى حذف صنف له مبيعات ممكنًا
+
+    العمود أُضيف في النسخة 8 دون إجراء عند الحذف، فيُعاد بناء الجدول إن لزم.
+    يُشغّل والمفاتيح الأجنبية معطلة مثل النسخة 7.
+    """
+    if DRINK_ITEM_REFERENCE in _table_sql(cursor, "drink_records"):
+        return
+    dependents = _drop_dependents(cursor)
+    _rebuild_table(cursor, "drink_records", lambda sql: re.sub(
+        r"REFERENCES\s+expenses\s*\(\s*expense_id\s*\)(?!\s+ON\s+DELETE)", DRINK_ITEM_REFERENCE, sql
+    ))
+    for sql in dependents:
+        cursor.execute(sql)
+
+
+# سجل الترحيلات بالترتيب: (رقم النسخة، الاسم، الدالة)
+MIGRATIONS = [
+    (1, "baseline", _m001_baseline),
+    (2, "index_pack", _m002_index_pack),
+    (3, "stock_ledger", _m003_stock_ledger),
+    (4, "member_totals", _m004_member_totals),
+    (5, "member_period_totals", _m005_member_period_totals),
+    (6, "keyset_indexes", _m006_keyset_indexes),
+    (7, "integer_money", _m007_integer_money),
+    (8, "item_references", _m008_item_references),
+    (9, "archive_partitions", _m009_archive_partitions),
+    (10, "name_search", _m010_name_search),
+    (11, "name_search_whitespace", _m011_name_search_whitespace),
+    (12, "drink_item_set_null", _m012_drink_item_set_null),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
@@ -0,0 +1,60 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# المبالغ تُخزن في قاعدة البيانات أعدادًا صحيحة من الوحدات الصغرى (قروش)،
+# فالجمع في SQL يكون على أعداد صحيحة ولا يتراكم خطأ الكسور العشرية
+MINOR_UNITS = 100
+
+
+def to_minor(amount):
+    """تحويل مبلغ إلى عدد صحيح من الوحدات الصغرى مع تقريب نصف الوحدة لأعلى"""
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(units):
+    """القيمة بالجنيه (للتصدير وحسابات العرض فقط، لا تُخزن)"""
+    if units is None:
+        return None
+    return units / MINOR_UNITS
+
+
+def parse_money(text):
+    """قراءة مبلغ أدخله المستخدم وإعادته بالوحدات الصغرى؛ ValueError إن لم يكن رقمًا"""
+    try:
+        amount = Decimal(str(text).strip())
+    except InvalidOperation:
+        raise ValueError(f"مبلغ غير صالح: {text}")
+    if not amount.is_finite():
+        raise ValueError(f"مبلغ غير صالح: {text}")
+    return to_minor(amount)
+
+
+def format_money(units):
+    """عرض مبلغ مخزن بالوحدات الصغرى بخانتين عشريتين دون المرور بالكسور العشرية"""
+    if units is None:
+        return ""
+    units = int(round(units))
+    sign = "-" if units < 0 else ""
+    major, minor = divmod(abs(units), MINOR_UNITS)
+    return f"{sign}{major}.{minor:02d}"
+
+
+def divide(units, count):
+    """قسمة مبلغ على عدد (مثل سعر الوحدة = الإجمالي / الكمية) مقربة لأقرب وحدة صغرى"""
+    quotient, remainder = divmod(units, count)
+    if remainder * 2 >= count:
+        quotient += 1
+    return quotient
+
+
+def sql_major(expression):
+    """تعبير SQL يحول قيمة بالوحدات الصغرى إلى جنيه؛ يُستخدم في أعمدة الإخراج فقط بعد الجمع"""
+    return f"({expression}) / {MINOR_UNITS}.0"
+
+
+def major_rows(rows, indexes):
+    """الصفوف مع تحويل أعمدة المبالغ indexes إلى جنيه (للتصدير)"""
+    for row in rows:
+        row = list(row)
+        for index in indexes:
+            row[index] = from_minor(row[index])
+        yield row
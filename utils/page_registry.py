@@ -0,0 +1,77 @@
+import importlib
+import logging
+import time
+
+# سياسات تخزين شجرة عناصر الصفحة بعد بنائها:
+# static: تُبنى مرة واحدة (القوائم التي لا تقرأ من قاعدة البيانات)
+# data: تُعاد بناؤها فقط إذا تغيرت البيانات منذ آخر بناء (db.write_generation)
+# none: تُبنى من جديد في كل زيارة (النماذج ذات الحقول والخطوات)
+CACHE_STATIC = "static"
+CACHE_DATA = "data"
+CACHE_NONE = "none"
+
+logger = logging.getLogger(__name__)
+
+
+class PageRegistry:
+    """سجل الصفحات: إنشاء كل صفحة عند أول استخدام وتخزين محتواها حسب سياستها
+
+    factory تُستدعى بـ (page, background_image, db) وتعيد كائن الصفحة، ويمكن أن تكون
+    نصًا "الوحدة:الصنف" فلا تُستورد وحدة الصفحة إلا عند أول زيارة.
+    """
+
+    def __init__(self, page, background_image, db):
+        self.page = page
+        self.background_image = background_image
+        self.db = db
+        self._factories = {}
+        self._instances = {}
+        # الاسم -> (رقم التعديل وقت البناء، المحتوى)
+        self._contents = {}
+
+    def register(self, name, factory, cache=CACHE_NONE):
+        self._factories[name] = (factory, cache)
+
+    def __contains__(self, name):
+        return name in self._factories
+
+    def get(self, name):
+        """كائن الصفحة، يُنشأ عند أول طلب"""
+        instance = self._instances.get(name)
+        if instance is None:
+            factory, _ = self._factories[name]
+            if isinstance(factory, str):
+                module_name, _, class_name = factory.partition(":")
+                factory = getattr(importlib.import_module(module_name), class_name)
+            instance = factory(self.page, self.background_image, self.db)
+            instance.set_navigate(self.navigate)
+            self._instances[name] = instance
+        return instance
+
+    def content(self, name, refresh=False):
+        """محتوى الصفحة من المخزن إن كان صالحًا وإلا يُبنى من جديد"""
+        cache = self._factories[name][1]
+        generation = self.db.write_generation if cache == CACHE_DATA else None
+        cached = self._contents.get(name)
+        if not refresh and cache != CACHE_NONE and cached is not None and cached[0] == generation:
+            return cached[1]
+
+        started = time.perf_counter()
+        content = self.get(name).get_content()
+        logger.debug("بناء الصفحة %s استغرق %.1f ms", name, (time.perf_counter() - started) * 1000)
+        if cache != CACHE_NONE:
+            self._contents[name] = (generation, content)
+        return content
+
+    def invalidate(self, name=None):
+        """إسقاط المحتوى المخزن لصفحة أو لكل الصفحات حتى يُعاد بناؤه عند الزيارة التالية"""
+        if name is None:
+            self._contents.clear()
+        else:
+            self._contents.pop(name, None)
+
+    def navigate(self, page_name, refresh=False):
+        self.page.clean()
+        if page_name in self:
+            self.page.add(self.content(page_name, refresh))
+        self.page.update()
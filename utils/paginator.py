@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# عدد الصفوف في كل صفحة
+PAGE_SIZE = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        return _executor
+
+
+class KeysetPaginator:
+    """تقسيم نتيجة استعلام إلى صفحات بالبحث على مفتاح مفهرس (التاريخ، المعرف) بدل OFFSET
+
+    كل صفحة تبدأ بعد آخر مفتاح في الصفحة السابقة فتكلف نفس الزمن أيًا كان رقمها.
+    select: أعمدة العرض، source: جزء FROM ... WHERE ... (الفلاتر فقط)،
+    order_column اختياري ويجب أن يُرتب مع id_column بفهرس واحد.
+    """
+
+    def __init__(self, db, select, source, params=(), id_column="rowid", order_column=None,
+                 group_by=None, page_size=PAGE_SIZE):
+        self.db = db
+        self.select = select
+        self.source = source
+        self.params = list(params)
+        self.id_column = id_column
+        self.order_column = order_column
+        self.group_by = group_by
+        self.page_size = page_size
+        self.page_number = 0
+        self.total_rows = None
+        # مفتاح آخر صف قبل بداية كل صفحة؛ الصفحة الأولى تبدأ من البداية
+        self._starts = {1: None}
+        self._prefetch = None
+        self._key_count = 2 if order_column else 1
+
+    @property
+    def order_by(self):
+        if self.order_column:
+            return f"{self.order_column}, {self.id_column}"
+        return self.id_column
+
+    def full_query(self):
+        """الاستعلام كاملًا بنفس ترتيب الصفحات، للتصدير"""
+        query = f"SELECT {self.select} {self.source}"
+        if self.group_by:
+            query += f" GROUP BY {self.group_by}"
+        return query + f" ORDER BY {self.order_by}", list(self.params)
+
+    def count(self):
+        if self.total_rows is None:
+            if self.group_by:
+                query = f"SELECT COUNT(*) FROM (SELECT 1 {self.source} GROUP BY {self.group_by})"
+            else:
+                query = f"SELECT COUNT(*) {self.source}"
+            # العدد يُخزن لكل مجموعة فلاتر حتى التعديل التالي في قاعدة البيانات
+            rows = self.db.reports.fetch(query, self.params)
+            self.total_rows = rows[0][0] if rows else 0
+        return self.total_rows
+
+    @property
+    def total_pages(self):
+        return max((self.count() + self.page_size - 1) // self.page_size, 1)
+
+    @property
+    def has_previous(self):
+        return self.page_number > 1
+
+    @property
+    def has_next(self):
+        return self.page_number < self.total_pages and (self.page_number + 1) in self._starts
+
+    def _seek(self, start):
+        # شرط البحث بعد آخر مفتاح؛ القيم الفارغة في عمود الترتيب تأتي أولًا في ترتيب SQLite
+        if start is None:
+            return "", []
+        if not self.order_column:
+            return f" AND {self.id_column} > ?", [start[0]]
+        order_value, id_value = start
+        if order_value is None:
+            return (f" AND (({self.order_column} IS NULL AND {self.id_column} > ?)"
+                    f" OR {self.order_column} IS NOT NULL)"), [id_value]
+        return f" AND ({self.order_column}, {self.id_column}) > (?, ?)", [order_value, id_value]
+
+    def _fetch(self, start):
+        seek, seek_params = self._seek(start)
+        keys = f"{self.order_column}, {self.id_column}" if self.order_column else self.id_column
+        query = f"SELECT {self.select}, {keys} {self.source}{seek}"
+        if self.group_by:
+            query += f" GROUP BY {self.group_by}"
+        query += f" ORDER BY {self.order_by} LIMIT ?"
+        # الصفحات المعروضة سابقًا تُقرأ من مخزن التقارير ما لم تتغير البيانات
+        return self.db.reports.fetch(query, self.params + seek_params + [self.page_size])
+
+    def _load(self, number):
+        prefetch = self._prefetch
+        self._prefetch = None
+        if prefetch and prefetch[0] == number:
+            rows = prefetch[1].result()
+        else:
+            rows = self._fetch(self._starts[number])
+        self.page_number = number
+        if rows:
+            self._starts[number + 1] = tuple(rows[-1][-self._key_count:])
+            # جلب الصفحة التالية مسبقًا في الخلفية
+            if number < self.total_pages:
+                start = self._starts[number + 1]
+                self._prefetch = (number + 1, _get_executor().submit(self._fetch, start))
+        return [row[:-self._key_count] for row in rows]
+
+    def first(self):
+        return self._load(1)
+
+    def next(self):
+        if not self.has_next:
+            return None
+        return self._load(self.page_number + 1)
+
+    def previous(self):
+        if not self.has_previous:
+            return None
+        return self._load(self.page_number - 1)
@@ -0,0 +1,199 @@
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# الاستعلام الذي يتجاوز هذا الزمن يُسجل في سجل الاستعلامات البطيئة مع خطة تنفيذه
+SLOW_QUERY_MS = 100
+
+# عدد الاستعلامات البطيئة الأخيرة المحفوظة في الذاكرة لصفحة التشخيص
+RECENT_SLOW = 200
+
+# حجم ملف السجل قبل تدويره وعدد النسخ القديمة المحفوظة
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# وحدات طبقة البيانات التي لا تُعد "مصدر الاستدعاء" عند البحث عن الصفحة المستدعية
+_DATA_LAYER = ("utils.", "contextlib", "sqlite3")
+
+
+class StatementStats:
+    """إحصاءات استعلام واحد من مستدعٍ واحد"""
+
+    __slots__ = ("query", "caller", "count", "total", "max", "rows")
+
+    def __init__(self, query, caller):
+        self.query = query
+        self.caller = caller
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class SlowQuery:
+    """استعلام تجاوز الحد: زمنه وعدد صفوفه ومستدعيه وخطة تنفيذه"""
+
+    __slots__ = ("at", "elapsed", "rows", "caller", "query", "plan")
+
+    def __init__(self, at, elapsed, rows, caller, query, plan):
+        self.at = at
+        self.elapsed = elapsed
+        self.rows = rows
+        self.caller = caller
+        self.query = query
+        self.plan = plan
+
+
+def _normalize(query):
+    return " ".join(query.split())
+
+
+def _caller():
+    """أول إطار خارج طبقة البيانات: الصفحة أو وحدة core التي طلبت الاستعلام"""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("pages."):
+            return f"{module}.{frame.f_code.co_name}"
+        if fallback is None and not module.startswith(_DATA_LAYER):
+            fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "?"
+
+
+def _plan(conn, query, params):
+    """خطة التنفيذ (EXPLAIN QUERY PLAN) كأسطر مزاحة حسب عمق كل خطوة"""
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    except sqlite3.Error as e:
+        return f"تعذر الحصول على الخطة: {e}"
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+class QueryProfiler:
+    """قياس زمن كل استعلام يمر عبر DatabaseManager (معطل افتراضيًا)
+
+    يجمع لكل (استعلام، مستدعٍ) عدد المرات والزمن الكلي والأقصى والصفوف، ويحفظ ما تجاوز
+    slow_ms مع خطة تنفيذه في الذاكرة وفي ملف سجل دوّار بجوار قاعدة البيانات.
+    """
+
+    def __init__(self, db_name, slow_ms=SLOW_QUERY_MS):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self.log_path = None if str(db_name).startswith((":memory:", "file::memory:")) \
+            else Path(db_name).with_name(f"{Path(db_name).stem}_slow_queries.log")
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=RECENT_SLOW)
+        self._logger = None
+
+    def enable(self, slow_ms=None):
+        """بدء القياس (--profile-queries)"""
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+    def _slow_logger(self):
+        if self._logger is None:
+            logger = logging.getLogger(f"{__name__}.slow")
+            # السجل مستقل عن مخرجات البرنامج العادية
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if self.log_path and not logger.handlers:
+                handler = RotatingFileHandler(self.log_path, maxBytes=LOG_MAX_BYTES,
+                                              backupCount=LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record(self, conn, query, params, elapsed, rows):
+        """تسجيل تنفيذ استعلام استغرق elapsed ثانية وأعاد (أو عدّل) rows صفًا"""
+        caller = _caller()
+        text = _normalize(query)
+        with self._lock:
+            stats = self._stats.get((text, caller))
+            if stats is None:
+                stats = self._stats[(text, caller)] = StatementStats(text, caller)
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.rows += max(rows, 0)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < self.slow_ms:
+            return
+        # الخطة تُحسب على نفس الاتصال بعد التنفيذ، فترى نفس المخطط والإحصاءات
+        plan = _plan(conn, query, params) if conn is not None else ""
+        slow = SlowQuery(datetime.now(), elapsed, rows, caller, text, plan)
+        with self._lock:
+            self._slow.append(slow)
+        self._slow_logger().info("%.1f ms rows=%d caller=%s\n%s\n%s", elapsed_ms, rows, caller, text, plan)
+
+    def statements(self, order="total"):
+        """نسخة من إحصاءات الاستعلامات مرتبة تنازليًا حسب total أو max أو count"""
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda s: getattr(s, order), reverse=True)
+
+    def slow_queries(self):
+        """الاستعلامات البطيئة الأخيرة، الأحدث أولًا"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+
+class ProfiledCursor:
+    """مؤشر يقيس execute و executemany ويمرر كل ما عداها للمؤشر الأصلي
+
+    يُستخدم داخل db.transaction() عند تفعيل القياس حتى تظهر استعلامات الحفظ في core والصفحات.
+    """
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+
+    def execute(self, query, params=()):
+        started = time.perf_counter()
+        self._cursor.execute(query, params)
+        self._profiler.record(self._cursor.connection, query, params,
+                              time.perf_counter() - started, self._cursor.rowcount)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        started = time.perf_counter()
+        self._cursor.executemany(query, seq_of_params)
+        # الخطة واحدة لكل الدفعة فتُحسب بقيم أول صف
+        self._profiler.record(self._cursor.connection, query, seq_of_params[0] if seq_of_params else (),
+                              time.perf_counter() - started, self._cursor.rowcount)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
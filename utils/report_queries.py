@@ -0,0 +1,132 @@
+# استعلامات التقارير المشتركة: الاسم -> (الاستعلام، عناوين الأعمدة، أعمدة المبالغ)
+# أعمدة المبالغ تعود من قاعدة البيانات أعدادًا صحيحة بالقروش (utils.money) وتُنسق عند العرض والتصدير فقط.
+# المعاملات مسماة (:member_id و :archive_key_id) حتى يُبنى مفتاح التخزين منها مباشرة،
+# والتقارير التي تبدأ بـ archived_ تقرأ من جداول الأرشيف وتأخذ :archive_key_id دائمًا
+REPORT_QUERIES = {
+    # تقارير الشهر الحالي
+    "expenses": ("""
+        SELECT item_name, quantity, price, (price * quantity) as total_price, consumption
+        FROM expenses
+    """, ["اسم الصنف", "الكمية", "سعر الوحدة", "السعر الكامل", "الاستهلاك"],
+     ["سعر الوحدة", "السعر الكامل"]),
+    "meals": ("""
+        SELECT m.name, mr.meal_type, mr.date, mr.final_cost
+        FROM meal_records mr
+        JOIN members m ON mr.member_id = m.member_id
+    """, ["اسم المشترك", "نوع الوجبة", "التاريخ", "التكلفة"],
+     ["التكلفة"]),
+    "drinks": ("""
+        SELECT m.name, dr.drink_name, dr.quantity, dr.date, dr.total_cost
+        FROM drink_records dr
+        JOIN members m ON dr.member_id = m.member_id
+    """, ["اسم المشترك", "اسم المشروب", "الكمية", "التاريخ", "التكلفة"],
+     ["التكلفة"]),
+    "remaining": ("""
+        SELECT item_name, remaining, price, (price * remaining) as total_price
+        FROM expenses
+    """, ["الصنف", "المتبقي", "سعر الوحدة", "السعر الإجمالي"],
+     ["سعر الوحدة", "السعر الإجمالي"]),
+    "consumption": ("""
+        SELECT name, meal_cost, drink_cost, misc_amount
+        FROM member_totals
+        ORDER BY member_id
+    """, ["اسم المشترك", "تكلفة الوجبات", "تكلفة المشروبات", "تكلفة النثريات"],
+     ["تكلفة الوجبات", "تكلفة المشروبات", "تكلفة النثريات"]),
+    "member_consumption": ("""
+        SELECT m.name,
+               COALESCE(mr.meal_type, 'غير محدد') as item,
+               COALESCE(mr.final_cost, 0) as cost,
+               mr.date
+        FROM meal_records mr
+        JOIN members m ON mr.member_id = m.member_id
+        WHERE mr.member_id = :member_id
+        UNION ALL
+        SELECT m.name,
+               dr.drink_name as item,
+               dr.total_cost as cost,
+               dr.date
+        FROM drink_records dr
+        JOIN members m ON dr.member_id = m.member_id
+        WHERE dr.member_id = :member_id
+        UNION ALL
+        SELECT m.name,
+               'نثريات' as item,
+               mc.misc_amount as cost,
+               mc.distribution_date as date
+        FROM miscellaneous_contributions mc
+        JOIN members m ON mc.member_id = m.member_id
+        WHERE mc.member_id = :member_id
+    """, ["اسم المشترك", "البند", "التكلفة", "التاريخ"],
+     ["التكلفة"]),
+
+    # تقارير الأرشيف
+    "archived_expenses": ("""
+        SELECT item_name, quantity, price, (price * quantity) as total_price
+        FROM expenses_archive
+        WHERE archive_key_id = :archive_key_id
+    """, ["اسم الصنف", "الكمية", "سعر الوحدة", "السعر الكامل"],
+     ["سعر الوحدة", "السعر الكامل"]),
+    "archived_meals": ("""
+        SELECT m.name, mr.meal_type, mr.date, mr.final_cost
+        FROM meal_records_archive mr
+        JOIN members_archive m ON mr.member_id = m.member_id AND m.archive_key_id = mr.archive_key_id
+        WHERE mr.archive_key_id = :archive_key_id
+    """, ["اسم المشترك", "نوع الوجبة", "التاريخ", "التكلفة"],
+     ["التكلفة"]),
+    "archived_drinks": ("""
+        SELECT m.name, dr.drink_name, dr.quantity, dr.date, dr.total_cost
+        FROM drink_records_archive dr
+        JOIN members_archive m ON dr.member_id = m.member_id AND m.archive_key_id = dr.archive_key_id
+        WHERE dr.archive_key_id = :archive_key_id
+    """, ["اسم المشترك", "اسم المشروب", "الكمية", "التاريخ", "التكلفة"],
+     ["التكلفة"]),
+    "archived_remaining": ("""
+        SELECT item_name, remaining, price, (price * remaining) as total_price
+        FROM expenses_archive
+        WHERE archive_key_id = :archive_key_id AND remaining > 0
+    """, ["الصنف", "المتبقي", "سعر الوحدة", "السعر الإجمالي"],
+     ["سعر الوحدة", "السعر الإجمالي"]),
+    "archived_consumption": ("""
+        SELECT m.name,
+               m.rank,
+               COALESCE(csa.total_meals, 0) as total_meals,
+               COALESCE(csa.total_drinks, 0) as total_drinks,
+               COALESCE(csa.total_miscellaneous, 0) as total_miscellaneous,
+               COALESCE(csa.total_consumption, 0) as total_consumption
+        FROM closure_summary_archive csa
+        JOIN members_archive m ON csa.member_id = m.member_id
+        WHERE csa.archive_key_id = :archive_key_id AND m.archive_key_id = :archive_key_id
+    """, ["الاسم", "الرتبة", "إجمالي الوجبات", "إجمالي المشروبات", "إجمالي النثريات", "إجمالي الاستهلاك"],
+     ["إجمالي الوجبات", "إجمالي المشروبات", "إجمالي النثريات", "إجمالي الاستهلاك"]),
+    "archived_member_consumption": ("""
+        SELECT m.name,
+               COALESCE(mr.meal_type, 'غير محدد') as item,
+               COALESCE(mr.final_cost, 0) as cost,
+               mr.date
+        FROM meal_records_archive mr
+        JOIN members_archive m ON mr.member_id = m.member_id AND m.archive_key_id = mr.archive_key_id
+        WHERE mr.member_id = :member_id AND mr.archive_key_id = :archive_key_id
+        UNION ALL
+        SELECT m.name,
+               dr.drink_name as item,
+               dr.total_cost as cost,
+               dr.date
+        FROM drink_records_archive dr
+        JOIN members_archive m ON dr.member_id = m.member_id AND m.archive_key_id = dr.archive_key_id
+        WHERE dr.member_id = :member_id AND dr.archive_key_id = :archive_key_id
+        UNION ALL
+        SELECT m.name,
+               'نثريات' as item,
+               mc.misc_amount as cost,
+               mc.distribution_date as date
+        FROM miscellaneous_contributions_archive mc
+        JOIN members_archive m ON mc.member_id = m.member_id AND m.archive_key_id = mc.archive_key_id
+        WHERE mc.member_id = :member_id AND mc.archive_key_id = :archive_key_id
+    """, ["اسم المشترك", "البند", "التكلفة", "التاريخ"],
+     ["التكلفة"]),
+}
+
+
+def is_archived(name):
+    """تقارير الأرشيف ثابتة لكل فترة ولا تتأثر بتعديلات الشهر الحالي"""
+    return name.startswith("archived_")
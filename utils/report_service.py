@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from utils.report_queries import REPORT_QUERIES, is_archived
+
+# أقصى عدد من النتائج المخزنة قبل إخراج الأقدم استخدامًا
+REPORT_CACHE_SIZE = 64
+
+# النتائج الأكبر من هذا العدد من الصفوف لا تُخزن حتى لا تتضخم الذاكرة
+REPORT_CACHE_MAX_ROWS = 50000
+
+
+class ReportService:
+    """طبقة التقارير المشتركة: تنفيذ استعلامات السجل وتخزين نتائجها مؤقتًا
+
+    نتائج الشهر الحالي تُخزن مع رقم التعديل (db.write_generation) وتُعاد قراءتها بعد أي تعديل
+    أو حفظ (قراءة جرت أثناء معاملة خيط آخر تنتهي صلاحيتها عند حفظها)،
+    ونتائج الأرشيف تُخزن دون انتهاء حتى تُبطل صراحةً بـ invalidate_archive.
+    """
+
+    def __init__(self, db, max_entries=REPORT_CACHE_SIZE, max_rows=REPORT_CACHE_MAX_ROWS):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        # المفتاح -> [رقم التعديل أو None للأرشيف، الصفوف]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def query(self, name):
+        return REPORT_QUERIES[name][0]
+
+    def columns(self, name):
+        return list(REPORT_QUERIES[name][1])
+
+    def money_columns(self, name):
+        """عناوين أعمدة المبالغ (بالقروش) في التقرير name"""
+        return list(REPORT_QUERIES[name][2])
+
+    def _lookup(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] != generation:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, generation, rows):
+        entry = [generation, rows]
+        if len(rows) > self.max_rows:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _source(self, name, params):
+        """تقارير الأرشيف تُقرأ من ملف فترتها إن كانت مختومة (db.archives)"""
+        if is_archived(name) and "archive_key_id" in params:
+            return self.db.archives.period(params["archive_key_id"])
+        return self.db
+
+    def _entry(self, key, query, params, archived, source=None):
+        source = source or self.db
+        if self.db.conn is not None and self.db.conn.in_transaction:
+            # أثناء معاملة مفتوحة قد لا تطابق القراءة ما سيُحفظ، فلا تُخزن ولا يُعتمد على المخزن
+            return [None, source.fetch_all(query, params)]
+        generation = None if archived else self.db.write_generation
+        entry = self._lookup(key, generation)
+        if entry is None:
+            entry = self._store(key, generation, source.fetch_all(query, params))
+        return entry
+
+    def _report_entry(self, name, params):
+        key = (name, tuple(sorted(params.items())))
+        return self._entry(key, self.query(name), params, is_archived(name), self._source(name, params))
+
+    def rows(self, name, **params):
+        """صفوف التقرير name كقائمة من tuples"""
+        return list(self._report_entry(name, params)[1])
+
+    def totals(self, name, **params):
+        """مجموع كل عمود مبالغ في التقرير name بالقروش، محسوبًا في SQL على أعداد صحيحة"""
+        titles = self.columns(name)
+        money = self.money_columns(name)
+        aliases = [f"c{i}" for i in range(len(titles))]
+        sums = ", ".join(f"COALESCE(SUM(c{titles.index(title)}), 0)" for title in money)
+        query = f"WITH report({', '.join(aliases)}) AS ({self.query(name)}) SELECT {sums} FROM report"
+        key = (("totals", name), tuple(sorted(params.items())))
+        row = self._entry(key, query, params, is_archived(name), self._source(name, params))[1][0]
+        return dict(zip(money, row))
+
+    def fetch(self, query, params=()):
+        """تنفيذ استعلام قراءة عام مع تخزين نتيجته حتى التعديل التالي"""
+        key = (query, tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params))
+        return list(self._entry(key, query, params, False)[1])
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate_archive(self, archive_key_id):
+        """إسقاط نتائج فترة أرشيف بعد إعادة كتابة بياناتها (مثل توزيع نثريات متأخر)"""
+        with self._lock:
+            for key in list(self._entries):
+                name, params = key
+                if isinstance(name, tuple):  # ("totals", اسم التقرير)
+                    name = name[1]
+                if name in REPORT_QUERIES and is_archived(name) \
+                        and str(dict(params).get("archive_key_id")) == str(archive_key_id):
+                    del self._entries[key]
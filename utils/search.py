@@ -0,0 +1,131 @@
+import threading
+
+# توحيد الكتابة العربية قبل الفهرسة والبحث: صور الهمزة، التاء المربوطة، الألف المقصورة،
+# التطويل والتشكيل. نفس الجدول يولّد تعبير SQL للمشغلات ودالة Python لنص البحث.
+ARABIC_FOLDS = (
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ؤ", "و"), ("ئ", "ي"), ("ى", "ي"), ("ة", "ه"),
+    ("ـ", ""),
+) + tuple((chr(mark), "") for mark in range(0x064B, 0x0653))
+
+# توحيد المسافات بنفس الخطوات في SQL و Python: الجدولة والأسطر مسافات، ثم كل مسافتين مسافة
+# (خمس مرات تكفي لأي تتابع حتى 32 مسافة) ثم حذف المسافات في الطرفين
+WHITESPACE_FOLDS = (("\t", " "), ("\n", " "), ("\r", " ")) + (("  ", " "),) * 5
+
+# الحد الأقصى لعدد الاقتراحات المعروضة
+SUGGESTION_LIMIT = 8
+
+# مهلة انتظار توقف الكتابة قبل البحث (بالثواني)
+DEBOUNCE_SECONDS = 0.25
+
+# الحد الأدنى لطول النص حتى يُستخدم فهرس trigram (الأقصر يُبحث فيه بمسح جدول الفهرس)
+TRIGRAM = 3
+
+# جداول الفهرس: النوع -> (جدول FTS5، الجدول الأصلي، عمود المعرف، عمود الاسم)
+INDEXES = {
+    "items": ("expenses_name_fts", "expenses", "expense_id", "item_name"),
+    "members": ("members_name_fts", "members", "member_id", "name"),
+}
+
+# قواعد البيانات (db_name) التي يوجد فيها جدول الفهرس، تُفحص مرة واحدة لكل نوع
+_available = {}
+
+_LOWER_ASCII = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def normalize(text):
+    """النص بعد توحيد الحروف العربية والمسافات وتصغير الحروف اللاتينية (مثل LOWER في SQLite)"""
+    text = (text or "").translate(_LOWER_ASCII)
+    for source, target in ARABIC_FOLDS + WHITESPACE_FOLDS:
+        text = text.replace(source, target)
+    return text.strip(" ")
+
+
+def normalized_sql(expression):
+    """تعبير SQL يطبق normalize على expression داخل المشغلات (دون دوال مسجلة في الاتصال)
+
+    الحروف ثم المسافات في استعلامين متداخلين لأن محلل SQLite لا يقبل أكثر من نحو 28 دالة
+    متداخلة في تعبير واحد.
+    """
+    letters = f"LOWER(COALESCE({expression}, ''))"
+    for source, target in ARABIC_FOLDS:
+        letters = f"REPLACE({letters}, '{source}', '{target}')"
+    spaces = "folded"
+    for source, target in WHITESPACE_FOLDS:
+        source = f"char({ord(source)})" if source.strip() else f"'{source}'"
+        spaces = f"REPLACE({spaces}, {source}, '{target}')"
+    return f"(SELECT TRIM({spaces}, ' ') FROM (SELECT {letters} AS folded))"
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def suggest(db, kind, text, limit=SUGGESTION_LIMIT):
+    """أقرب الأسماء المسجلة لنص البحث من فهرس kind ("items" أو "members")
+
+    الترتيب: ما يبدأ بالنص أولًا ثم حسب bm25 ثم الأقصر. النص الأقصر من ثلاثة أحرف لا يكفي
+    لفهرس trigram فيُبحث عنه بـ LIKE في جدول الفهرس نفسه.
+    """
+    table, source, _, name_column = INDEXES[kind]
+    query = normalize(text)
+    if not query:
+        return []
+    key = (str(db.db_name), table)
+    if key not in _available:
+        _available[key] = db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)) is not None
+    if not _available[key]:
+        # SQLite دون FTS5: بحث جزئي بمسح الجدول الأصلي بنفس التوحيد
+        rows = db.fetch_all(f"""
+            SELECT DISTINCT {name_column} FROM {source}
+            WHERE {normalized_sql(name_column)} LIKE ? ESCAPE '\\'
+            ORDER BY LENGTH({name_column}), {name_column}
+            LIMIT ?
+        """, ("%" + _escape_like(query) + "%", limit))
+        return [row[0] for row in rows]
+    params = {
+        "prefix": _escape_like(query) + "%",
+        "contains": "%" + _escape_like(query) + "%",
+        "match": '"' + query.replace('"', '""') + '"',
+        "limit": limit,
+    }
+    if len(query) >= TRIGRAM:
+        condition, score = f"{table} MATCH :match", "MIN(rank)"
+    else:
+        condition, score = "normalized LIKE :contains ESCAPE '\\'", "0"
+    rows = db.fetch_all(f"""
+        SELECT name, MAX(normalized LIKE :prefix ESCAPE '\\') AS starts, {score} AS score
+        FROM {table}
+        WHERE {condition}
+        GROUP BY name
+        ORDER BY starts DESC, score, LENGTH(name), name
+        LIMIT :limit
+    """, params)
+    return [row[0] for row in rows]
+
+
+class Debouncer:
+    """تأجيل استدعاء fn حتى يتوقف الاستدعاء مدة delay (مثل on_change مع كل حرف)
+
+    كل استدعاء يلغي المؤقت السابق، فلا يُنفذ إلا آخرها في خيط المؤقت.
+    """
+
+    def __init__(self, fn, delay=DEBOUNCE_SECONDS):
+        self.fn = fn
+        self.delay = delay
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.fn, args)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -0,0 +1,74 @@
+import builtins
+import sys
+import time
+
+# الميزانية المستهدفة لزمن الإقلاع حتى ظهور أول إطار
+STARTUP_BUDGET_MS = 1500
+
+# عدد الوحدات الأبطأ استيرادًا المعروضة في التقرير
+TOP_IMPORTS = 15
+
+_started = time.perf_counter()
+_enabled = False
+_original_import = None
+_marks = []
+# اسم الوحدة -> الزمن التراكمي لأول استيراد لها (يشمل ما تستورده)
+_imports = {}
+_depth = 0
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        elapsed = time.perf_counter() - started
+        _imports.setdefault(name, (elapsed, _depth))
+
+
+def enable():
+    """بدء قياس الاستيرادات ومراحل الإقلاع (--profile-startup)"""
+    global _enabled, _original_import
+    if _enabled:
+        return
+    _enabled = True
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def is_enabled():
+    return _enabled
+
+
+def mark(label):
+    """تسجيل نهاية مرحلة من مراحل الإقلاع"""
+    if _enabled:
+        _marks.append((label, time.perf_counter()))
+
+
+def report(file=None):
+    """طباعة تفصيل زمن الإقلاع: المراحل ثم الوحدات الأبطأ استيرادًا"""
+    if not _enabled:
+        return
+    file = file or sys.stderr
+    builtins.__import__ = _original_import
+
+    print("=== زمن الإقلاع ===", file=file)
+    previous = _started
+    for label, at in _marks:
+        print(f"{label:<30} {(at - previous) * 1000:8.1f} ms  (الإجمالي {(at - _started) * 1000:8.1f} ms)", file=file)
+        previous = at
+
+    print(f"--- أبطأ {TOP_IMPORTS} استيرادات (المستوى الأعلى فقط) ---", file=file)
+    top_level = [(elapsed, name) for name, (elapsed, depth) in _imports.items() if depth == 0]
+    for elapsed, name in sorted(top_level, reverse=True)[:TOP_IMPORTS]:
+        print(f"{name:<40} {elapsed * 1000:8.1f} ms", file=file)
+
+    total = ((_marks[-1][1] if _marks else time.perf_counter()) - _started) * 1000
+    status = "ضمن" if total <= STARTUP_BUDGET_MS else "تجاوز"
+    print(f"الإجمالي {total:.1f} ms، {status} الميزانية ({STARTUP_BUDGET_MS} ms)", file=file)
@@ -0,0 +1,193 @@
+import math
+import flet as ft
+
+# ارتفاع الصف الثابت بالبكسل؛ النافذة تحسب موضعها منه
+ROW_HEIGHT = 40
+
+# عدد الصفوف الإضافية المرسومة فوق وتحت المنطقة الظاهرة لتجنب الفراغ أثناء التمرير السريع
+OVERSCAN = 5
+
+# عدد الصفوف المقروءة من قاعدة البيانات في كل كتلة
+BLOCK_SIZE = 200
+
+
+class QueryRowSource:
+    """مصدر صفوف كسول من استعلام: يُقرأ العدد ثم كتل الصفوف الظاهرة فقط عند الحاجة
+
+    الكتل تمر عبر db.reports فتبقى محفوظة حتى التعديل التالي في قاعدة البيانات.
+    row_factory اختيارية لتحويل كل صف (مثل تحويله إلى dict).
+    """
+
+    def __init__(self, db, query, params=(), row_factory=None, block_size=BLOCK_SIZE):
+        self.db = db
+        self.query = query
+        self.params = params
+        self.row_factory = row_factory
+        self.block_size = block_size
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            rows = self.db.reports.fetch(f"SELECT COUNT(*) FROM ({self.query})", self.params)
+            self._count = rows[0][0] if rows else 0
+        return self._count
+
+    def _block(self, number):
+        offset = number * self.block_size
+        if isinstance(self.params, dict):
+            params = dict(self.params, _limit=self.block_size, _offset=offset)
+            return self.db.reports.fetch(f"{self.query} LIMIT :_limit OFFSET :_offset", params)
+        params = list(self.params) + [self.block_size, offset]
+        return self.db.reports.fetch(f"{self.query} LIMIT ? OFFSET ?", params)
+
+    def rows(self, start, stop):
+        result = []
+        for number in range(start // self.block_size, (max(stop, 1) - 1) // self.block_size + 1):
+            block = self._block(number)
+            block_start = number * self.block_size
+            result.extend(block[max(start - block_start, 0):stop - block_start])
+        if self.row_factory:
+            return [self.row_factory(row) for row in result]
+        return result
+
+
+class VirtualTable:
+    """جدول بنافذة متحركة يرسم الصفوف الظاهرة فقط مهما كان عدد صفوف المصدر
+
+    columns: قائمة من (العنوان، المفتاح[، العرض[، دالة التنسيق]])، والمفتاح رقم العمود
+    أو اسم الحقل في الصف. rows: قائمة أو مصدر كسول يدعم len() و rows(start, stop).
+    عناصر الصفوف تُنشأ مرة واحدة وتُعاد تعبئتها مع التمرير، والجدول يُضاف للصفحة عبر control.
+    """
+
+    def __init__(self, columns, rows=(), height=400, width=None, row_height=ROW_HEIGHT,
+                 on_select=None, text_style=None, header_color=ft.colors.BLUE,
+                 bgcolor=ft.colors.WHITE, alternate_bgcolor=None, selected_bgcolor=ft.colors.YELLOW,
+                 border_color=ft.colors.BLACK, format_cell=str):
+        self.columns = [tuple(column) + (None,) * (4 - len(column)) for column in columns]
+        self.row_height = row_height
+        self.on_select = on_select
+        self.text_style = text_style
+        self.bgcolor = bgcolor
+        self.alternate_bgcolor = alternate_bgcolor
+        self.selected_bgcolor = selected_bgcolor
+        self.border_color = border_color
+        self.format_cell = format_cell
+        self.source = []
+        self.total = 0
+        self.first = 0
+        self.selected_index = None
+        self.selected_row = None
+        self._window = []
+
+        self.header = ft.Container(
+            content=ft.Row(
+                [self._cell(title, width, bold=True) for title, _, width, _ in self.columns],
+                spacing=0,
+            ),
+            bgcolor=header_color,
+        )
+        visible_count = math.ceil(height / row_height) + OVERSCAN * 2
+        self._row_controls = [self._make_row() for _ in range(visible_count)]
+        # فراغان أعلى وأسفل الصفوف المرسومة يحفظان ارتفاع الجدول الكامل لشريط التمرير
+        self._top = ft.Container(height=0)
+        self._bottom = ft.Container(height=0)
+        self._body = ft.Column(
+            [self._top, *self._row_controls, self._bottom],
+            spacing=0,
+            height=height,
+            scroll=ft.ScrollMode.AUTO,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=30,
+        )
+        self.control = ft.Container(
+            content=ft.Column([self.header, self._body], spacing=0),
+            width=width,
+            bgcolor=bgcolor,
+            border=ft.border.all(1, border_color) if border_color else None,
+        )
+        self.set_rows(rows, update=False)
+
+    def __len__(self):
+        return self.total
+
+    def _cell(self, value, width, bold=False):
+        return ft.Container(
+            content=ft.Text(value, style=self.text_style, weight=ft.FontWeight.BOLD if bold else None),
+            alignment=ft.alignment.center,
+            height=self.row_height,
+            width=width,
+            expand=width is None,
+            border=ft.border.only(left=ft.BorderSide(1, self.border_color)) if self.border_color else None,
+        )
+
+    def _make_row(self):
+        return ft.Container(
+            content=ft.Row([self._cell("", width) for _, _, width, _ in self.columns], spacing=0),
+            border=ft.border.only(bottom=ft.BorderSide(1, self.border_color)) if self.border_color else None,
+            on_click=self._on_click,
+            visible=False,
+        )
+
+    def _rows(self, start, stop):
+        if hasattr(self.source, "rows"):
+            return self.source.rows(start, stop)
+        return self.source[start:stop]
+
+    def _row_color(self, index):
+        if index == self.selected_index:
+            return self.selected_bgcolor
+        if self.alternate_bgcolor and index % 2:
+            return self.alternate_bgcolor
+        return None
+
+    def _render(self):
+        self._window = self._rows(self.first, self.first + len(self._row_controls))
+        for offset, control in enumerate(self._row_controls):
+            if offset >= len(self._window):
+                control.visible = False
+                continue
+            row = self._window[offset]
+            for cell, (_, key, _, fmt) in zip(control.content.controls, self.columns):
+                value = row[key]
+                cell.content.value = "" if value is None else (fmt or self.format_cell)(value)
+            control.data = self.first + offset
+            control.bgcolor = self._row_color(self.first + offset)
+            control.visible = True
+        self._top.height = self.first * self.row_height
+        self._bottom.height = max(self.total - self.first - len(self._window), 0) * self.row_height
+
+    def _update(self):
+        if self.control.page is not None:
+            self.control.update()
+
+    def _on_scroll(self, e):
+        first = max(int(e.pixels // self.row_height) - OVERSCAN, 0)
+        if first != self.first:
+            self.first = first
+            self._render()
+            self._body.update()
+
+    def _on_click(self, e):
+        index = e.control.data
+        if index is None:
+            return
+        self.selected_index = index
+        self.selected_row = self._window[index - self.first]
+        for control in self._row_controls:
+            if control.visible:
+                control.bgcolor = self._row_color(control.data)
+        self._update()
+        if self.on_select:
+            self.on_select(self.selected_row)
+
+    def set_rows(self, rows, update=True):
+        """استبدال مصدر الصفوف والعودة إلى أول الجدول"""
+        self.source = rows
+        self.total = len(rows)
+        self.first = 0
+        self.selected_index = None
+        self.selected_row = None
+        self._render()
+        if update and self.control.page is not None:
+            self._body.scroll_to(offset=0)
+            self.control.update()